@@ -0,0 +1,13 @@
+"""
+ASGI entry point. Async views (job catalog, application check, theme,
+health) run on the event loop without a thread per connection.
+
+    gunicorn greentara.asgi:application -k uvicorn_worker.UvicornWorker
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'greentara.settings')
+
+application = get_asgi_application()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project
@@ -59,23 +60,100 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'greentara.wsgi.application'
+ASGI_APPLICATION = 'greentara.asgi.application'
+
+# ============================================
+# DATABASE
+# ============================================
+#
+# DATABASE_URL (Postgres on Render) or a local SQLite file. On Postgres
+# each worker process keeps a psycopg connection pool shared by its
+# threads, so a threaded worker holds at most DB_POOL_MAX_SIZE server
+# connections however many requests are in flight. See
+# `manage.py db_pool_stats` for checkout waits and saturation.
+import dj_database_url
+
+DB_POOL = os.environ.get('DB_POOL', 'True') == 'True'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),    # seconds to wait for a free connection
+    'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),  # close spare connections idle this long
+}
+
+
+def _database(url):
+    config = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    if config['ENGINE'] == 'django.db.backends.postgresql' and DB_POOL:
+        # Pooled connections go back to the pool after each request, so
+        # persistent connections must be off (Django refuses both). Health
+        # checks now run on pool checkout.
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = dict(DB_POOL_OPTIONS)
+    return config
+
 
-# Database
 DATABASES = {
+    'default': _database(os.environ.get('DATABASE_URL') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+}
+
+# SQLite concurrency mode (used when DATABASE_URL is not set). WAL lets
+# readers run alongside the single writer; IMMEDIATE transactions take the
+# write lock up front so busy_timeout can queue writers instead of failing
+# with "database is locked" on lock upgrade. The db.sqlite3 checked into
+# the repo is left in rollback-journal mode (jobs.db.configure_sqlite);
+# point DATABASE_URL at a copy of it to run with WAL.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+# Read replicas: comma-separated database URLs. Public read-only views
+# (@replica_reads) use them; writes and recent writers stay on default.
+# To try locally: DATABASE_REPLICA_URLS=sqlite:////path/to/copy.sqlite3
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+]
+for i, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica_{i}'] = _database(url)
+    DATABASES[f'replica_{i}']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['jobs.routers.ReplicaRouter']
+
+REPLICA_MAX_LAG_SECONDS = 5    # replicas further behind are taken out of rotation
+REPLICA_HEALTH_INTERVAL = 5    # seconds between health checks per replica
+REPLICA_PIN_SECONDS = 10       # reads stay on the primary this long after a write
+
+# Applied to every new SQLite connection (jobs.db.configure_sqlite).
+# Set SQLITE_TUNING=False to run with SQLite's defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,       # ms to wait for the write lock
+    'cache_size': -32000,        # 32 MB page cache (negative = KiB)
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+} if os.environ.get('SQLITE_TUNING', 'True') == 'True' else {}
+
+
+# ============================================
+# CACHE
+# ============================================
+
+# Shared by every worker on the host so invalidation reaches all of them.
+# Set REDIS_URL to share it across hosts instead.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'greentara-cache'),
+        'TIMEOUT': 300,
     }
 }
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'TIMEOUT': 300,
+    }
 
-# Use PostgreSQL on Render
-import dj_database_url
-if 'DATABASE_URL' in os.environ:
-    DATABASES['default'] = dj_database_url.config(
-        default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600,
-        conn_health_checks=True,
-    )
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,14 +173,6 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-
-
-
-
-# Media files (uploads)
-MEDIA_URL = '/uploads/'
-MEDIA_ROOT = BASE_DIR / 'up''loads'
-
 # WhiteNoise configuration
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
@@ -138,7 +208,16 @@ SERVER_EMAIL = DEFAULT_FROM_EMAIL
 # ============================================
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Served by jobs.views.serve_media: staff only, except these prefixes
+MEDIA_PUBLIC_PREFIXES = ('logos/',)
+# Hand the transfer to the front proxy after the permission check:
+# 'nginx' (X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an `internal` location
+# aliased to MEDIA_ROOT) or 'sendfile' (X-Sendfile). Empty: FileResponse,
+# which gunicorn sends with os.sendfile().
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 
 
@@ -200,9 +279,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'jobs.middleware.RequestContextMiddleware',  # Request ID and start time for log records
+    'jobs.middleware.RequestMetricsMiddleware',  # Early, so it times the whole request
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files
+    'jobs.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable for ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',  # Required for admin
+    'jobs.routers.ReplicaPinMiddleware',  # Read-your-writes for replica reads
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # Required for admin
@@ -235,6 +317,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -271,15 +354,30 @@ if not DEBUG:
 
 
 # ============================================
-# LOGGING (Optional but helpful)
+# LOGGING
 # ============================================
 
+# JSON lines on stdout. Request threads only enqueue records; formatting
+# and the write happen on a QueueListener thread (see jobs/log.py).
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'jobs.log.RequestContextFilter',
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'jobs.log.JsonFormatter',
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'jobs.log.QueueListenerHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+            'filters': ['request_context'],
         },
     },
     'root': {
@@ -296,6 +394,186 @@ LOGGING = {
 }
 
 
+# ============================================
+# RATE LIMITS
+# ============================================
+
+# Token buckets per scope: bucket -> (capacity, seconds to refill it).
+# Checked before the view reads the request body (jobs/ratelimit.py).
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
+RATELIMITS = {
+    'check_application': {
+        'ip': (60, 60),        # 60 lookups a minute per client
+        'email': (20, 60),
+        'global': (400, 1),
+    },
+    'submit_application': {
+        # Generous: a campus, job fair or carrier NAT puts many applicants
+        # behind one address. The per-email bucket is the real limit.
+        'ip': (200, 3600),
+        'email': (5, 3600),    # also caps confirmation emails to one address
+        'global': (20, 1),
+    },
+    'upload_session': {
+        'ip': (600, 3600),     # three documents per submission, as above
+        'global': (50, 1),
+    },
+    'upload_chunk': {
+        # A 5 MB document is 20 chunks; room for retries and offset checks
+        'ip': (15000, 3600),
+        'global': (200, 1),
+    },
+}
+# Shared by all workers on the host; must be on local disk
+RATELIMIT_FILE = os.environ.get('RATELIMIT_FILE', '')
+RATELIMIT_SLOTS = 65536
+# Proxies in front of the app that append to X-Forwarded-For. 0 (no
+# proxy) uses REMOTE_ADDR; with a proxy that isn't there any client could
+# pick its own bucket with a forged header. Set to 1 on Render.
+RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', '0'))
+
+# Applications above this Content-Length are refused before the upload is read
+# (three 5 MB documents plus form fields)
+APPLICATION_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+# Idempotency-Key retries of submit_application (jobs/idempotency.py)
+IDEMPOTENCY_TTL = 24 * 3600        # how long a stored response is replayed
+IDEMPOTENCY_WAIT_SECONDS = 20      # a retry waits this long for the first request
+IDEMPOTENCY_LOCK_SECONDS = 120     # a claim older than this with no response was abandoned
+# Larger bodies aren't read to hash them (the view refuses them anyway)
+IDEMPOTENCY_MAX_BODY_SIZE = APPLICATION_MAX_BODY_SIZE
+
+
+# ============================================
+# RESUMABLE UPLOADS
+# ============================================
+
+# In-progress document uploads (jobs/uploads.py). Local disk shared by
+# every worker on the host; gc_uploads removes expired sessions.
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR', '')
+UPLOAD_SESSION_TTL = 24 * 3600
+UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+# Largest PATCH accepted; small enough to get through on a weak 3G link
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+# Bulk job imports (POST /api/admin/jobs/import) are parsed as they stream
+# in, but the validated rows are held until they are written
+JOB_IMPORT_MAX_BODY_SIZE = 50 * 1024 * 1024
+
+
+# ============================================
+# RANKING
+# ============================================
+
+# Default feature weights for jobs/ranking.py; requests can override each
+# (w_grade=...). Age only counts when an ideal_age is given.
+RANKING_WEIGHTS = {'grade': 0.6, 'recency': 0.2, 'certificate': 0.2, 'age': 0.0}
+# Days for the recency score to halve
+RANKING_HALF_LIFE_DAYS = 30
+# Jobs whose applicant columns each worker keeps in memory
+RANKING_CACHE_JOBS = 8
+
+
+# ============================================
+# CANDIDATES
+# ============================================
+
+# Phone numbers written without one (0712..., 712...) get this country code
+CANDIDATE_COUNTRY_CODE = '254'
+# Also link applications by a near-identical name with the same gender and
+# age when no email or phone matches
+CANDIDATE_MATCH_NAMES = True
+
+
+# ============================================
+# ADMIN SEARCH
+# ============================================
+
+# A changelist search that matches nothing is retried against names
+# spelled slightly differently, this similar by trigrams (0 to 1; 0 = off)
+ADMIN_SEARCH_FUZZY_THRESHOLD = 0.4
+
+
+# ============================================
+# CV TEXT
+# ============================================
+
+# Text kept per CV for full-text search (jobs/cv_text.py); the rest of a
+# very long document is dropped
+CV_TEXT_MAX_CHARS = 100000
+# Processes the extract_cv_text command parses CVs in
+CV_TEXT_WORKERS = int(os.environ.get('CV_TEXT_WORKERS', '2'))
+# Seconds a worker gets per CV before it is marked failed and replaced
+CV_TEXT_TIMEOUT = int(os.environ.get('CV_TEXT_TIMEOUT', '60'))
+
+
+# ============================================
+# ARCHIVE
+# ============================================
+
+# Old applications and their documents move here (jobs/archive.py);
+# point it at cheaper storage than MEDIA_ROOT if there is any. It holds
+# applicants' personal data: the default BASE_DIR/archive is git-ignored
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', '')
+# Days after applied_at before an application is archived, by status
+ARCHIVE_RETENTION = {
+    'rejected': 180,
+    'reviewed': 730,
+    'pending': 730,
+    'shortlisted': 730,
+}
+# Any status, once its job has been closed (or deleted) this many days
+ARCHIVE_CLOSED_JOB_DAYS = 365
+
+
+# ============================================
+# STATIC SNAPSHOT
+# ============================================
+
+# The public board published as plain files (jobs/snapshot.py,
+# `manage.py publish_snapshot`). StaticFilesMiddleware serves the directory
+# at SNAPSHOT_URL; nginx or a CDN can serve it instead.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '') or os.path.join(BASE_DIR, 'snapshot')
+SNAPSHOT_URL = '/snapshot/'
+# Publish again after every Job, SiteContent or SiteSettings save. Off by
+# default: that re-renders the whole board in the saving request, so run
+# `manage.py publish_snapshot --loop` next to the web service instead.
+SNAPSHOT_ON_SAVE = os.environ.get('SNAPSHOT_ON_SAVE', 'False') == 'True'
+# Seconds superseded files are kept for pages loaded before the change
+SNAPSHOT_RETENTION = 86400
+
+# ============================================
+# WARM-UP
+# ============================================
+
+# Import views, build the URL resolver and compile templates in
+# AppConfig.ready(). gunicorn.conf.py turns this on so it happens once in
+# the preloading master; per-worker DB/cache warm-up runs after fork.
+WARMUP_ON_READY = os.environ.get('WARMUP_ON_READY', 'False') == 'True'
+WARMUP_POOL_TIMEOUT = 10  # seconds to wait for the pool's min_size connections
+# Requested in-process by each worker before it accepts traffic
+WARMUP_PATHS = ['/api/health', '/api/jobs', '/api/content', '/api/theme-colors']
+
+# ============================================
+# METRICS
+# ============================================
+
+# Workers write metric snapshots here so /api/metrics can sum them.
+# Must be shared by every gunicorn worker on the host.
+WORKER_STATE_DIR = os.environ.get('WORKER_STATE_DIR', '')
+
+# Lets a Prometheus scraper read /api/metrics without a staff session
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Queries slower than this are logged and kept for /api/admin/slow-queries
+# and `manage.py slow_queries` (0 turns the hook off)
+SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+SLOW_QUERY_BUFFER_SIZE = 200
+# EXPLAIN plans are captured for this many of the slowest statement shapes
+SLOW_QUERY_EXPLAIN_TOP = 20
+
+
 # ============================================
 # RENDER ENVIRONMENT VARIABLES
 # ============================================
@@ -307,6 +585,8 @@ LOGGING = {
 # SECRET_KEY = your-secret-key
 # DEBUG = False
 # ALLOWED_HOSTS = greentara-jobs.onrender.com
+# METRICS_TOKEN = long-random-string (optional)
+# RATELIMIT_TRUSTED_PROXIES = 1
 
 # Session settings
 SESSION_COOKIE_AGE = 86400
@@ -329,11 +609,6 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 LOGIN_URL = '/login/'
 
-import os
-from pathlib import Path
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",  # Project-level static files
@@ -341,9 +616,6 @@ STATICFILES_DIRS = [
 
 # For production
 STATIC_ROOT = BASE_DIR / "staticfiles"
-# Media files (for downloads)
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File size limits
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
@@ -355,40 +627,12 @@ if not DEBUG:
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
 
-import os
-from pathlib import Path
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Fix static files warning
-STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'static'),
-]
-
-# Create the static directory if it doesn't exist
-os.makedirs(os.path.join(BASE_DIR, 'static'), exist_ok=True)
-
-import os
-from pathlib import Path
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Database - Use environment variable for Render
-import dj_database_url
-DATABASES = {
-    'default': dj_database_url.config(
-        default='sqlite:///db.sqlite3',
-        conn_max_age=600
-    )
-}
-
 # Static files configuration for production
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# static/ is optional; listed only when present instead of creating it at import
 STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'static'),
+    path for path in [os.path.join(BASE_DIR, 'static')] if os.path.isdir(path)
 ]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
@@ -1,13 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from jobs import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Media files: permission-checked in every environment
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', views.serve_media, name='serve_media'),
     path('', include('jobs.urls')),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
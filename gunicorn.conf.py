@@ -0,0 +1,42 @@
+# ============================================
+# GUNICORN - gunicorn -c gunicorn.conf.py
+# ============================================
+#
+# preload_app imports Django and runs the code warm-up (jobs/warmup.py)
+# once in the master; workers fork with it done. Each worker then opens
+# its database connections and fills the catalog cache in
+# post_worker_init, before it accepts a request.
+#
+# GUNICORN_ASGI=True serves greentara.asgi with uvicorn workers instead
+# of greentara.wsgi with threaded workers. Under WSGI the async views
+# (catalog, application check, theme, health) still work, but Django
+# runs each one through async_to_sync, about 0.3 ms a request (over 1 ms
+# with four busy threads).
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'greentara.settings')
+os.environ.setdefault('WARMUP_ON_READY', 'True')
+
+ASGI = os.environ.get('GUNICORN_ASGI', 'False') == 'True'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+if ASGI:
+    wsgi_app = 'greentara.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'greentara.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+preload_app = True
+timeout = 30
+graceful_timeout = 20
+accesslog = None
+
+
+def post_worker_init(worker):
+    if os.environ.get('WARMUP_WORKER', 'True') != 'True':
+        return
+    from jobs.warmup import warm_worker
+    warm_worker()
@@ -2,10 +2,17 @@
 # FIXED admin.py - Shows Documents Properly
 # ============================================
 
+from django.conf import settings
 from django.contrib import admin
-from django.utils.html import format_html
-from django.urls import reverse
-from .models import Job, Application, SiteContent
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from django.urls import path, reverse
+from .models import Job, Application, ApplicationStatusEvent, Candidate, SiteContent
+from .grades import GRADES, grade_rank
+from . import statuses
 import csv
 from django.http import HttpResponse
 
@@ -43,6 +50,21 @@ class JobAdmin(admin.ModelAdmin):
 # APPLICATION ADMIN - WITH DOCUMENTS SECTION
 # ============================================
 
+class MinGradeFilter(admin.SimpleListFilter):
+    """KCSE grade or better, on the indexed grade_rank column"""
+    title = 'minimum KCSE grade'
+    parameter_name = 'min_grade'
+    
+    def lookups(self, request, model_admin):
+        return [(grade, f'{grade} or better') for grade in GRADES[::-1]]
+    
+    def queryset(self, request, queryset):
+        rank = grade_rank(self.value()) if self.value() else 0
+        if rank:
+            return queryset.filter(grade_rank__gte=rank)
+        return queryset
+
+
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = [
@@ -56,15 +78,18 @@ class ApplicationAdmin(admin.ModelAdmin):
         'kcse_grade',
         'status',
         'status_badge',
+        'candidate_link',
         'applied_at',
     ]
     
+    list_select_related = ['candidate']
+    
     list_filter = [
         'status',
         'gender',
         'job_title',
         'applied_at',
-        'kcse_grade'
+        MinGradeFilter,
     ]
     
     search_fields = [
@@ -73,6 +98,7 @@ class ApplicationAdmin(admin.ModelAdmin):
         'phone',
         'job_title'
     ]
+    search_help_text = 'Name, email, phone, job title, or words in the CV'
     
     list_editable = ['status']
     
@@ -88,17 +114,23 @@ class ApplicationAdmin(admin.ModelAdmin):
         'display_id',
         'display_certificate',
         'display_additional',
+        'cv_text_preview',
+        'candidate_link',
+        'other_applications',
     ]
     
     fieldsets = (
         ('Application Info', {
             'fields': ('job_id', 'job_title', 'applied_at', 'status')
         }),
+        ('Candidate', {
+            'fields': ('candidate_link', 'other_applications'),
+        }),
         ('Personal Information', {
             'fields': ('full_name', 'email', 'phone', 'age', 'gender', 'kcse_grade')
         }),
         ('📎 Uploaded Documents', {
-            'fields': ('display_cv', 'display_id', 'display_certificate', 'display_additional'),
+            'fields': ('display_cv', 'display_id', 'display_certificate', 'display_additional', 'cv_text_preview'),
             'description': '⬇️ Click the buttons below to download applicant documents'
         }),
         ('Admin Notes', {
@@ -118,6 +150,63 @@ class ApplicationAdmin(admin.ModelAdmin):
         'export_to_csv'
     ]
     
+    # ============================================
+    # RANKING VIEW
+    # ============================================
+    
+    def get_urls(self):
+        urls = [
+            path('ranking/', self.admin_site.admin_view(self.ranking_view), name='jobs_application_ranking'),
+        ]
+        return urls + super().get_urls()
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        search_fields matched through their indexes (jobs/admin_search.py),
+        plus applications whose CV text matches
+        """
+        from . import admin_search, fulltext
+        
+        if not search_term.strip():
+            return queryset, False
+        results, path = admin_search.search(queryset, search_term, self.search_fields)
+        if path in ('text', 'fuzzy'):
+            cv_ids = fulltext.matching_ids(search_term)
+            if cv_ids:
+                results = results | queryset.filter(id__in=cv_ids)
+        return results, False
+    
+    def ranking_view(self, request):
+        """Top applicants for one job, scored by jobs/ranking.py"""
+        from . import ranking
+        
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        defaults = getattr(settings, 'RANKING_WEIGHTS', ranking.DEFAULT_WEIGHTS)
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title='Rank applicants',
+            jobs=Job.objects.order_by('-created_at').values('id', 'title', 'location'),
+            query=request.GET,
+            weights=[
+                (name, request.GET.get(f'w_{name}', defaults.get(name, 0)))
+                for name in ranking.FEATURES
+            ],
+            grades=GRADES[::-1],
+        )
+        if request.GET.get('job'):
+            try:
+                ranked = ranking.rank(int(request.GET['job']), **ranking.options_from_query(request.GET))
+            except ValueError as e:
+                context['error'] = str(e)
+            else:
+                apps = Application.objects.in_bulk([row['id'] for row in ranked['results']])
+                for row in ranked['results']:
+                    row['application'] = apps.get(row['id'])
+                context['ranked'] = ranked
+        return TemplateResponse(request, 'admin/jobs/application/ranking.html', context)
+    
     # ============================================
     # DISPLAY METHODS
     # ============================================
@@ -139,6 +228,44 @@ class ApplicationAdmin(admin.ModelAdmin):
         )
     status_badge.short_description = 'Status'
     
+    def cv_text_preview(self, obj):
+        """The start of the text extracted from the CV"""
+        cv_text = getattr(obj, 'cv_text', None) if obj.pk else None
+        if cv_text is None:
+            return 'Not extracted yet' if obj.cv_document else '—'
+        if cv_text.status != 'done':
+            return f'{cv_text.get_status_display()} {cv_text.error}'.strip()
+        preview = cv_text.text[:1500] + ('…' if len(cv_text.text) > 1500 else '')
+        return format_html('<div style="white-space: pre-wrap; max-height: 300px; overflow: auto;">{}</div>', preview)
+    cv_text_preview.short_description = 'CV text'
+    
+    def candidate_link(self, obj):
+        """The candidate this application was matched to"""
+        if not obj.candidate_id:
+            return '—'
+        return format_html(
+            '<a href="{}">#{}</a>',
+            reverse('admin:jobs_candidate_change', args=[obj.candidate_id]),
+            obj.candidate_id,
+        )
+    candidate_link.short_description = 'Candidate'
+    
+    def other_applications(self, obj):
+        """The same person's other applications"""
+        if not obj.candidate_id:
+            return '—'
+        others = obj.candidate.applications.exclude(id=obj.id).order_by('-applied_at')
+        return format_html_join(
+            mark_safe('<br>'),
+            '<a href="{}">{}</a> ({}, {})',
+            (
+                (reverse('admin:jobs_application_change', args=[other.id]),
+                 other.job_title, other.status, other.applied_at.strftime('%Y-%m-%d'))
+                for other in others
+            ),
+        ) or 'None'
+    other_applications.short_description = 'Other applications'
+    
     # ============================================
     # DOCUMENT DOWNLOAD METHODS
     # ============================================
@@ -213,21 +340,28 @@ class ApplicationAdmin(admin.ModelAdmin):
     # BULK ACTIONS
     # ============================================
     
+    def set_status(self, request, queryset, status):
+        """Batched update that records each change in the status history"""
+        summary = statuses.bulk_set_status(
+            queryset, status, changed_by=request.user.get_username(), source='admin'
+        )
+        return summary['updated']
+    
     def mark_as_reviewed(self, request, queryset):
         """Mark selected applications as reviewed"""
-        updated = queryset.update(status='reviewed')
+        updated = self.set_status(request, queryset, 'reviewed')
         self.message_user(request, f'{updated} application(s) marked as reviewed.')
     mark_as_reviewed.short_description = '✅ Mark as Reviewed'
     
     def mark_as_shortlisted(self, request, queryset):
         """Mark selected applications as shortlisted"""
-        updated = queryset.update(status='shortlisted')
+        updated = self.set_status(request, queryset, 'shortlisted')
         self.message_user(request, f'{updated} application(s) marked as shortlisted.')
     mark_as_shortlisted.short_description = '⭐ Mark as Shortlisted'
     
     def mark_as_rejected(self, request, queryset):
         """Mark selected applications as rejected"""
-        updated = queryset.update(status='rejected')
+        updated = self.set_status(request, queryset, 'rejected')
         self.message_user(request, f'{updated} application(s) marked as rejected.')
     mark_as_rejected.short_description = '❌ Mark as Rejected'
     
@@ -283,12 +417,67 @@ class SiteContentAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Only allow one site content instance
         return not SiteContent.objects.exists()
-    
+
     def has_delete_permission(self, request, obj=None):
         # Don't allow deletion
         return False
 
 
+# ============================================
+# CANDIDATES
+# ============================================
+
+class CandidateApplicationInline(admin.TabularInline):
+    model = Application
+    fields = ['job_title', 'kcse_grade', 'status', 'applied_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+    ordering = ['-applied_at']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Candidate)
+class CandidateAdmin(admin.ModelAdmin):
+    list_display = ['id', 'full_name', 'email', 'phone', 'gender', 'age', 'application_count', 'last_applied_at']
+    search_fields = ['full_name', 'email', 'phone']
+    readonly_fields = ['full_name', 'email', 'phone', 'gender', 'age', 'last_applied_at', 'created_at', 'updated_at']
+    ordering = ['-last_applied_at']
+    inlines = [CandidateApplicationInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(application_total=Count('applications'))
+    
+    def application_count(self, obj):
+        return obj.application_total
+    application_count.short_description = 'Applications'
+    application_count.admin_order_field = 'application_total'
+    
+    def has_add_permission(self, request):
+        return False
+
+
+# ============================================
+# APPLICATION STATUS HISTORY (read only)
+# ============================================
+
+@admin.register(ApplicationStatusEvent)
+class ApplicationStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['application_id', 'job_id', 'from_status', 'to_status', 'changed_by', 'source', 'created_at']
+    list_filter = ['to_status', 'source', 'created_at']
+    search_fields = ['=application_id', '=job_id', 'changed_by']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ============================================
 # CUSTOMIZE ADMIN SITE
 # ============================================
@@ -0,0 +1,237 @@
+# ============================================
+# ADMIN SEARCH - Index-backed search for the applications changelist
+# ============================================
+#
+# Django's admin search ORs an icontains (LIKE '%term%') per search field
+# for every word, which no B-tree index can serve. search() sends each
+# kind of term down a path that an index can:
+#
+#   email   'jane.doe@', 'jane.doe@gmail.com'
+#           range scan on the LOWER(email) index (prefix or exact)
+#   phone   '0712 345 678', '+254712', '345678'
+#           a trigram substring match of the digits, plus a range scan on
+#           the phone_e164 index when the start of the number is known
+#   text    everything else, each word matched as a substring of the name,
+#           email, phone or job title, the way the admin always did.
+#           SQLite: the trigram FTS5 table jobs_application_search.
+#           Postgres: Django's own icontains, which the pg_trgm GIN
+#           indexes on UPPER(col) serve.
+#
+# Words shorter than a trigram fall back to icontains, ANDed with the
+# indexed words. When a text search finds nothing, a name spelled
+# slightly differently ('Wanjku' for 'Wanjiku') is looked for by trigram
+# similarity. Indexes are created by migration 0010_application_search.
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.text import smart_split, unescape_string_literal
+
+from .candidates import normalize_phone
+
+
+DEFAULT_FIELDS = ('full_name', 'email', 'phone', 'job_title')
+# Distinct names scored for a misspelt search
+FUZZY_CANDIDATES = 2000
+
+_PHONE_RE = re.compile(r'^\+?[\d\s().-]+$')
+_NON_DIGIT = re.compile(r'\D')
+
+
+def terms(search_term):
+    """Words of a search box entry, "quoted phrases" kept whole, as the admin splits them"""
+    words = []
+    for word in smart_split(search_term):
+        if word[0] in ('"', "'") and word[0] == word[-1] and len(word) > 1:
+            word = unescape_string_literal(word)
+        if word:
+            words.append(word)
+    return words
+
+
+def classify(search_term):
+    term = search_term.strip()
+    if '@' in term and not term.startswith('@') and not any(c.isspace() for c in term):
+        return 'email'
+    if _PHONE_RE.match(term) and len(_NON_DIGIT.sub('', term)) >= 3:
+        return 'phone'
+    return 'text'
+
+
+def phone_prefix(search_term):
+    """The E.164 start of a partly typed number, or '' if where it starts is unknown"""
+    term = search_term.strip()
+    digits = _NON_DIGIT.sub('', term)
+    if term.startswith('+') or digits.startswith('00'):
+        return normalize_phone(term) or '+' + digits.removeprefix('00')
+    if digits.startswith('0') and len(digits) > 1:
+        return normalize_phone(term) or '+' + getattr(settings, 'CANDIDATE_COUNTRY_CODE', '254') + digits[1:]
+    return ''
+
+
+# ============================================
+# TRIGRAMS
+# ============================================
+
+def _trigrams(word):
+    # Padded like pg_trgm, so the start and end of a word count double
+    padded = f'  {word.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query, name):
+    """
+    How closely `name` matches every word of `query`, 0 to 1: the trigram
+    (Jaccard) similarity of the worst-matched query word with its closest
+    word in the name. Words shorter than a trigram are ignored.
+    """
+    query_words = [word for word in re.findall(r'\w+', query) if len(word) >= 3]
+    name_words = [_trigrams(word) for word in re.findall(r'\w+', name)]
+    if not query_words or not name_words:
+        return 0.0
+    return min(
+        max(len(grams & other) / len(grams | other) for other in name_words)
+        for grams in map(_trigrams, query_words)
+    )
+
+
+def _fts5_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+# ============================================
+# PATHS
+# ============================================
+
+def _icontains(words, fields):
+    """Django's own admin search: every word in some field"""
+    return reduce(lambda a, b: a & b, [
+        reduce(or_, [Q(**{f'{field}__icontains': word}) for field in fields]) for word in words
+    ], Q())
+
+
+def scan(queryset, search_term, fields=DEFAULT_FIELDS):
+    """The unindexed icontains search, for comparison (bench_admin_search)"""
+    words = terms(search_term)
+    return queryset.filter(_icontains(words, fields)) if words else queryset
+
+
+def _email(queryset, search_term):
+    prefix = search_term.strip().lower()
+    return queryset.filter(
+        GreaterThanOrEqual(Lower('email'), prefix),
+        LessThan(Lower('email'), prefix + '\uffff'),
+    )
+
+
+def _phone(queryset, search_term, fields):
+    # Anywhere in the number, or in another field ('...247229@gmail.com'),
+    # as the admin finds it
+    digits = _NON_DIGIT.sub('', search_term)
+    if connection.vendor == 'sqlite':
+        anywhere = Q(id__in=RawSQL(
+            'SELECT rowid FROM jobs_application_search WHERE jobs_application_search MATCH %s',
+            [_fts5_phrase(digits)],
+        ))
+    else:
+        anywhere = Q(phone_e164__contains=digits) | _icontains([digits], fields)
+    prefix = phone_prefix(search_term)
+    if prefix:
+        # Also the number however it was written ('0712...' is +254712...);
+        # digits and '+' sort before ':'
+        return queryset.filter(Q(phone_e164__gte=prefix, phone_e164__lt=prefix + ':') | anywhere)
+    return queryset.filter(anywhere)
+
+
+def _text(queryset, search_term, fields):
+    words = terms(search_term)
+    if not words:
+        return queryset
+    if connection.vendor != 'sqlite':
+        return queryset.filter(_icontains(words, fields))
+    indexed = [word for word in words if len(word) >= 3]
+    short = [word for word in words if len(word) < 3]
+    if indexed:
+        queryset = queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM jobs_application_search WHERE jobs_application_search MATCH %s',
+            [' AND '.join(_fts5_phrase(word) for word in indexed)],
+        ))
+    if short:
+        queryset = queryset.filter(_icontains(short, fields))
+    return queryset
+
+
+def _similar_names(queryset, search_term, threshold):
+    words = [word for word in re.findall(r'\w+', search_term) if len(word) >= 3]
+    if not words:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        # word_similarity over the GIN index on UPPER(full_name::text)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(threshold)])
+        return queryset.filter(id__in=RawSQL(
+            'SELECT id FROM jobs_application WHERE UPPER(%s) <%% UPPER(full_name::text)',
+            [' '.join(words)],
+        ))
+    if connection.vendor != 'sqlite':
+        return queryset.none()
+    # Names sharing a 4-letter run (3 in short words) with each misspelt
+    # word and containing the words spelt right, scored here, then every
+    # row with one of those names
+    with connection.cursor() as cursor:
+        def found(expression, limit):
+            cursor.execute(
+                'SELECT DISTINCT full_name FROM jobs_application_search '
+                'WHERE jobs_application_search MATCH %s LIMIT %s',
+                ['full_name : (' + expression + ')', limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+        parts = []
+        for word in words:
+            if found(_fts5_phrase(word), 1):
+                parts.append(_fts5_phrase(word))
+            else:
+                # A short word has too few 4-letter runs to survive a typo
+                size = 4 if len(word) >= 6 else 3
+                runs = {word[i:i + size] for i in range(len(word) - size + 1)}
+                parts.append('(' + ' OR '.join(_fts5_phrase(run) for run in sorted(runs)) + ')')
+        names = [
+            name for name in found(' AND '.join(parts), FUZZY_CANDIDATES)
+            if similarity(search_term, name) >= threshold
+        ]
+    if not names:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        'SELECT rowid FROM jobs_application_search WHERE jobs_application_search MATCH %s',
+        ['full_name : (' + ' OR '.join(_fts5_phrase(name) for name in names) + ')'],
+    ))
+
+
+def search(queryset, search_term, fields=DEFAULT_FIELDS):
+    """
+    Applications in `queryset` matching `search_term`, as the admin's
+    icontains search finds them but served by indexes, except that an
+    email term matches addresses starting with it and a phone term also
+    finds the number however it was written. Returns (queryset, path)
+    where path is 'email', 'phone', 'text' or 'fuzzy'.
+    """
+    if not search_term.strip():
+        return queryset, ''
+    path = classify(search_term)
+    if path == 'email':
+        return _email(queryset, search_term), path
+    if path == 'phone':
+        return _phone(queryset, search_term, fields), path
+    results = _text(queryset, search_term, fields)
+    threshold = getattr(settings, 'ADMIN_SEARCH_FUZZY_THRESHOLD', 0.4)
+    if threshold and not results.exists():
+        return _similar_names(queryset, search_term, threshold), 'fuzzy'
+    return results, path
@@ -1,5 +1,33 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
 
 class JobsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'jobs'
\ No newline at end of file
+    name = 'jobs'
+
+    def ready(self):
+        from . import candidates, catalog, db, middleware, ranking, slowquery, snapshot
+        from .models import Application, Job, SiteContent, SiteSettings
+        connection_created.connect(db.configure_sqlite, dispatch_uid='jobs.db.configure_sqlite')
+        connection_created.connect(slowquery.install, dispatch_uid='jobs.slowquery')
+        connection_created.connect(middleware.install_query_counter, dispatch_uid='jobs.middleware.query_counter')
+
+        post_save.connect(catalog.bump_version, sender=Job, dispatch_uid='jobs.catalog.job_saved')
+        post_delete.connect(catalog.bump_version, sender=Job, dispatch_uid='jobs.catalog.job_deleted')
+        post_save.connect(catalog.invalidate_theme, sender=SiteSettings, dispatch_uid='jobs.catalog.theme_saved')
+        post_save.connect(catalog.invalidate_site_content, sender=SiteContent, dispatch_uid='jobs.catalog.content_saved')
+        post_save.connect(snapshot.schedule_publish, sender=Job, dispatch_uid='jobs.snapshot.job_saved')
+        post_delete.connect(snapshot.schedule_publish, sender=Job, dispatch_uid='jobs.snapshot.job_deleted')
+        post_save.connect(snapshot.schedule_publish, sender=SiteSettings, dispatch_uid='jobs.snapshot.theme_saved')
+        post_save.connect(snapshot.schedule_publish, sender=SiteContent, dispatch_uid='jobs.snapshot.content_saved')
+        post_save.connect(ranking.application_changed, sender=Application, dispatch_uid='jobs.ranking.application_saved')
+        post_delete.connect(ranking.application_changed, sender=Application, dispatch_uid='jobs.ranking.application_deleted')
+        post_save.connect(candidates.application_saved, sender=Application, dispatch_uid='jobs.candidates.application_saved')
+
+        # Servers only (gunicorn.conf.py turns it on); management commands skip it
+        if getattr(settings, 'WARMUP_ON_READY', False):
+            from . import warmup
+            warmup.warm_code()
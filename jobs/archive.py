@@ -0,0 +1,308 @@
+# ============================================
+# ARCHIVE - Old applications out of the hot table
+# ============================================
+#
+# archive() finds applications past ARCHIVE_RETENTION (days after
+# applied_at, per status) or whose job closed more than
+# ARCHIVE_CLOSED_JOB_DAYS ago, and moves them in batches:
+#
+#   ARCHIVE_DIR/applications/YYYY/MM/<run>-<batch>.jsonl.gz   one row per line
+#   ARCHIVE_DIR/applications/YYYY/MM/<run>-<batch>.manifest.json
+#   ARCHIVE_DIR/documents/<application id>/<field>/<file>.gz  its documents
+#
+# partitioned by the month the application was made. Each batch's files
+# are complete and on disk before its rows are deleted, and the media
+# files go only after the delete commits, so an interrupted run loses
+# nothing (at worst a batch is archived twice: restore skips rows that
+# exist, and an archived document is never overwritten, the second copy
+# gets a new name). Manifests carry who/what/when for each row, so staff can
+# search the archive without opening it; restore() brings rows and
+# documents back.
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core import serializers
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from . import candidates as candidate_linking
+from .db import serialized_write
+from .grades import grade_rank
+
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FIELDS = ('cv_document', 'id_document', 'certificate_document')
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def archive_root():
+    return Path(getattr(settings, 'ARCHIVE_DIR', '') or Path(settings.BASE_DIR) / 'archive')
+
+
+def candidates(now=None, statuses=None):
+    """Applications due for the archive under the retention settings"""
+    from .models import Application, Job
+    now = now or timezone.now()
+    due = Q()
+    for status, days in settings.ARCHIVE_RETENTION.items():
+        if statuses and status not in statuses:
+            continue
+        due |= Q(status=status, applied_at__lt=now - timedelta(days=days))
+    closed_days = getattr(settings, 'ARCHIVE_CLOSED_JOB_DAYS', None)
+    if closed_days is not None:
+        cutoff = now - timedelta(days=closed_days)
+        # job_id isn't a foreign key: jobs closed before the cutoff, or
+        # deleted (no date left, so go by when the application was made)
+        closed = Job.objects.filter(is_active=False, updated_at__lt=cutoff)
+        old_job = Q(job_id__in=closed.values('id')) | (
+            ~Q(job_id__in=Job.objects.values('id')) & Q(applied_at__lt=cutoff)
+        )
+        if statuses:
+            old_job &= Q(status__in=statuses)
+        due |= old_job
+    if not due:
+        return Application.objects.none()
+    return Application.objects.filter(due)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _create_exclusive(path):
+    """Open a new file at `path`, or at scan-2.pdf.gz etc. if it's taken; never replaces one"""
+    stem = path.name[:-len('.gz')]
+    for attempt in range(1, 1000):
+        target = path if attempt == 1 else path.with_name(f'{stem}-{attempt}.gz')
+        try:
+            return target, open(target, 'xb')
+        except FileExistsError:
+            continue
+    raise FileExistsError(f'no free archive name for {path}')
+
+
+def _archive_document(application, field, root):
+    """Gzip one document into cold storage; returns its manifest entry or None"""
+    name = getattr(application, field).name
+    if not name:
+        return None
+    if not default_storage.exists(name):
+        logger.warning('Archived application document missing', extra={
+            'application_id': application.id, 'document': name,
+        })
+        return {'field': field, 'name': name, 'archive': None}
+    # The fields upload to different folders, so basenames can clash
+    target = root / 'documents' / str(application.id) / field / (os.path.basename(name) + '.gz')
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target, handle = _create_exclusive(target)
+    with handle, default_storage.open(name, 'rb') as source, gzip.open(handle, 'wb') as out:
+        shutil.copyfileobj(source, out)
+    _fsync(target)
+    relative = target.relative_to(root)
+    return {
+        'field': field,
+        'name': name,
+        'archive': str(relative),
+        'size': default_storage.size(name),
+        'compressed_size': target.stat().st_size,
+    }
+
+
+def _write_partition(root, relative, applications, run_id):
+    """One archive file and its manifest for applications from the same month"""
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entries = []
+    all_documents = []
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        for application in applications:
+            documents = [doc for doc in (_archive_document(application, field, root) for field in DOCUMENT_FIELDS) if doc]
+            all_documents.extend(documents)
+            record = serializers.serialize('python', [application])[0]
+            record['documents'] = documents
+            out.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+            entries.append({
+                'id': application.id,
+                'job_id': application.job_id,
+                'job_title': application.job_title,
+                'full_name': application.full_name,
+                'email': application.email,
+                'status': application.status,
+                'applied_at': application.applied_at.isoformat(),
+                'documents': [doc['name'] for doc in documents],
+            })
+    _fsync(path)
+    archived_documents = [doc for doc in all_documents if doc['archive']]
+    manifest = {
+        'file': str(relative),
+        'run_id': run_id,
+        'created_at': timezone.now().isoformat(),
+        'count': len(entries),
+        'sha256': _sha256(path),
+        'bytes': path.stat().st_size,
+        'applied_from': min(entry['applied_at'] for entry in entries),
+        'applied_to': max(entry['applied_at'] for entry in entries),
+        'documents': len(archived_documents),
+        'document_bytes': sum(doc['size'] for doc in archived_documents),
+        'document_compressed_bytes': sum(doc['compressed_size'] for doc in archived_documents),
+        'records': entries,
+    }
+    manifest_path = path.with_name(path.name[:-len('.jsonl.gz')] + MANIFEST_SUFFIX)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    return manifest
+
+
+def archive(batch_size=500, dry_run=False, statuses=None, limit=None, now=None):
+    """
+    Move due applications to the archive. Returns a summary dict; with
+    dry_run, only counts what would go.
+    """
+    from .models import Application
+    queryset = candidates(now, statuses).order_by('id')
+    summary = {'applications': 0, 'files': [], 'documents': 0, 'document_bytes': 0, 'compressed_bytes': 0}
+    if dry_run:
+        summary['applications'] = queryset.count() if limit is None else min(queryset.count(), limit)
+        return summary
+
+    root = archive_root()
+    run_id = timezone.now().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+    last_id = 0
+    batch_number = 0
+    while limit is None or summary['applications'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - summary['applications'])
+        batch = list(queryset.filter(id__gt=last_id)[:size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        batch_number += 1
+
+        partitions = {}
+        for application in batch:
+            applied = application.applied_at
+            partitions.setdefault((applied.year, applied.month), []).append(application)
+        for (year, month), applications in sorted(partitions.items()):
+            relative = Path('applications') / f'{year:04d}' / f'{month:02d}' / f'{run_id}-{batch_number:04d}.jsonl.gz'
+            manifest = _write_partition(root, relative, applications, run_id)
+            summary['files'].append(manifest['file'])
+            summary['documents'] += manifest['documents']
+            summary['document_bytes'] += manifest['document_bytes']
+            summary['compressed_bytes'] += manifest['bytes'] + manifest['document_compressed_bytes']
+
+        ids = [application.id for application in batch]
+        with serialized_write():
+            Application.objects.filter(id__in=ids).delete()
+
+        # Only now that the rows are gone do the originals go
+        for application in batch:
+            for field in DOCUMENT_FIELDS:
+                name = getattr(application, field).name
+                if name:
+                    default_storage.delete(name)
+        summary['applications'] += len(batch)
+        logger.info('Archived application batch', extra={
+            'run_id': run_id, 'batch': batch_number, 'count': len(batch), 'last_id': last_id,
+        })
+    return summary
+
+
+def manifests():
+    """Every manifest in the archive, oldest partition first"""
+    root = archive_root() / 'applications'
+    for path in sorted(root.glob(f'*/*/*{MANIFEST_SUFFIX}')):
+        with open(path) as f:
+            yield json.load(f)
+
+
+def search(query='', status=None, job_id=None, limit=50):
+    """Archived applications whose name, email or job title contains `query`, newest first"""
+    query = query.strip().lower()
+    found = []
+    for manifest in manifests():
+        for entry in manifest['records']:
+            if status and entry['status'] != status:
+                continue
+            if job_id is not None and entry['job_id'] != job_id:
+                continue
+            if query and not (
+                query == str(entry['id'])
+                or query in entry['email'].lower()
+                or query in entry['full_name'].lower()
+                or query in entry['job_title'].lower()
+            ):
+                continue
+            found.append(dict(entry, archive=manifest['file']))
+    found.sort(key=lambda entry: entry['applied_at'], reverse=True)
+    return found[:limit]
+
+
+def _records(relative):
+    path = archive_root() / relative
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore(relative, ids=None, dry_run=False):
+    """
+    Put rows from one archive file (optionally only `ids`) back in the
+    Application table with their documents. Rows whose id is taken again
+    are skipped. Returns (restored ids, skipped ids).
+    """
+    from .models import Application
+    root = archive_root()
+    restored, skipped = [], []
+    for record in _records(relative):
+        if ids is not None and record['pk'] not in ids:
+            continue
+        if Application.objects.filter(pk=record['pk']).exists():
+            skipped.append(record['pk'])
+            continue
+        if dry_run:
+            restored.append(record['pk'])
+            continue
+        documents = record.pop('documents', [])
+        for doc in documents:
+            if not doc.get('archive'):
+                record['fields'][doc['field']] = ''
+                continue
+            with gzip.open(root / doc['archive'], 'rb') as source:
+                # The storage may pick a new name if the old one is taken
+                record['fields'][doc['field']] = default_storage.save(doc['name'], File(source))
+        with serialized_write():
+            for obj in serializers.deserialize('python', [record]):
+                # Raw saves skip Application.save(); older archives predate these
+                obj.object.grade_rank = grade_rank(obj.object.kcse_grade)
+                obj.object.phone_e164 = candidate_linking.normalize_phone(obj.object.phone)
+                # Its candidate may have been re-clustered away since; match again
+                obj.object.candidate_id = None
+                obj.save()
+                candidate_linking.link(obj.object)
+        restored.append(record['pk'])
+        logger.info('Restored archived application', extra={'application_id': record['pk'], 'archive': relative})
+    return restored, skipped
@@ -0,0 +1,228 @@
+# ============================================
+# BULK JOBS - Import and export job postings
+# ============================================
+#
+# import_jobs() reads CSV (header row) or JSONL, one posting per row,
+# validating each row against the Job fields as it streams past. Rows
+# with an `id` update that job; rows without one create a job. If every
+# row is valid (or skip_invalid is set) the writes run in one transaction
+# through bulk_create/bulk_update in batches of batch_size, and the
+# catalog version is bumped once at the end: bulk writes send no save
+# signals. export_jobs() streams postings back out in the same formats.
+
+import csv
+import io
+import json
+import logging
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalog, snapshot
+from .db import serialized_write
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl')
+IMPORT_FIELDS = (
+    'title', 'location', 'salary', 'contract', 'icon', 'description', 'responsibilities',
+    'requirements', 'benefits', 'workplace_photos', 'expiry_date', 'is_active', 'status',
+)
+EXPORT_FIELDS = ('id',) + IMPORT_FIELDS + ('created_at', 'updated_at')
+MAX_ERRORS = 100
+
+_validate_url = URLValidator()
+_BOOLEANS = {'true': True, '1': True, 'yes': True, 't': True, 'false': False, '0': False, 'no': False, 'f': False}
+
+
+def detect_format(name='', content_type=''):
+    """'csv' or 'jsonl' from a file name or content type (JSONL by default)"""
+    name, content_type = (name or '').lower(), (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return 'jsonl'
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'invalid JSON: {e}')
+            continue
+        yield number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+
+
+def _clean(field, value):
+    if field.name == 'is_active':
+        if isinstance(value, bool):
+            return value
+        normalized = str(value).strip().lower()
+        if normalized not in _BOOLEANS:
+            raise ValidationError('expected true or false')
+        return _BOOLEANS[normalized]
+    if field.name == 'workplace_photos':
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValidationError('expected a JSON list of URLs')
+        if not isinstance(value, list) or not all(isinstance(url, str) for url in value):
+            raise ValidationError('expected a JSON list of URLs')
+        for url in value:
+            _validate_url(url)
+        return value
+    # clean() runs the field's validators (URLs, max_length), not just to_python()
+    return field.clean(value.strip() if isinstance(value, str) else value, None)
+
+
+def validate_row(row):
+    """
+    Turn one raw row into (id or None, {field: value}). Missing optional
+    fields get the model default on create and are left alone on update.
+    Raises ValidationError with a message per field.
+    """
+    from .models import Job
+    errors = {}
+    raw_id = row.get('id')
+    job_id = None
+    if raw_id not in (None, ''):
+        try:
+            job_id = int(raw_id)
+        except (TypeError, ValueError):
+            errors['id'] = 'expected a number'
+    values = {}
+    for name in IMPORT_FIELDS:
+        field = Job._meta.get_field(name)
+        value = row.get(name)
+        if value is None or value == '':
+            required = not field.blank and not field.has_default() and not field.null
+            if required and job_id is None:
+                errors[name] = 'required'
+            continue
+        try:
+            values[name] = _clean(field, value)
+        except ValidationError as e:
+            errors[name] = '; '.join(e.messages)
+    if errors:
+        raise ValidationError(errors)
+    return job_id, values
+
+
+def import_jobs(stream, fmt='jsonl', batch_size=500, dry_run=False, skip_invalid=False):
+    """
+    Validate and write jobs from a text stream. Returns a summary with
+    created/updated counts and the first MAX_ERRORS row errors; nothing is
+    written if any row is invalid, unless skip_invalid.
+    """
+    from .models import Job
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+
+    creates, updates, errors = [], {}, []
+    rows = invalid = 0
+    for number, row in read_rows(stream, fmt):
+        rows += 1
+        try:
+            if isinstance(row, Exception):
+                raise ValidationError({'row': str(row)})
+            job_id, values = validate_row(row)
+        except ValidationError as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append({'line': number, 'errors': e.message_dict})
+            continue
+        if job_id is None:
+            creates.append(values)
+        else:
+            # The last row for an id wins
+            updates.setdefault(job_id, {}).update(values)
+
+    # Updates for jobs that don't exist are row errors too
+    ids = list(updates)
+    existing = set()
+    for offset in range(0, len(ids), batch_size):
+        existing.update(Job.objects.filter(id__in=ids[offset:offset + batch_size]).values_list('id', flat=True))
+    for job_id in sorted(set(ids) - existing):
+        invalid += 1
+        del updates[job_id]
+        if len(errors) < MAX_ERRORS:
+            errors.append({'line': None, 'errors': {'id': f'job {job_id} does not exist'}})
+
+    summary = {
+        'rows': rows,
+        'invalid': invalid,
+        'errors': errors,
+        'created': 0,
+        'updated': 0,
+        'dry_run': dry_run,
+    }
+    if dry_run or (invalid and not skip_invalid):
+        summary['would_create'], summary['would_update'] = len(creates), len(updates)
+        return summary
+
+    with serialized_write():
+        for offset in range(0, len(creates), batch_size):
+            Job.objects.bulk_create([Job(**values) for values in creates[offset:offset + batch_size]])
+        summary['created'] = len(creates)
+
+        # bulk_update sets the same columns on every row, so group the
+        # updates by which fields they touch
+        by_fields = {}
+        for job_id, values in updates.items():
+            by_fields.setdefault(tuple(sorted(values)), []).append(job_id)
+        now = timezone.now()
+        for fields, ids in by_fields.items():
+            for offset in range(0, len(ids), batch_size):
+                chunk = Job.objects.in_bulk(ids[offset:offset + batch_size])
+                for job_id, job in chunk.items():
+                    for name, value in updates[job_id].items():
+                        setattr(job, name, value)
+                    job.updated_at = now
+                Job.objects.bulk_update(list(chunk.values()), list(fields) + ['updated_at'])
+        summary['updated'] = len(updates)
+
+        if creates or updates:
+            transaction.on_commit(catalog.bump_version)
+            snapshot.schedule_publish()
+
+    logger.info('Jobs imported', extra={
+        'rows': rows, 'jobs_created': summary['created'], 'jobs_updated': summary['updated'], 'invalid': invalid,
+    })
+    return summary
+
+
+def export_jobs(fmt='jsonl', queryset=None):
+    """Yield the export a line (or CSV record) at a time"""
+    from .models import Job
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    queryset = (queryset if queryset is not None else Job.objects.all()).order_by('id').values(*EXPORT_FIELDS)
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for job in queryset.iterator(chunk_size=2000):
+            job['workplace_photos'] = json.dumps(job['workplace_photos'] or [])
+            writer.writerow(job)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for job in queryset.iterator(chunk_size=2000):
+        yield json.dumps(job, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -0,0 +1,425 @@
+# ============================================
+# CANDIDATES - One person across many applications
+# ============================================
+#
+# Each application is linked to a Candidate. Matching never compares all
+# pairs of applications. Every application yields blocking keys:
+#
+#   email  the address, trimmed and lowercased          (identifies)
+#   phone  E.164, national numbers taken as +254        (identifies)
+#   name   sorted Soundex codes of the name's words     (narrows only)
+#
+# kept in CandidateKey with an index on (kind, value). An application joins
+# the candidate that owns its email or phone. Failing that, it joins a
+# candidate from its name block whose name is nearly the same, with the
+# same gender and an age within a year, and whose contact details nearly
+# match too: the same email before the @, or a phone number one typo
+# away. A shared name alone is never enough. When the keys point at
+# several candidates they are the same person, and are merged into the
+# oldest.
+#
+# link() does this for each new application (post_save). cluster() rebuilds
+# every candidate in one pass, with union-find over the same keys (the
+# cluster_candidates command); a rebuilt candidate takes the id of its
+# first application. Both cost about one lookup per key per application.
+
+import difflib
+import logging
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .db import serialized_write
+
+
+logger = logging.getLogger(__name__)
+
+CONTACT_KINDS = ('email', 'phone')
+NAME_SIMILARITY = 0.85
+AGE_TOLERANCE = 1
+
+_NON_DIGIT = re.compile(r'\D')
+_NAME_WORD = re.compile(r'[a-z]+')
+_SOUNDEX = str.maketrans('bfpvcgjkqsxzdtlmnr', '111122222222334556')
+
+
+# ============================================
+# NORMALIZATION AND KEYS
+# ============================================
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value, country_code=None):
+    """
+    E.164 ('+254712345678') from the ways applicants write numbers:
+    '0712 345 678', '712345678', '254712345678', '+254-712-345678',
+    '00974...'. '' if it can't be a phone number.
+    """
+    country_code = country_code or getattr(settings, 'CANDIDATE_COUNTRY_CODE', '254')
+    text = (value or '').strip()
+    digits = _NON_DIGIT.sub('', text)
+    if text.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        # Trunk prefix of a national number
+        digits = country_code + digits[1:]
+    elif len(digits) == 9:
+        # National number without its 0
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return '+' + digits
+
+
+def _name_words(name):
+    return sorted(word for word in _NAME_WORD.findall((name or '').lower()) if len(word) > 1)
+
+
+def soundex(word):
+    """Four-character Soundex code ('Wanjiku' -> 'W522')"""
+    codes = word.translate(_SOUNDEX)
+    result = word[0].upper()
+    last = codes[0]
+    for letter, code in zip(word[1:], codes[1:]):
+        if code.isdigit():
+            if code != last:
+                result += code
+            last = code
+        elif letter not in 'hw':
+            # A vowel separates two letters with the same code; h and w don't
+            last = ''
+    return (result + '000')[:4]
+
+
+def name_key(name):
+    """Order-insensitive phonetic key, or '' for a single word (too common to block on)"""
+    words = _name_words(name)
+    if len(words) < 2:
+        return ''
+    return ' '.join(sorted(soundex(word) for word in words))
+
+
+def blocking_keys(email, phone, full_name):
+    """[(kind, value)] for one application"""
+    keys = [
+        ('email', normalize_email(email)),
+        ('phone', normalize_phone(phone)),
+    ]
+    if getattr(settings, 'CANDIDATE_MATCH_NAMES', True):
+        keys.append(('name', name_key(full_name)))
+    return [(kind, value) for kind, value in keys if value]
+
+
+def _email_user(email):
+    return email.split('@', 1)[0].replace('.', '') if email else ''
+
+
+def _one_typo_apart(a, b):
+    """Same length and at most one wrong digit, or two neighbours swapped"""
+    if len(a) != len(b):
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    if len(diff) <= 1:
+        return True
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+def _contacts(keys):
+    """([emails], [phones]) from blocking keys"""
+    return (
+        [value for kind, value in keys if kind == 'email'],
+        [value for kind, value in keys if kind == 'phone'],
+    )
+
+
+def contacts_close(emails, phones, other_emails, other_phones):
+    """Whether two sets of normalized contact details are plausibly one person's"""
+    users = {_email_user(email) for email in emails} - {''}
+    if users & {_email_user(email) for email in other_emails}:
+        return True
+    return any(_one_typo_apart(phone, other) for phone in phones for other in other_phones)
+
+
+def same_person(name, gender, age, other_name, other_gender, other_age):
+    """Name, gender and age agree (the contact details are checked separately)"""
+    if (gender or '').strip().lower() != (other_gender or '').strip().lower():
+        return False
+    if age is not None and other_age is not None and abs(age - other_age) > AGE_TOLERANCE:
+        return False
+    ratio = difflib.SequenceMatcher(None, ' '.join(_name_words(name)), ' '.join(_name_words(other_name))).ratio()
+    return ratio >= NAME_SIMILARITY
+
+
+# ============================================
+# INCREMENTAL LINKING
+# ============================================
+
+def _matching_candidates(application, keys):
+    from django.db.models import Q
+    from .models import Candidate, CandidateKey
+    contact = Q()
+    for kind, value in keys:
+        if kind in CONTACT_KINDS:
+            contact |= Q(kind=kind, value=value)
+    ids = set()
+    if contact:
+        ids.update(CandidateKey.objects.filter(contact).values_list('candidate_id', flat=True))
+    if ids:
+        return ids
+    names = [value for kind, value in keys if kind == 'name']
+    if not names:
+        return ids
+    block = Candidate.objects.filter(
+        id__in=CandidateKey.objects.filter(kind='name', value=names[0]).values('candidate_id'),
+        gender__iexact=(application.gender or '').strip(),
+    )
+    if application.age is not None:
+        block = block.filter(age__range=(application.age - AGE_TOLERANCE, application.age + AGE_TOLERANCE))
+    similar = [
+        candidate.id for candidate in block.only('full_name', 'gender', 'age')
+        if same_person(application.full_name, application.gender, application.age,
+                       candidate.full_name, candidate.gender, candidate.age)
+    ]
+    if not similar:
+        return ids
+    contacts = {}
+    for candidate_id, kind, value in CandidateKey.objects.filter(
+            candidate_id__in=similar, kind__in=CONTACT_KINDS).values_list('candidate_id', 'kind', 'value'):
+        contacts.setdefault(candidate_id, {'email': [], 'phone': []})[kind].append(value)
+    emails, phones = _contacts(keys)
+    for candidate_id, theirs in contacts.items():
+        if contacts_close(emails, phones, theirs['email'], theirs['phone']):
+            ids.add(candidate_id)
+    return ids
+
+
+def merge(target, others):
+    """Fold candidates `others` (ids) into `target`"""
+    from .models import Application, Candidate, CandidateKey
+    others = [other for other in others if other != target.id]
+    if not others:
+        return
+    Application.objects.filter(candidate_id__in=others).update(candidate=target)
+    have = CandidateKey.objects.filter(candidate=target, kind='name').values('value')
+    CandidateKey.objects.filter(candidate_id__in=others, kind='name', value__in=have).delete()
+    CandidateKey.objects.filter(candidate_id__in=others).update(candidate=target)
+    Candidate.objects.filter(id__in=others).delete()
+    logger.info('Candidates merged', extra={'candidate_id': target.id, 'merged_ids': others})
+
+
+def _link(application):
+    from .models import Application, Candidate, CandidateKey
+    keys = blocking_keys(application.email, application.phone, application.full_name)
+    ids = sorted(_matching_candidates(application, keys))
+    if ids:
+        candidate = Candidate.objects.get(id=ids[0])
+        merge(candidate, ids[1:])
+    else:
+        candidate = Candidate()
+    # The latest application's details describe the candidate
+    if candidate.last_applied_at is None or application.applied_at >= candidate.last_applied_at:
+        candidate.full_name = application.full_name
+        candidate.email = normalize_email(application.email)
+        candidate.phone = normalize_phone(application.phone)
+        candidate.gender = application.gender
+        candidate.age = application.age
+        candidate.last_applied_at = application.applied_at
+    candidate.save()
+
+    Application.objects.filter(id=application.id).update(candidate=candidate)
+    application.candidate = candidate
+    have = set(CandidateKey.objects.filter(candidate=candidate).values_list('kind', 'value'))
+    CandidateKey.objects.bulk_create([
+        CandidateKey(candidate=candidate, kind=kind, value=value)
+        for kind, value in keys if (kind, value) not in have
+    ])
+    return candidate
+
+
+def link(application):
+    """Attach an application to its candidate, creating or merging candidates as needed"""
+    for attempt in range(3):
+        try:
+            with transaction.atomic():
+                return _link(application)
+        except IntegrityError:
+            # Another request claimed the same email or phone first; match again
+            if attempt == 2:
+                raise
+
+
+def application_saved(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver for Application: link new applications"""
+    if created and not raw:
+        link(instance)
+
+
+def link_missing(batch_size=500):
+    """Link applications that have no candidate (bulk inserts send no signals). Returns the count."""
+    from .models import Application
+    linked = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Application.objects.filter(candidate__isnull=True, id__gt=last_id).order_by('id')
+            .only('id', 'full_name', 'email', 'phone', 'gender', 'age', 'applied_at')[:batch_size]
+        )
+        if not batch:
+            return linked
+        with serialized_write():
+            for application in batch:
+                link(application)
+        last_id = batch[-1].id
+        linked += len(batch)
+
+
+# ============================================
+# BATCH RE-CLUSTERING
+# ============================================
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def add(self, item):
+        self.parent[item] = item
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # The oldest application is the root
+            self.parent[max(a, b)] = min(a, b)
+
+
+def _rewrite(clusters, details, app_keys, batch_size):
+    """
+    Replace every candidate with `clusters`. Each candidate takes the id of
+    its first application. Written with executemany: at this size, model
+    instances and the delete collector cost more than the database.
+    """
+    from django.core.management.color import no_style
+    from django.db import connection
+    from .models import Application, Candidate, CandidateKey
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(timezone.now())
+
+    def table(model):
+        return quote(model._meta.db_table)
+
+    def insert(model, columns):
+        return 'INSERT INTO {} ({}) VALUES ({})'.format(
+            table(model), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns)),
+        )
+
+    candidate_sql = insert(Candidate, [
+        'id', 'full_name', 'email', 'phone', 'gender', 'age', 'last_applied_at', 'created_at', 'updated_at',
+    ])
+    key_sql = insert(CandidateKey, ['candidate_id', 'kind', 'value'])
+    link_sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(table(Application), quote('candidate_id'), quote('id'))
+
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE {} SET {} = NULL'.format(table(Application), quote('candidate_id')))
+        cursor.execute('DELETE FROM {}'.format(table(CandidateKey)))
+        cursor.execute('DELETE FROM {}'.format(table(Candidate)))
+
+        roots = sorted(clusters)
+        for offset in range(0, len(roots), batch_size):
+            candidates, links, keys = [], [], []
+            for root in roots[offset:offset + batch_size]:
+                members = clusters[root]
+                latest = max(members, key=lambda app_id: (details[app_id][5], app_id))
+                name, email, phone, gender, age, applied_at = details[latest]
+                candidates.append((
+                    root, name, normalize_email(email), normalize_phone(phone), gender, age,
+                    adapt(applied_at), now, now,
+                ))
+                seen = set()
+                for app_id in members:
+                    links.append((root, app_id))
+                    for key in app_keys[app_id]:
+                        if key not in seen:
+                            seen.add(key)
+                            keys.append((root, key[0], key[1]))
+            cursor.executemany(candidate_sql, candidates)
+            cursor.executemany(link_sql, links)
+            cursor.executemany(key_sql, keys)
+
+        # Explicit ids don't move Postgres' sequence; new candidates must come after them
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Candidate]):
+            cursor.execute(sql)
+
+
+def cluster(batch_size=1000, dry_run=False):
+    """
+    Recompute every candidate from scratch. Returns {'applications',
+    'candidates', 'merged'}; with dry_run nothing is written.
+    """
+    from .models import Application
+    sets = _DisjointSet()
+    owners = {}      # contact key -> first application with it
+    blocks = {}      # (name key, gender, age) -> [application id]
+    details = {}     # application id -> (name, email, phone, gender, age, applied_at)
+    app_keys = {}
+
+    rows = (
+        Application.objects.order_by('id')
+        .values_list('id', 'full_name', 'email', 'phone', 'gender', 'age', 'applied_at')
+        .iterator(chunk_size=5000)
+    )
+    for app_id, name, email, phone, gender, age, applied_at in rows:
+        sets.add(app_id)
+        details[app_id] = (name, email, phone, gender, age, applied_at)
+        keys = app_keys[app_id] = blocking_keys(email, phone, name)
+        for key in keys:
+            if key[0] in CONTACT_KINDS:
+                if key in owners:
+                    sets.union(app_id, owners[key])
+                else:
+                    owners[key] = app_id
+        names = [value for kind, value in keys if kind == 'name']
+        if not names:
+            continue
+        # Only people of the same gender and (nearly) the same age are compared
+        gender_key = (gender or '').strip().lower()
+        ages = [None] if age is None else range(age - AGE_TOLERANCE, age + AGE_TOLERANCE + 1)
+        for block_age in ages:
+            for other_id in blocks.get((names[0], gender_key, block_age), ()):
+                # Cheap contact check first; most people in a block are strangers
+                if not contacts_close(*_contacts(keys), *_contacts(app_keys[other_id])):
+                    continue
+                other = details[other_id]
+                if same_person(name, gender, age, other[0], other[3], other[4]):
+                    sets.union(app_id, other_id)
+        blocks.setdefault((names[0], gender_key, age), []).append(app_id)
+
+    clusters = {}
+    for app_id in details:
+        clusters.setdefault(sets.find(app_id), []).append(app_id)
+    summary = {
+        'applications': len(details),
+        'candidates': len(clusters),
+        'merged': len(details) - len(clusters),
+    }
+    if dry_run:
+        return summary
+
+    with serialized_write():
+        _rewrite(clusters, details, app_keys, batch_size)
+
+    logger.info('Candidates re-clustered', extra=summary)
+    return summary
@@ -0,0 +1,181 @@
+# ============================================
+# CATALOG CACHE - Public job listings, site content and theme
+# ============================================
+#
+# The public endpoints serve the same few rows to every visitor, so the
+# serialized data is cached (CACHES['default'], shared by all workers).
+# Job entries are keyed by a catalog version. Any change to a Job bumps
+# the version, which retires every cached listing at once, including
+# after bulk updates that never send signals (call bump_version()).
+# A version is a random token, not a counter: two bumps racing each other,
+# or the version key being culled or cleared, only ever lead to a new
+# version, never back to one whose entries may be stale.
+#
+# Each getter has a sync and an async (a*) twin for the sync and async
+# views. With Redis the async cache calls are native; FileBasedCache
+# runs them in a thread like any sync call. Misses are filled from the
+# primary: a lagging replica could otherwise pin stale rows in the cache
+# for TIMEOUT.
+
+import uuid
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+TIMEOUT = 300
+VERSION_KEY = 'catalog:version'
+THEME_KEY = 'catalog:theme'
+SITE_CONTENT_KEY = 'catalog:site_content'
+
+# Cached in place of a job that doesn't exist or isn't active
+MISSING = 'missing'
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'title': job.title,
+        'location': job.location,
+        'salary': job.salary,
+        'contract': job.contract,
+        'icon': job.icon or '💼',
+        'description': job.description,
+        'responsibilities': job.responsibilities,
+        'requirements': job.requirements,
+        'benefits': job.benefits,
+        'workplace_photos': job.workplace_photos or [],
+        'expiry_date': job.expiry_date.isoformat() if job.expiry_date else None,
+        'created_at': job.created_at.isoformat(),
+    }
+
+
+def _active_jobs():
+    from .models import Job
+    return Job.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).order_by('-created_at')
+
+
+def _jobs_key(version):
+    return f'catalog:v{version}:jobs'
+
+
+def _job_key(version, job_id):
+    return f'catalog:v{version}:job:{job_id}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def bump_version(**kwargs):
+    """Invalidate every cached job listing (also usable as a signal receiver)"""
+    cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def invalidate_theme(**kwargs):
+    cache.delete(THEME_KEY)
+
+
+def invalidate_site_content(**kwargs):
+    cache.delete(SITE_CONTENT_KEY)
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, _new_version, timeout=None)
+
+
+async def _aversion():
+    return await cache.aget_or_set(VERSION_KEY, _new_version, timeout=None)
+
+
+# Jobs
+
+def get_jobs(fresh=False):
+    """Every active job's data; fresh=True reads the database even on a cache hit"""
+    key = _jobs_key(_version())
+    jobs = None if fresh else cache.get(key)
+    if jobs is None:
+        jobs = [serialize_job(job) for job in _active_jobs()]
+        cache.set(key, jobs, TIMEOUT)
+    return jobs
+
+
+async def aget_jobs():
+    key = _jobs_key(await _aversion())
+    jobs = await cache.aget(key)
+    if jobs is None:
+        jobs = [serialize_job(job) async for job in _active_jobs()]
+        await cache.aset(key, jobs, TIMEOUT)
+    return jobs
+
+
+def get_job(job_id):
+    """One active job's data, or None"""
+    key = _job_key(_version(), job_id)
+    job = cache.get(key)
+    if job is None:
+        found = _active_jobs().filter(id=job_id).first()
+        job = serialize_job(found) if found else MISSING
+        cache.set(key, job, TIMEOUT)
+    return None if job == MISSING else job
+
+
+async def aget_job(job_id):
+    key = _job_key(await _aversion(), job_id)
+    job = await cache.aget(key)
+    if job is None:
+        found = await _active_jobs().filter(id=job_id).afirst()
+        job = serialize_job(found) if found else MISSING
+        await cache.aset(key, job, TIMEOUT)
+    return None if job == MISSING else job
+
+
+def prefill():
+    """Load the job list, every active job, site content and theme into the cache"""
+    jobs = get_jobs()
+    version = _version()
+    cache.set_many({_job_key(version, job['id']): job for job in jobs}, TIMEOUT)
+    get_site_content()
+    get_theme()
+    return len(jobs)
+
+
+# Site content
+
+def get_site_content(fresh=False):
+    content = None if fresh else cache.get(SITE_CONTENT_KEY)
+    if content is None:
+        from .models import SiteContent
+        row = SiteContent.objects.using(DEFAULT_DB_ALIAS).filter(pk=1).first()
+        if row is None:
+            row, created = SiteContent.objects.get_or_create(pk=1)
+        content = {
+            'site_name': row.site_name,
+            'site_logo': row.site_logo.url if row.site_logo else None,
+            'hero_title': row.hero_title,
+            'hero_subtitle': row.hero_subtitle,
+            'about_text': row.about_text,
+            'contact_email': row.contact_email,
+            'contact_phone': row.contact_phone,
+        }
+        cache.set(SITE_CONTENT_KEY, content, TIMEOUT)
+    return content
+
+
+# Theme
+
+def get_theme(fresh=False):
+    theme = None if fresh else cache.get(THEME_KEY)
+    if theme is None:
+        from .models import SiteSettings
+        theme = SiteSettings.get_settings(using=DEFAULT_DB_ALIAS).get_theme_dict()
+        cache.set(THEME_KEY, theme, TIMEOUT)
+    return theme
+
+
+async def aget_theme():
+    theme = await cache.aget(THEME_KEY)
+    if theme is None:
+        from .models import SiteSettings
+        theme = (await SiteSettings.aget_settings(using=DEFAULT_DB_ALIAS)).get_theme_dict()
+        await cache.aset(THEME_KEY, theme, TIMEOUT)
+    return theme
@@ -0,0 +1,258 @@
+# ============================================
+# CV TEXT - Extraction for full-text search
+# ============================================
+#
+# The extract_cv_text command finds applications whose CV has no CVText
+# row yet (or a row for a file that has since been replaced), parses the
+# files in a process pool and writes the text back a batch at a time.
+# Parsing is CPU-bound and a broken PDF can take pypdf a while, so it runs
+# in separate processes; only the writes go through serialized_write().
+# A file still parsing after CV_TEXT_TIMEOUT seconds is recorded as
+# 'failed' and the pool replaced, since its worker is stuck on it.
+#
+# extract() is a plain function of a path: no ORM, no settings, so it can
+# run in a freshly spawned worker without setting Django up.
+#
+# Supported: PDFs with a text layer (pypdf), .docx (the XML inside the
+# zip), and plain text. Scanned PDFs come out 'empty'; anything else is
+# 'unsupported'. On SQLite, triggers on jobs_cvtext keep the FTS5 index in
+# step; on Postgres the tsvector column is generated (see 0009_cvtext).
+
+import logging
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from . import metrics
+from .db import serialized_write
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHARS = 100000
+TEXT_EXTENSIONS = ('.txt', '.text', '.md', '.csv')
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_SPACES_RE = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n+')
+
+
+def _clean(text, max_chars):
+    # NUL can't be stored in a Postgres text column
+    text = text.replace('\x00', '')
+    text = _SPACES_RE.sub(' ', text)
+    text = _BLANK_LINES_RE.sub('\n\n', text)
+    return text.strip()[:max_chars]
+
+
+def _pdf_text(path, max_chars):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        # Most "encrypted" CVs only restrict printing and open with no password
+        reader.decrypt('')
+    parts = []
+    size = 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        size += len(text)
+        if size >= max_chars:
+            break
+    return '\n'.join(parts)
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in root.iter(f'{_WORD_NS}p'):
+        paragraphs.append(''.join(node.text or '' for node in paragraph.iter(f'{_WORD_NS}t')))
+    return '\n'.join(paragraphs)
+
+
+def _plain_text(path, max_chars):
+    # Four bytes per character at most in UTF-8
+    with open(path, 'rb') as f:
+        raw = f.read(max_chars * 4)
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def extract(path, max_chars=DEFAULT_MAX_CHARS):
+    """
+    Text of the CV at `path` as (status, text, error), status being one of
+    CVText.STATUS_CHOICES. Never raises.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.pdf':
+            text = _pdf_text(path, max_chars)
+        elif extension == '.docx':
+            text = _docx_text(path)
+        elif extension in TEXT_EXTENSIONS:
+            text = _plain_text(path, max_chars)
+        else:
+            return 'unsupported', '', f'No text extractor for {extension or "files without an extension"}'
+    except Exception as e:
+        return 'failed', '', f'{type(e).__name__}: {e}'[:500]
+    text = _clean(text, max_chars)
+    return ('done' if text else 'empty'), text, ''
+
+
+def _pool(workers):
+    # Spawned, not forked: the parent holds database connections and the
+    # log listener thread, neither of which survive a fork cleanly
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+
+
+def _terminate(executor):
+    """Stop a pool whose worker is stuck on a file; shutdown() alone would wait for it"""
+    if hasattr(executor, 'terminate_workers'):  # Python 3.14+
+        executor.terminate_workers()
+        return
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def _extract_row(row):
+    """Worker entry point: (application id, file name, path, max chars) -> result row"""
+    app_id, name, path, max_chars = row
+    if not os.path.exists(path):
+        return app_id, name, 'failed', '', 'File is missing'
+    return (app_id, name) + extract(path, max_chars)
+
+
+# ============================================
+# SELECTION AND WRITES
+# ============================================
+
+def pending(retry_failed=False):
+    """Applications with a CV whose text hasn't been extracted from that file"""
+    from .models import Application
+    stale = Q(cv_text__isnull=True) | ~Q(cv_text__source=F('cv_document'))
+    if retry_failed:
+        stale |= Q(cv_text__status='failed')
+    return (
+        Application.objects.exclude(cv_document__isnull=True).exclude(cv_document='')
+        .filter(stale).order_by('id')
+    )
+
+
+def purge_orphans():
+    """Drop text whose CV has been removed from the application. Returns the count."""
+    from .models import CVText
+    with serialized_write():
+        deleted, _ = CVText.objects.filter(
+            Q(application__cv_document__isnull=True) | Q(application__cv_document='')
+        ).delete()
+    return deleted
+
+
+def _save(results):
+    from .models import CVText
+    rows = [
+        CVText(application_id=app_id, source=name, status=status, text=text, error=error)
+        for app_id, name, status, text, error in results
+    ]
+    with serialized_write():
+        CVText.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['application'],
+            update_fields=['source', 'status', 'text', 'error', 'extracted_at'],
+        )
+    counts = {}
+    for row in rows:
+        counts[row.status] = counts.get(row.status, 0) + 1
+    for status, count in counts.items():
+        metrics.inc('greentara_cv_text_extracted_total', {'status': status}, amount=count)
+    return counts
+
+
+def _parse(executor, workers, rows, timeout):
+    """
+    Results for `rows`, in order, from the pool. Returns (results, executor):
+    after a timeout the pool is replaced and files it hadn't finished are
+    sent to the new one.
+    """
+    results = [None] * len(rows)
+    todo = list(range(len(rows)))
+    while todo:
+        futures = [(i, executor.submit(_extract_row, rows[i])) for i in todo]
+        todo = []
+        for position, (i, future) in enumerate(futures):
+            try:
+                results[i] = future.result(timeout=timeout)
+            except TimeoutError:
+                app_id, name = rows[i][:2]
+                logger.warning('CV text extraction timed out', extra={'application_id': app_id, 'cv': name})
+                results[i] = (app_id, name, 'failed', '', f'Timed out after {timeout}s')
+                _terminate(executor)
+                executor = _pool(workers)
+                for j, other in futures[position + 1:]:
+                    if other.done() and not other.cancelled() and other.exception() is None:
+                        results[j] = other.result()
+                    else:
+                        todo.append(j)
+                break
+    return results, executor
+
+
+def run(workers=None, batch_size=100, limit=None, retry_failed=False, timeout=None):
+    """
+    Extract every pending CV, `batch_size` files per write, giving each file
+    `timeout` seconds (default CV_TEXT_TIMEOUT). workers=0 parses in this
+    process, with no timeout. Returns {'extracted', 'by_status', 'seconds'}.
+    """
+    from django.core.files.storage import default_storage
+    if workers is None:
+        workers = getattr(settings, 'CV_TEXT_WORKERS', 2)
+    if timeout is None:
+        timeout = getattr(settings, 'CV_TEXT_TIMEOUT', 60)
+    max_chars = getattr(settings, 'CV_TEXT_MAX_CHARS', DEFAULT_MAX_CHARS)
+    started = time.monotonic()
+    summary = {'extracted': 0, 'by_status': {}}
+
+    executor = _pool(workers) if workers else None
+    try:
+        last_id = 0
+        while limit is None or summary['extracted'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - summary['extracted'])
+            batch = list(
+                pending(retry_failed).filter(id__gt=last_id).values_list('id', 'cv_document')[:size]
+            )
+            if not batch:
+                break
+            rows = [(app_id, name, default_storage.path(name), max_chars) for app_id, name in batch]
+            if executor:
+                results, executor = _parse(executor, workers, rows, timeout)
+            else:
+                results = [_extract_row(row) for row in rows]
+            for status, count in _save(results).items():
+                summary['by_status'][status] = summary['by_status'].get(status, 0) + count
+            summary['extracted'] += len(results)
+            last_id = batch[-1][0]
+    finally:
+        if executor:
+            executor.shutdown()
+
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    if summary['extracted']:
+        logger.info('CV text extracted', extra={
+            'extracted_count': summary['extracted'],
+            'by_status': summary['by_status'],
+            'seconds': summary['seconds'],
+        })
+    return summary
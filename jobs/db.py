@@ -0,0 +1,161 @@
+# ============================================
+# DATABASE - SQLite tuning, serialized writes and pool stats
+# ============================================
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import metrics, worker_state
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+POOL_SNAPSHOT_KIND = 'dbpool'
+POOL_FLUSH_INTERVAL = 5.0
+
+_write_lock = threading.Lock()
+_local = threading.local()
+_lock_files = {}
+_last_pool_flush = 0.0
+
+# A flock is shared by every process holding the same open file, so a
+# forked worker must open its own
+os.register_at_fork(after_in_child=_lock_files.clear)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver: apply SQLITE_PRAGMAS to each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    if str(connection.settings_dict['NAME']) == str(settings.BASE_DIR / 'db.sqlite3'):
+        # The db.sqlite3 checked into the repo keeps its rollback journal:
+        # WAL would rewrite its header and leave -wal/-shm files beside it
+        pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_memory_db(connection):
+    name = str(connection.settings_dict['NAME'])
+    return name == ':memory:' or 'mode=memory' in name
+
+
+def _lock_file(connection):
+    """One open lock file per SQLite database, shared by every thread in the process"""
+    path = f"{connection.settings_dict['NAME']}.write-lock"
+    handle = _lock_files.get(path)
+    if handle is None:
+        handle = _lock_files[path] = open(path, 'a')
+    return handle
+
+
+@contextmanager
+def serialized_write(using=DEFAULT_DB_ALIAS):
+    """
+    Run a block of writes in a transaction, one writer at a time.
+
+    On SQLite, threads in this process queue on a lock and processes on
+    this host queue on a flock() next to the database file, so writers
+    wait their turn instead of spinning on "database is locked". Other
+    backends just get a transaction. Nested calls reuse the outer lock.
+    """
+    connection = connections[using]
+    depth = getattr(_local, 'depth', 0)
+    if connection.vendor != 'sqlite' or depth:
+        _local.depth = depth + 1
+        try:
+            with transaction.atomic(using=using):
+                yield
+        finally:
+            _local.depth = depth
+        return
+
+    started = time.perf_counter()
+    with _write_lock:
+        handle = _lock_file(connection) if fcntl and not is_memory_db(connection) else None
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        metrics.observe('greentara_db_write_wait_seconds', time.perf_counter() - started)
+        _local.depth = 1
+        try:
+            with transaction.atomic(using=using):
+                yield
+        finally:
+            _local.depth = 0
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def sqlite_status(using=DEFAULT_DB_ALIAS):
+    """Current values of the tuned pragmas, for diagnostics"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return {}
+    status = {}
+    with connection.cursor() as cursor:
+        for name in getattr(settings, 'SQLITE_PRAGMAS', {}):
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            status[name] = row[0] if row else None
+    status['path'] = os.fspath(connection.settings_dict['NAME'])
+    return status
+
+
+def pool_stats():
+    """psycopg pool counters for every alias whose pool is open in this process"""
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            continue
+        # Not connection.pool: that would build a pool for an unused alias
+        pool = getattr(connection, '_connection_pools', {}).get(alias)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def flush_pool_stats(force=False):
+    """Publish this worker's pool stats for `manage.py db_pool_stats`, at most every POOL_FLUSH_INTERVAL"""
+    global _last_pool_flush
+    now = time.monotonic()
+    if not force and now - _last_pool_flush < POOL_FLUSH_INTERVAL:
+        return
+    _last_pool_flush = now
+    stats = pool_stats()
+    if stats:
+        worker_state.write_snapshot(POOL_SNAPSHOT_KIND, {'ts': time.time(), 'pools': stats})
+
+
+def collect_pool_stats(max_age=60):
+    """
+    Pool stats per worker and per alias, summed per alias. Workers that
+    haven't published for max_age seconds are assumed gone.
+    """
+    snapshots = worker_state.read_snapshots(POOL_SNAPSHOT_KIND, exclude_pid=os.getpid())
+    local = pool_stats()
+    if local:
+        snapshots[os.getpid()] = {'ts': time.time(), 'pools': local}
+
+    now = time.time()
+    workers = []
+    totals = {}
+    for pid, data in sorted(snapshots.items()):
+        if now - data.get('ts', 0) > max_age:
+            continue
+        workers.append({'pid': pid, 'age': now - data['ts'], 'pools': data['pools']})
+        for alias, stats in data['pools'].items():
+            merged = totals.setdefault(alias, {})
+            for key, value in stats.items():
+                merged[key] = merged.get(key, 0) + value
+    return workers, totals
@@ -0,0 +1,54 @@
+# ============================================
+# JOB EXPIRY - Deactivate postings past their expiry_date
+# ============================================
+#
+# sweep() turns off every active job whose expiry_date has passed in one
+# UPDATE (job_active_expiry_idx finds them), marks them status='expired'
+# so it's clear why they went, and bumps the catalog version once. Run it
+# from the expire_jobs command, on a schedule or with --loop.
+
+import logging
+
+from django.utils import timezone
+
+from . import catalog, metrics, snapshot
+from .db import serialized_write
+
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_STATUS = 'expired'
+
+
+def expired_jobs(today=None):
+    """Active jobs whose last day (expiry_date) is before `today`"""
+    from .models import Job
+    today = today or timezone.localdate()
+    return Job.objects.filter(is_active=True, expiry_date__lt=today)
+
+
+def sweep(today=None, dry_run=False):
+    """
+    Deactivate expired jobs. Returns a list of {'id', 'title',
+    'expiry_date'} for the jobs that were (or, with dry_run, would be)
+    turned off.
+    """
+    today = today or timezone.localdate()
+    with serialized_write():
+        queryset = expired_jobs(today)
+        changed = list(queryset.order_by('expiry_date', 'id').values('id', 'title', 'expiry_date'))
+        if changed and not dry_run:
+            # Bulk update: no save() signals, so the catalog is bumped below
+            queryset.update(is_active=False, status=EXPIRED_STATUS, updated_at=timezone.now())
+
+    if changed and not dry_run:
+        catalog.bump_version()
+        snapshot.schedule_publish()
+        metrics.inc('greentara_jobs_expired_total', amount=len(changed))
+    logger.info('Job expiry sweep', extra={
+        'today': today.isoformat(),
+        'dry_run': dry_run,
+        'expired_count': len(changed),
+        'job_ids': [job['id'] for job in changed],
+    })
+    return changed
@@ -0,0 +1,177 @@
+# ============================================
+# FULL-TEXT SEARCH - Ranked search over extracted CV text
+# ============================================
+#
+# search_cv() asks whichever index the database has (created by migration
+# 0009_cvtext):
+#
+# - SQLite: the FTS5 table jobs_cvtext_fts, ranked by bm25. The search box
+#   syntax is turned into an FTS5 expression by fts5_query(), so user
+#   input can't produce an FTS5 syntax error.
+# - Postgres: the generated search_vector column (GIN indexed), matched
+#   with websearch_to_tsquery and ranked by ts_rank_cd.
+# - Anything else: an unranked icontains scan, so it still works.
+#
+# The same search box syntax works everywhere: words are ANDed, "quoted
+# phrases" match in order, OR between terms, -word excludes.
+
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+
+# Snippet highlight markers; swapped for <mark> once the text is escaped
+_START, _STOP = '\x02', '\x03'
+_TERM_RE = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+MAX_LIMIT = 500
+
+
+def _quote(words):
+    return '"' + ' '.join(words) + '"'
+
+
+def fts5_query(text):
+    """
+    The search box syntax as an FTS5 expression, or '' if nothing
+    searchable is left. Every word is quoted, so punctuation and FTS5
+    keywords in the input are just text.
+    """
+    groups = [[]]
+    excluded = []
+    for negated, phrase, word in _TERM_RE.findall(text):
+        if word == 'OR':
+            if groups[-1]:
+                groups.append([])
+            continue
+        if word.startswith('-') and len(word) > 1:
+            negated, word = '-', word[1:]
+        prefix = word.endswith('*')
+        words = _WORD_RE.findall(phrase or word)
+        if not words:
+            continue
+        term = _quote(words) + ('*' if prefix and not phrase else '')
+        if negated:
+            excluded.append(term)
+        else:
+            groups[-1].append(term)
+    groups = [group for group in groups if group]
+    if not groups:
+        # FTS5 has no unary NOT; a query of only exclusions matches nothing
+        return ''
+    expression = ' OR '.join(
+        '(' + ' AND '.join(group) + ')' if len(group) > 1 else group[0] for group in groups
+    )
+    if excluded:
+        expression = f'({expression}) NOT ' + ' NOT '.join(excluded)
+    return expression
+
+
+def _snippet_html(snippet):
+    return escape(snippet or '').replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _search_sqlite(query, job_id, limit):
+    expression = fts5_query(query)
+    if not expression:
+        return []
+    job_filter = 'AND a.job_id = %s' if job_id is not None else ''
+    sql = f"""
+        SELECT f.rowid, f.rank, snippet(jobs_cvtext_fts, 0, %s, %s, '…', 16)
+        FROM jobs_cvtext_fts f
+        JOIN jobs_application a ON a.id = f.rowid
+        WHERE jobs_cvtext_fts MATCH %s {job_filter}
+        ORDER BY f.rank
+        LIMIT %s
+    """
+    params = [_START, _STOP, expression] + ([job_id] if job_id is not None else []) + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # bm25 is lower for better matches
+        return [(app_id, -rank, snippet) for app_id, rank, snippet in cursor.fetchall()]
+
+
+def _search_postgres(query, job_id, limit):
+    job_filter = 'AND a.job_id = %s' if job_id is not None else ''
+    # The headline is worked out for the returned rows only, after the LIMIT
+    sql = f"""
+        SELECT hit.application_id, hit.rank,
+               ts_headline('english', c.text, hit.q, %s)
+        FROM (
+            SELECT c.application_id, ts_rank_cd(c.search_vector, q) AS rank, q
+            FROM jobs_cvtext c
+            JOIN jobs_application a ON a.id = c.application_id,
+                 websearch_to_tsquery('english', %s) q
+            WHERE c.search_vector @@ q {job_filter}
+            ORDER BY rank DESC
+            LIMIT %s
+        ) hit
+        JOIN jobs_cvtext c ON c.application_id = hit.application_id
+        ORDER BY hit.rank DESC
+    """
+    options = f'StartSel={_START}, StopSel={_STOP}, MaxFragments=2, MinWords=8, MaxWords=24'
+    params = [options, query] + ([job_id] if job_id is not None else []) + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _search_scan(query, job_id, limit):
+    from .models import CVText
+    words = _WORD_RE.findall(query)
+    if not words:
+        return []
+    queryset = CVText.objects.filter(status='done')
+    if job_id is not None:
+        queryset = queryset.filter(application__job_id=job_id)
+    for word in words:
+        queryset = queryset.filter(text__icontains=word)
+    hits = []
+    for app_id, text in queryset.order_by('application_id').values_list('application_id', 'text')[:limit]:
+        at = text.lower().find(words[0].lower())
+        start = max(0, at - 60)
+        snippet = text[start:at] + _START + text[at:at + len(words[0])] + _STOP + text[at + len(words[0]):at + 100]
+        hits.append((app_id, 0.0, ('…' if start else '') + snippet + '…'))
+    return hits
+
+
+def search_cv(query, job_id=None, limit=50):
+    """
+    Applications whose CV text matches `query`, best first, as
+    [{'id', 'rank', 'snippet'}]; the snippet is HTML with <mark>ed terms.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if connection.vendor == 'sqlite':
+        search = _search_sqlite
+    elif connection.vendor == 'postgresql':
+        search = _search_postgres
+    else:
+        search = _search_scan
+    rows = search(query, job_id, limit)
+    return [
+        {'id': app_id, 'rank': round(float(rank), 6), 'snippet': _snippet_html(snippet)}
+        for app_id, rank, snippet in rows
+    ]
+
+
+def matching_ids(query, limit=MAX_LIMIT):
+    """IDs of the applications whose CV matches `query`, for the admin search box"""
+    return [hit['id'] for hit in search_cv(query, limit=limit)]
+
+
+def rebuild_index():
+    """
+    Rebuild the SQLite FTS5 index from jobs_cvtext and merge its segments
+    (after restoring a backup, or to compact it). Postgres keeps its
+    generated column current by itself. Returns True if anything ran.
+    """
+    from .db import serialized_write
+    if connection.vendor != 'sqlite':
+        return False
+    with serialized_write():
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO jobs_cvtext_fts (jobs_cvtext_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO jobs_cvtext_fts (jobs_cvtext_fts) VALUES ('optimize')")
+    return True
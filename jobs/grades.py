@@ -0,0 +1,34 @@
+# ============================================
+# KCSE GRADES - Free-text grades to an ordinal
+# ============================================
+#
+# Applicants type their KCSE mean grade ("B+", "b plus", "C -", "B plain").
+# grade_rank() maps it onto the 12-point scale, A = 12 down to E = 1, and
+# 0 for anything it can't read, so grades compare and sort as numbers.
+
+import re
+
+
+GRADES = ('E', 'D-', 'D', 'D+', 'C-', 'C', 'C+', 'B-', 'B', 'B+', 'A-', 'A')
+GRADE_RANKS = {grade: rank for rank, grade in enumerate(GRADES, 1)}
+UNKNOWN = 0
+
+_WORDS = (('PLUS', '+'), ('MINUS', '-'), ('PLAIN', ''), ('−', '-'), ('–', '-'))
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(value):
+    """'b plus' -> 'B+'; '' for nothing"""
+    text = _SPACE.sub('', str(value or '')).upper()
+    for word, symbol in _WORDS:
+        text = text.replace(word, symbol)
+    return text
+
+
+def grade_rank(value):
+    """12 for A down to 1 for E; 0 if it isn't a KCSE grade"""
+    return GRADE_RANKS.get(normalize(value), UNKNOWN)
+
+
+def grade_label(rank):
+    return GRADES[rank - 1] if 1 <= rank <= len(GRADES) else ''
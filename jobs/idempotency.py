@@ -0,0 +1,180 @@
+# ============================================
+# IDEMPOTENCY - Safe retries for submit_application
+# ============================================
+#
+# A client that sends an Idempotency-Key header can retry a submission as
+# often as it likes. The first request with a key claims it in the
+# IdempotencyKey table and runs; its 2xx response is stored. A retry
+# gets the stored response straight back, without saving its documents
+# or the application again. A retry that arrives while the first request
+# is still running polls the row until the response is stored. Anything
+# other than a 2xx frees the key, so the client can fix the problem and
+# try again with the same key. A key reused for a different form (other
+# fields, or files with another name or size) is refused with 422 rather
+# than replaying the answer to the first one.
+#
+# Goes inside @rate_limit, so retries are admitted like any request
+# before they claim a key or wait for one.
+
+import functools
+import hashlib
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils import timezone
+
+from . import metrics
+from .db import serialized_write
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.25
+# Share of claims that also delete expired keys
+PURGE_PROBABILITY = 0.01
+
+
+def request_hash(request):
+    """
+    What the key must keep meaning: method, path, content type and the
+    submitted form, every field and the field, name and size of every
+    file. File contents aren't read, so a replay costs no more than parsing.
+    """
+    digest = hashlib.sha256(f'{request.method} {request.path} {request.content_type or ""}'.encode())
+    if request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        for name, values in sorted(request.POST.lists()):
+            digest.update(json.dumps([name, values]).encode())
+        for name, files in sorted(request.FILES.lists()):
+            for file in files:
+                digest.update(json.dumps([name, file.name, file.size]).encode())
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def purge_expired():
+    from .models import IdempotencyKey
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def _usable(record, now):
+    """False for expired keys and for claims whose request died without answering"""
+    if record.expires_at <= now:
+        return False
+    if record.response_status is None:
+        abandoned_after = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 120))
+        return record.created_at > now - abandoned_after
+    return True
+
+
+def claim(key, digest):
+    """
+    Return (record, created). created is True when this request now owns
+    the key and must run the view.
+    """
+    from .models import IdempotencyKey
+    now = timezone.now()
+    # Retries and waiters only read
+    record = IdempotencyKey.objects.filter(key=key).first()
+    if record is not None and _usable(record, now):
+        return record, False
+
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL', 24 * 3600))
+    try:
+        with serialized_write():
+            IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+            if record is not None and record.response_status is None:
+                # Abandoned claim: take it over
+                IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+            record = IdempotencyKey.objects.create(key=key, request_hash=digest, expires_at=now + ttl)
+    except IntegrityError:
+        # Another request claimed it first
+        return IdempotencyKey.objects.get(key=key), False
+    if random.random() < PURGE_PROBABILITY:
+        purge_expired()
+    return record, True
+
+
+def store(record, response):
+    from .models import IdempotencyKey
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=response.status_code,
+        response_body=json.loads(response.content),
+    )
+
+
+def release(record):
+    from .models import IdempotencyKey
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def replay(record):
+    response = JsonResponse(record.response_body, status=record.response_status, safe=False)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a view that returns JSON. Requests
+    without the header are passed through unchanged.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if request.method == 'OPTIONS' or not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status=400)
+        if _content_length(request) > getattr(settings, 'IDEMPOTENCY_MAX_BODY_SIZE', 16 * 1024 * 1024):
+            # Not read to hash it; the view refuses it unread
+            return view(request, *args, **kwargs)
+
+        digest = request_hash(request)
+        deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 20)
+        while True:
+            record, created = claim(key, digest)
+            if created:
+                break
+            if record.request_hash != digest:
+                metrics.inc('greentara_idempotency_total', {'outcome': 'mismatch'})
+                return JsonResponse({'error': f'{HEADER} was already used for a different request'}, status=422)
+            if record.response_status is not None:
+                metrics.inc('greentara_idempotency_total', {'outcome': 'replayed'})
+                logger.info('Idempotent replay', extra={'idempotency_key': key, 'status_code': record.response_status})
+                return replay(record)
+            if time.monotonic() >= deadline:
+                metrics.inc('greentara_idempotency_total', {'outcome': 'in_progress'})
+                response = JsonResponse({'error': 'The original request is still being processed'}, status=409)
+                response['Retry-After'] = '5'
+                return response
+            # The first request is still running (or just failed and freed the key)
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            release(record)
+            raise
+        if 200 <= response.status_code < 300 and response.get('Content-Type', '').startswith('application/json'):
+            store(record, response)
+        else:
+            release(record)
+        return response
+    return wrapper
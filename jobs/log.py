@@ -0,0 +1,114 @@
+# ============================================
+# STRUCTURED LOGGING - JSON records written off the request thread
+# ============================================
+#
+# Request threads only put LogRecords on an in-memory queue. A
+# QueueListener thread does the formatting and the (possibly slow) write
+# to stdout, so a stalled log collector never stalls a worker. Configured
+# from the LOGGING dict in settings.
+
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Set per request by RequestContextMiddleware: {'request_id', 'started', 'view'}
+request_context = contextvars.ContextVar('request_context', default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'elapsed_ms',
+}
+
+
+def current_request_id():
+    ctx = request_context.get()
+    return ctx['request_id'] if ctx else None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp each record with the request ID and milliseconds since the request started"""
+
+    def filter(self, record):
+        ctx = request_context.get()
+        if ctx:
+            record.request_id = ctx['request_id']
+            record.elapsed_ms = round((time.perf_counter() - ctx['started']) * 1000, 2)
+        else:
+            record.request_id = None
+            record.elapsed_ms = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'elapsed_ms': getattr(record, 'elapsed_ms', None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Enqueues records and writes them to `stream` from a background thread.
+
+    The queue is bounded: when it is full, records are dropped and counted
+    rather than blocking the caller.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.dropped = 0
+        self.listener = None
+        self._start()
+        atexit.register(self._stop)
+        # Listener threads don't survive fork (gunicorn preload_app)
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def _stop(self):
+        if self.listener and self.listener._thread is not None:
+            self.listener.stop()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the target handler
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Skip QueueHandler's eager formatting; the record stays in-process
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._stop()
+        super().close()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from jobs import archive
+
+
+class Command(BaseCommand):
+    help = 'Moves applications past their retention period, and their documents, to the compressed archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per archive file and delete')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help='Only archive this status (repeatable)')
+        parser.add_argument('--limit', type=int, help='Stop after this many applications')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be archived')
+
+    def handle(self, *args, **options):
+        summary = archive.archive(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            statuses=options['statuses'],
+            limit=options['limit'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{summary['applications']} applications are due for the archive.")
+            return
+        for path in summary['files']:
+            self.stdout.write(f'  {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {summary['applications']} applications and {summary['documents']} documents "
+            f"({summary['document_bytes'] / 1024 / 1024:.1f} MB of documents, "
+            f"{summary['compressed_bytes'] / 1024 / 1024:.1f} MB in the archive) to {archive.archive_root()}"
+        ))
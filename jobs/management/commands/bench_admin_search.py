@@ -0,0 +1,90 @@
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+
+
+def _timed(search, repeat):
+    """Median ms for building the search and what the changelist runs on it: a count and the first page"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        queryset = search()
+        count = queryset.count()
+        list(queryset.order_by('-applied_at').values_list('id', flat=True)[:100])
+        timings.append((time.perf_counter() - started) * 1000)
+    return count, statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the admin application search: indexed paths against the icontains scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=1000000,
+                            help='Synthetic applications in the scratch database')
+        parser.add_argument('--db', default=os.path.join(settings.BASE_DIR, 'bench_search.sqlite3'),
+                            help='Scratch SQLite database file (deleted and recreated)')
+        parser.add_argument('--current', action='store_true',
+                            help='Search the configured database as it is instead (e.g. Postgres)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported')
+
+    def handle(self, *args, **options):
+        from jobs import admin_search, synthetic
+        from jobs.models import Application
+
+        connection = connections['default']
+        if not options['current']:
+            if connection.vendor != 'sqlite':
+                raise CommandError('The scratch database is SQLite; use --current to search this database')
+            path = options['db']
+            for suffix in ('', '-wal', '-shm', '.write-lock'):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+            connections.close_all()
+            connection.settings_dict['NAME'] = path
+            call_command('migrate', verbosity=0, interactive=False)
+            self.stdout.write(f"Seeding {options['applications']:,} applications into {path}...")
+            # Scratch jobs must not replace the published board
+            with override_settings(SNAPSHOT_ON_SAVE=False):
+                result = synthetic.seed(jobs=50, applications=options['applications'], raw=True, batch_size=20000)
+            self.stdout.write(f"  done in {result['seconds']:.1f}s")
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        total = Application.objects.count()
+        if not total:
+            raise CommandError('No applications to search')
+        sample = Application.objects.order_by('id')[total // 2]
+        first, last = sample.full_name.split()[0], sample.full_name.split()[-1]
+        local_part = sample.email.split('@')[0]
+        queries = [
+            ('email, exact', sample.email),
+            ('email, prefix', local_part + '@'),
+            ('email, no @', local_part),
+            ('phone, as typed', sample.phone),
+            ('phone, local', '0' + sample.phone_e164[4:]),
+            ('phone, last digits', sample.phone_e164[-6:]),
+            ('full name', sample.full_name),
+            ('part of a name', first[:4]),
+            ('name and job', f'{last} {sample.job_title.split()[0]}'),
+            ('misspelt name', f'{first[:2]}{first[3:]} {last}'),
+            ('two letters', first[:2]),
+        ]
+
+        self.stdout.write(f'{total:,} applications on {connection.vendor}; median of {options["repeat"]} runs')
+        self.stdout.write(f"{'query':<20} {'path':<6} {'rows':>8} {'indexed ms':>11} {'scan rows':>10} {'scan ms':>9} {'speedup':>8}")
+        base = Application.objects.all()
+        for label, term in queries:
+            path = admin_search.search(base, term)[1]
+            count, ms = _timed(lambda: admin_search.search(base, term)[0], options['repeat'])
+            scan_count, scan_ms = _timed(lambda: admin_search.scan(base, term), options['repeat'])
+            self.stdout.write(
+                f'{label:<20} {path:<6} {count:>8,} {ms:>11.1f} {scan_count:>10,} {scan_ms:>9.1f} '
+                f'{scan_ms / ms if ms else 0:>7.0f}x'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
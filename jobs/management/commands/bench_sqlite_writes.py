@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import shutil
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+
+def _write(writer, count, serialized, document_size=0):
+    """Insert `count` applications the way submit_application does; return (latencies, errors)"""
+    from jobs.db import serialized_write
+    from jobs.models import Application
+    from jobs.views import _save_document
+
+    latencies = []
+    errors = 0
+    for i in range(count):
+        started = time.perf_counter()
+        try:
+            # Stored before the write lock is taken, as the view does
+            documents = {}
+            if document_size:
+                documents['cv_document'] = _save_document('cv_document', ContentFile(b'x' * document_size, name='cv.pdf'))
+            block = serialized_write() if serialized else transaction.atomic()
+            with block:
+                Application.objects.create(
+                    job_id=1,
+                    job_title='Benchmark Job',
+                    full_name=f'Writer {writer}',
+                    email=f'bench{writer}-{i}@example.com',
+                    phone='0700000000',
+                    age=25,
+                    gender='Female',
+                    kcse_grade='B',
+                    **documents,
+                )
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    connections.close_all()
+    return latencies, errors
+
+
+def _write_star(args):
+    return _write(*args)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks concurrent application inserts against a scratch SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Concurrent writers')
+        parser.add_argument('--per-writer', type=int, default=50, help='Inserts per writer')
+        parser.add_argument('--threads', action='store_true',
+                            help='Use threads in one process instead of one process per writer')
+        parser.add_argument('--baseline', action='store_true',
+                            help='Rollback journal, default pragmas, no write serialization')
+        parser.add_argument('--db', default=os.path.join(settings.BASE_DIR, 'bench_writes.sqlite3'),
+                            help='Scratch database file (deleted and recreated)')
+        parser.add_argument('--document-kb', type=int, default=0,
+                            help='Also store a CV of this size per insert, into a scratch media directory')
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark only applies to SQLite')
+        path = options['db']
+        for suffix in ('', '-wal', '-shm', '.write-lock'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+        # Every thread's connection is built from this same settings dict
+        connections.close_all()
+        connection.settings_dict['NAME'] = path
+        if options['document_kb']:
+            # Before default_storage is first used, so it (and every writer) picks this up
+            settings.MEDIA_ROOT = path + '-media'
+            shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        if options['baseline']:
+            settings.SQLITE_PRAGMAS = {'journal_mode': 'DELETE'}
+            connection.settings_dict.get('OPTIONS', {}).pop('transaction_mode', None)
+
+        call_command('migrate', verbosity=0, interactive=False)
+        from jobs.db import sqlite_status
+        pragmas = sqlite_status()
+        connections.close_all()
+
+        serialized = not options['baseline']
+        jobs = [(w, options['per_writer'], serialized, options['document_kb'] * 1024) for w in range(options['writers'])]
+        started = time.perf_counter()
+        if options['threads']:
+            with ThreadPoolExecutor(max_workers=options['writers']) as pool:
+                results = list(pool.map(_write_star, jobs))
+        else:
+            with multiprocessing.get_context('fork').Pool(options['writers']) as pool:
+                results = pool.map(_write_star, jobs)
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(l for result in results for l in result[0])
+        errors = sum(result[1] for result in results)
+        ok = len(latencies) - errors
+
+        def pct(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+        mode = 'baseline' if options['baseline'] else 'tuned + serialized'
+        self.stdout.write(f"Mode: {mode} ({'threads' if options['threads'] else 'processes'})")
+        self.stdout.write(f"Pragmas: {pragmas}")
+        self.stdout.write(f"Writers: {options['writers']} x {options['per_writer']} inserts"
+                          + (f", {options['document_kb']} KB document each" if options['document_kb'] else ''))
+        self.stdout.write(f"Succeeded: {ok}  'database is locked' errors: {errors}")
+        self.stdout.write(f"Throughput: {ok / elapsed:,.0f} inserts/s over {elapsed:.2f}s")
+        self.stdout.write(
+            f"Latency ms: p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  "
+            f"p99 {pct(0.99):.1f}  max {latencies[-1] * 1000:.1f}  mean {statistics.mean(latencies) * 1000:.1f}"
+        )
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style('Done'))
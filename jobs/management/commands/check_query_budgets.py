@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import querybudget
+
+
+class Command(BaseCommand):
+    help = 'Checks per-endpoint SQL query counts against jobs/query_budgets.json at two data sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--manifest', default=str(querybudget.MANIFEST_PATH),
+                            help='Path to the budget manifest')
+        parser.add_argument('--update', action='store_true',
+                            help='Rewrite max_queries in the manifest from this run instead of failing')
+
+    def handle(self, *args, **options):
+        manifest = querybudget.load_manifest(options['manifest'])
+        results, failures = querybudget.run(manifest, verbosity=max(options['verbosity'] - 1, 0))
+
+        self.stdout.write(f"{'endpoint':<32}{'small':>8}{'large':>8}{'budget':>8}{'db ms':>10}")
+        for name, result in results.items():
+            budget = manifest['endpoints'][name].get('max_queries', '-')
+            self.stdout.write(
+                f"{name:<32}{result['small']['queries']:>8}{result['large']['queries']:>8}"
+                f"{budget:>8}{result['large']['db_ms']:>10.2f}"
+            )
+
+        if options['update']:
+            querybudget.save_manifest(querybudget.update_budgets(manifest, results), options['manifest'])
+            self.stdout.write(self.style.SUCCESS(f"Updated budgets in {options['manifest']}"))
+            return
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError(f'{len(failures)} query budget(s) exceeded')
+        self.stdout.write(self.style.SUCCESS('All endpoints within their query budgets'))
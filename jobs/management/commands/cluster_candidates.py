@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from jobs import candidates
+
+
+class Command(BaseCommand):
+    help = 'Links applications to candidates: the unlinked ones, or with --rebuild every one from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Re-cluster every application (after changing the matching rules)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per write')
+        parser.add_argument('--dry-run', action='store_true', help='With --rebuild, count without writing')
+
+    def handle(self, *args, **options):
+        if not options['rebuild']:
+            linked = candidates.link_missing(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Linked {linked} applications to candidates'))
+            return
+        summary = candidates.cluster(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = 'Would group' if options['dry_run'] else 'Grouped'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['applications']} applications into {summary['candidates']} candidates "
+            f"({summary['merged']} repeat applications)"
+        ))
@@ -0,0 +1,119 @@
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_PATHS = ['/api/jobs', '/api/content', '/api/theme-colors']
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(url, timeout=30):
+    """(status, seconds) for one GET; status is None if nothing is listening yet"""
+    # As the platform's TLS proxy would, so SECURE_SSL_REDIRECT lets it through
+    request = urllib.request.Request(url, headers={'X-Forwarded-Proto': 'https'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = None
+    return status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Starts the server from cold and measures time to the first good response, with and without warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Path to request after boot (repeatable, default {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--ready-path', default='/api/health',
+                            help='Polled until it answers 200, like the platform health check')
+        parser.add_argument('--runs', type=int, default=3, help='Cold starts per mode')
+        parser.add_argument('--cmd', default=f'{sys.executable} -m gunicorn -c gunicorn.conf.py',
+                            help='Server command; PORT is set in its environment')
+        parser.add_argument('--startup-timeout', type=float, default=60)
+        parser.add_argument('--warm-only', action='store_true', help='Skip the run without warm-up')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        modes = [('warm-up', True)] if options['warm_only'] else [('no warm-up', False), ('warm-up', True)]
+        results = {}
+        for label, warm in modes:
+            runs = [self.cold_start(options, paths, warm) for _ in range(options['runs'])]
+            results[label] = runs
+            self.report(label, runs, paths)
+
+        if len(results) == 2:
+            before = statistics.median(r['ready'] for r in results['no warm-up'])
+            after = statistics.median(r['ready'] for r in results['warm-up'])
+            first_before = statistics.median(r['latencies'][0] for r in results['no warm-up'])
+            first_after = statistics.median(r['latencies'][0] for r in results['warm-up'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Time to first good response: {before * 1000:.0f}ms -> {after * 1000:.0f}ms; "
+                f"first request latency: {first_before * 1000:.1f}ms -> {first_after * 1000:.1f}ms"
+            ))
+
+    def cold_start(self, options, paths, warm):
+        port = _free_port()
+        # A woken instance starts with an empty file cache too
+        cache_dir = tempfile.TemporaryDirectory(prefix='greentara-probe-cache-')
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY='1', CACHE_DIR=cache_dir.name,
+                   WARMUP_ON_READY=str(warm), WARMUP_WORKER=str(warm))
+        base = f'http://127.0.0.1:{port}'
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            shlex.split(options['cmd']), cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            # Connections made while the worker warms up wait in the listen
+            # backlog, so only poll the cheap health path; the paths under
+            # test are timed once the server is answering
+            while True:
+                if server.poll() is not None:
+                    raise CommandError(f"Server exited with {server.returncode}: {options['cmd']}")
+                if time.perf_counter() - started > options['startup_timeout']:
+                    raise CommandError('Server did not answer in time')
+                status, seconds = _get(base + options['ready_path'])
+                if status == 200:
+                    break
+                if status is not None:
+                    raise CommandError(f"{options['ready_path']} answered {status}")
+                time.sleep(0.02)
+            ready = time.perf_counter() - started
+            latencies = [_get(base + path)[1] for path in paths]
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            cache_dir.cleanup()
+        return {'ready': ready, 'latencies': latencies}
+
+    def report(self, label, runs, paths):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({len(runs)} cold starts)'))
+        ready = [r['ready'] * 1000 for r in runs]
+        self.stdout.write(f"  first good response after {statistics.median(ready):.0f}ms "
+                          f"(min {min(ready):.0f}, max {max(ready):.0f})")
+        for i, path in enumerate(paths):
+            values = [r['latencies'][i] * 1000 for r in runs]
+            self.stdout.write(f"  first {path:<24} {statistics.median(values):8.1f}ms")
@@ -0,0 +1,90 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.db import collect_pool_stats
+
+
+def _summary(stats):
+    """Derived figures for one pool: checkout wait and how close it is to running out"""
+    checkouts = stats.get('requests_num', 0)
+    queued = stats.get('requests_queued', 0)
+    pool_max = stats.get('pool_max', 0)
+    in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    return {
+        'checkouts': checkouts,
+        'queued_pct': 100.0 * queued / checkouts if checkouts else 0.0,
+        'avg_wait_ms': stats.get('requests_wait_ms', 0) / queued if queued else 0.0,
+        'timeouts': stats.get('requests_errors', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'in_use': in_use,
+        'size': stats.get('pool_size', 0),
+        'max': pool_max,
+        'saturation_pct': 100.0 * in_use / pool_max if pool_max else 0.0,
+        'avg_connect_ms': (stats.get('connections_ms', 0) / stats['connections_num']
+                           if stats.get('connections_num') else 0.0),
+        'lost': stats.get('connections_lost', 0) + stats.get('returns_bad', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Reports Postgres connection pool checkout waits and saturation across running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=60,
+                            help='Ignore workers that have not reported for this many seconds')
+        parser.add_argument('--watch', type=float, default=0,
+                            help='Refresh every N seconds until interrupted')
+        parser.add_argument('--json', action='store_true', help='Print raw JSON')
+
+    def handle(self, *args, **options):
+        while True:
+            self.report(options)
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
+            self.stdout.write('')
+
+    def report(self, options):
+        workers, totals = collect_pool_stats(max_age=options['max_age'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'workers': workers,
+                'totals': {alias: dict(stats, **_summary(stats)) for alias, stats in totals.items()},
+            }, indent=2))
+            return
+
+        if not workers:
+            pooled = [alias for alias, db in settings.DATABASES.items() if db.get('OPTIONS', {}).get('pool')]
+            if not pooled:
+                self.stdout.write('Connection pooling is off (needs Postgres and DB_POOL=True).')
+            else:
+                self.stdout.write(f"No pool stats reported in the last {options['max_age']}s.")
+            return
+
+        header = (f"{'worker':>8} {'alias':<10} {'in use':>9} {'waiting':>7} {'checkouts':>9} "
+                  f"{'queued':>7} {'avg wait':>9} {'timeouts':>8} {'connect':>8}")
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        rows = [(str(w['pid']), alias, stats) for w in workers for alias, stats in sorted(w['pools'].items())]
+        rows += [('total', alias, stats) for alias, stats in sorted(totals.items())]
+        for label, alias, stats in rows:
+            s = _summary(stats)
+            line = (f"{label:>8} {alias:<10} {s['in_use']:>4}/{s['max']:<4} {s['waiting']:>7} {s['checkouts']:>9} "
+                    f"{s['queued_pct']:>6.1f}% {s['avg_wait_ms']:>7.1f}ms {s['timeouts']:>8} {s['avg_connect_ms']:>6.1f}ms")
+            saturated = s['waiting'] or s['timeouts'] or s['saturation_pct'] >= 90
+            self.stdout.write(self.style.WARNING(line) if saturated else line)
+
+        for alias, stats in sorted(totals.items()):
+            s = _summary(stats)
+            if s['timeouts']:
+                self.stdout.write(self.style.ERROR(
+                    f"{alias}: {s['timeouts']} checkouts timed out after DB_POOL_TIMEOUT; "
+                    f"raise DB_POOL_MAX_SIZE if Postgres has connection slots to spare"
+                ))
+            elif s['queued_pct'] > 10:
+                self.stdout.write(self.style.WARNING(
+                    f"{alias}: {s['queued_pct']:.0f}% of checkouts waited for a free connection"
+                ))
@@ -0,0 +1,42 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from jobs import expiry, metrics
+
+
+class Command(BaseCommand):
+    help = 'Deactivates job postings whose expiry date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the jobs without changing them')
+        parser.add_argument('--date', help='Treat this day (YYYY-MM-DD) as today')
+        parser.add_argument('--loop', action='store_true', help='Keep running, sweeping every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+
+        while True:
+            self.run_once(today, options['dry_run'])
+            if not options['loop']:
+                return
+            metrics.flush(force=True)
+            # A long-lived process must not keep a dead or stale connection
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def run_once(self, today, dry_run):
+        changed = expiry.sweep(today=today, dry_run=dry_run)
+        verb = 'Would expire' if dry_run else 'Expired'
+        if not changed:
+            self.stdout.write('No expired jobs.')
+            return
+        for job in changed:
+            self.stdout.write(f"  #{job['id']} {job['title']} (expired {job['expiry_date'].isoformat()})")
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(changed)} jobs'))
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from jobs import bulk
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Writes every job posting as CSV or JSONL, in the format import_jobs reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=bulk.FORMATS, default='jsonl')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--active-only', action='store_true')
+
+    def handle(self, *args, **options):
+        queryset = Job.objects.all()
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(bulk.export_jobs(options['format'], queryset))
+        else:
+            sys.stdout.writelines(bulk.export_jobs(options['format'], queryset))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import cv_text, fulltext, metrics
+
+
+class Command(BaseCommand):
+    help = 'Extracts text from uploaded CVs for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Parsing processes (default CV_TEXT_WORKERS; 0 parses in this process)')
+        parser.add_argument('--timeout', type=int, help='Seconds per CV before it is marked failed (default CV_TEXT_TIMEOUT)')
+        parser.add_argument('--batch-size', type=int, default=100, help='CVs per write')
+        parser.add_argument('--limit', type=int, help='Stop after this many CVs')
+        parser.add_argument('--retry-failed', action='store_true', help='Try CVs that failed before again')
+        parser.add_argument('--rebuild-index', action='store_true',
+                            help='Rebuild and compact the SQLite full-text index afterwards')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between checks with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['loop']:
+                break
+            metrics.flush(force=True)
+            # A long-lived process must not keep a dead or stale connection
+            close_old_connections()
+            time.sleep(options['interval'])
+
+        if options['rebuild_index']:
+            if fulltext.rebuild_index():
+                self.stdout.write(self.style.SUCCESS('Rebuilt the full-text index'))
+            else:
+                self.stdout.write('Nothing to rebuild: the index is a generated column on this database')
+
+    def run_once(self, options):
+        removed = cv_text.purge_orphans()
+        if removed:
+            self.stdout.write(f'Removed text of {removed} CVs no longer attached')
+        summary = cv_text.run(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            retry_failed=options['retry_failed'],
+            timeout=options['timeout'],
+        )
+        if not summary['extracted']:
+            self.stdout.write('No CVs waiting for extraction.')
+            return
+        counts = ', '.join(f'{count} {status}' for status, count in sorted(summary['by_status'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Extracted {summary['extracted']} CVs in {summary['seconds']}s ({counts})"
+        ))
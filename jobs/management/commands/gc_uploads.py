@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from jobs import uploads
+
+
+class Command(BaseCommand):
+    help = 'Removes expired resumable upload sessions'
+
+    def handle(self, *args, **options):
+        removed, freed = uploads.gc_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed} expired upload sessions ({freed / 1024 / 1024:.1f} MB)'
+        ))
@@ -0,0 +1,63 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import bulk
+
+
+class Command(BaseCommand):
+    help = 'Creates or updates job postings from a CSV or JSONL file (rows with an id update that job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Default: from the file extension, else JSONL')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk INSERT/UPDATE')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Import the valid rows even if some are invalid')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or bulk.detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                summary = self.run(sys.stdin, fmt, options)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                    summary = self.run(f, fmt, options)
+        except FileNotFoundError:
+            raise CommandError(f"No such file: {options['path']}")
+        elapsed = time.perf_counter() - started
+
+        for error in summary['errors']:
+            where = f"line {error['line']}" if error['line'] else 'row'
+            details = '; '.join(f'{field}: {", ".join(messages) if isinstance(messages, list) else messages}'
+                                for field, messages in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f'  {where}: {details}'))
+        if summary['invalid'] > len(summary['errors']):
+            self.stdout.write(self.style.WARNING(f"  ... and {summary['invalid'] - len(summary['errors'])} more"))
+
+        if 'would_create' in summary:
+            reason = 'dry run' if options['dry_run'] else 'nothing written: fix the invalid rows or use --skip-invalid'
+            self.stdout.write(
+                f"{summary['rows']} rows, {summary['invalid']} invalid; would create {summary['would_create']} "
+                f"and update {summary['would_update']} ({reason})"
+            )
+            if summary['invalid'] and not options['dry_run']:
+                raise CommandError('Import aborted')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['created']} and updated {summary['updated']} jobs "
+            f"from {summary['rows']} rows in {elapsed:.2f}s"
+            + (f" ({summary['invalid']} invalid rows skipped)" if summary['invalid'] else '')
+        ))
+
+    def run(self, stream, fmt, options):
+        try:
+            return bulk.import_jobs(
+                stream, fmt=fmt, batch_size=max(1, options['batch_size']),
+                dry_run=options['dry_run'], skip_invalid=options['skip_invalid'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
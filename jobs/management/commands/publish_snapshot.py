@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import metrics, snapshot
+
+
+class Command(BaseCommand):
+    help = 'Publishes the public job board as static files into SNAPSHOT_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Publish here instead of SNAPSHOT_DIR')
+        parser.add_argument('--force', action='store_true', help='Swap in a new manifest even if nothing changed')
+        parser.add_argument('--loop', action='store_true', help='Keep running, publishing every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between publishes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options['dir'], options['force'])
+            if not options['loop']:
+                return
+            metrics.flush(force=True)
+            # A long-lived process must not keep a dead or stale connection
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def run_once(self, directory, force):
+        summary = snapshot.publish(directory=directory, force=force)
+        if not summary['changed']:
+            self.stdout.write(f"Unchanged ({summary['digest']}), {summary['deleted']} old files deleted")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Published {summary['digest']}: {summary['written']} of {summary['files']} files written, "
+            f"{summary['deleted']} old files deleted in {summary['seconds']}s"
+        ))
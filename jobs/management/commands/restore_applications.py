@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import archive
+
+
+class Command(BaseCommand):
+    help = 'Restores archived applications and their documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, action='append', dest='ids', help='Application ID (repeatable)')
+        parser.add_argument('--email', help='Every archived application from this email address')
+        parser.add_argument('--file', help='Everything in this archive file (path relative to ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be restored')
+
+    def handle(self, *args, **options):
+        # Archive file -> application IDs to take from it (None: all)
+        wanted = {}
+        if options['file']:
+            wanted[options['file']] = None
+        if options['ids'] or options['email']:
+            ids = set(options['ids'] or [])
+            email = (options['email'] or '').strip().lower()
+            for manifest in archive.manifests():
+                for entry in manifest['records']:
+                    if entry['id'] in ids or (email and entry['email'].lower() == email):
+                        selected = wanted.setdefault(manifest['file'], set())
+                        if selected is not None:
+                            selected.add(entry['id'])
+        if not wanted:
+            if options['file'] or options['ids'] or options['email']:
+                raise CommandError('Nothing matching in the archive')
+            raise CommandError('Give --id, --email or --file')
+
+        total = 0
+        for relative, ids in wanted.items():
+            restored, skipped = archive.restore(relative, ids=ids, dry_run=options['dry_run'])
+            total += len(restored)
+            for pk in restored:
+                self.stdout.write(f"  {'would restore' if options['dry_run'] else 'restored'} #{pk} from {relative}")
+            for pk in skipped:
+                self.stdout.write(self.style.WARNING(f'  skipped #{pk}: an application with that ID exists'))
+        verb = 'Would restore' if options['dry_run'] else 'Restored'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} applications'))
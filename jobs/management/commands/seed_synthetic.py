@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic jobs and applications in bulk for load and scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=20,
+                            help='Job postings to create (0 = reuse existing jobs)')
+        parser.add_argument('--applications', type=int, default=10000,
+                            help='Applications to create')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; the same seed and --end give the same data')
+        parser.add_argument('--end', default=None,
+                            help='Latest timestamp to generate (ISO format, default: now)')
+        parser.add_argument('--days', type=int, default=180,
+                            help='How many days of history to spread timestamps over')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk_create batch')
+        parser.add_argument('--with-documents', action='store_true',
+                            help='Attach small placeholder PDFs written under MEDIA_ROOT')
+        parser.add_argument('--raw', action='store_true',
+                            help='Insert with executemany instead of bulk_create (fastest for millions of rows)')
+
+    def handle(self, *args, **options):
+        end = None
+        if options['end']:
+            try:
+                end = datetime.fromisoformat(options['end'])
+            except ValueError:
+                raise CommandError(f"Invalid --end value: {options['end']}")
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end)
+
+        total = options['applications']
+        step = max(total // 10, 1)
+
+        def progress(done, total):
+            if done % step < options['batch_size'] or done == total:
+                self.stdout.write(f'  {done:,}/{total:,} applications')
+
+        try:
+            result = synthetic.seed(
+                jobs=options['jobs'],
+                applications=total,
+                seed=options['seed'],
+                documents=options['with_documents'],
+                batch_size=options['batch_size'],
+                days=options['days'],
+                end=end,
+                raw=options['raw'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rate = result['applications'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['jobs']} job(s) and {result['applications']:,} application(s) "
+            f"in {result['seconds']:.1f}s ({rate:,.0f} rows/s)"
+        ))
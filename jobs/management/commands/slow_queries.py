@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from jobs import slowquery
+
+
+class Command(BaseCommand):
+    help = 'Shows the slowest query shapes and their EXPLAIN plans collected by the running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Number of shapes to show')
+        parser.add_argument('--recent', action='store_true', help='Also list the most recent slow queries')
+        parser.add_argument('--json', action='store_true', help='Print raw JSON')
+
+    def handle(self, *args, **options):
+        data = slowquery.collect(limit=options['limit'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(data, indent=2))
+            return
+
+        if not data['shapes']:
+            self.stdout.write(f"No queries over {data['threshold_ms']}ms recorded.")
+            return
+
+        for info in data['shapes']:
+            self.stdout.write(self.style.WARNING(
+                f"[{info['shape_id']}] max {info['max_ms']}ms, seen {info['count']}x, view {info['view'] or '-'}"
+            ))
+            self.stdout.write(f"  {info['sql'][:500]}")
+            if info['plan']:
+                for line in info['plan'].splitlines():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write('')
+
+        if options['recent']:
+            self.stdout.write(self.style.MIGRATE_HEADING('Recent slow queries'))
+            for entry in data['recent']:
+                when = datetime.fromtimestamp(entry['ts']).strftime('%Y-%m-%d %H:%M:%S')
+                self.stdout.write(
+                    f"  {when} {entry['duration_ms']:>8}ms [{entry['shape_id']}] "
+                    f"{entry['view'] or '-'} {entry['request_id'] or ''}"
+                )
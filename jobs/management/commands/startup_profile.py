@@ -0,0 +1,87 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import startup
+
+
+class Command(BaseCommand):
+    help = 'Boots the project under -X importtime and reports where startup time goes, against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Boots to take the median of')
+        parser.add_argument('--min-ms', type=float, default=5.0,
+                            help='Hide tree nodes cheaper than this (cumulative)')
+        parser.add_argument('--depth', type=int, default=3, help='Tree depth to print')
+        parser.add_argument('--heavy-ms', type=float, default=10.0,
+                            help='Flag project-level imports costing at least this much')
+        parser.add_argument('--baseline', default=str(startup.BASELINE_PATH), help='Baseline JSON path')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed growth over the baseline before failing (0.25 = 25%%)')
+        parser.add_argument('--update', action='store_true', help='Write this run as the new baseline')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            report = startup.profile(runs=options['runs'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        heavy = startup.heavy_imports(report['roots'], options['heavy_ms'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(report, heavy=heavy), indent=2))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Boot phases'))
+        for name, ms in report['phases'].items():
+            self.stdout.write(f"  {name:<14}{ms:>9.1f}ms")
+        self.stdout.write(f"  {'total':<14}{report['total_ms']:>9.1f}ms  "
+                          f"(runs: {', '.join(f'{t:.0f}' for t in report['all_totals_ms'])})")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nImport tree (cumulative ms, self ms)'))
+        self.print_tree(sorted(report['roots'], key=lambda n: n['cumulative_ms'], reverse=True),
+                        options['min_ms'], options['depth'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nTop packages'))
+        for package, ms in list(report['packages'].items())[:12]:
+            self.stdout.write(f"  {package:<28}{ms:>9.1f}ms")
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nHeavy imports made by project code (candidates to defer)'))
+        if not heavy:
+            self.stdout.write(f"  none over {options['heavy_ms']}ms")
+        for item in heavy:
+            self.stdout.write(self.style.WARNING(
+                f"  {item['module']:<40}{item['ms']:>8.1f}ms  imported by {item['importer']}"
+            ))
+
+        if options['update']:
+            startup.save_baseline(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"\nSaved baseline to {options['baseline']}"))
+            return
+
+        baseline = startup.load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f"\nNo baseline at {options['baseline']}; run with --update to create one")
+            return
+        self.stdout.write(
+            f"\nBaseline: total {baseline['total_ms']:.0f}ms -> {report['total_ms']:.0f}ms, "
+            f"imports {baseline['import_ms']:.0f}ms -> {report['import_ms']:.0f}ms"
+        )
+        failures = startup.compare(report, baseline, options['tolerance'])
+        if failures:
+            for failure in failures:
+                self.stderr.write(self.style.ERROR(failure))
+            raise CommandError('Startup is slower than the baseline')
+        self.stdout.write(self.style.SUCCESS('Startup within baseline'))
+
+    def print_tree(self, nodes, min_ms, depth, level=0):
+        for node in nodes:
+            if node['cumulative_ms'] < min_ms:
+                continue
+            self.stdout.write(
+                f"  {'  ' * level}{node['name']:<{48 - 2 * level}}"
+                f"{node['cumulative_ms']:>9.1f}{node['self_ms']:>8.1f}"
+            )
+            if level + 1 < depth:
+                children = sorted(node['children'], key=lambda n: n['cumulative_ms'], reverse=True)
+                self.print_tree(children, min_ms, depth, level + 1)
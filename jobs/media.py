@@ -0,0 +1,186 @@
+# ============================================
+# PROTECTED MEDIA - Applicant documents for staff
+# ============================================
+#
+# Everything under MEDIA_URL goes through serve_media() (views.py), which
+# checks who is asking and then gets the bytes out of Python's way:
+#
+# - MEDIA_ACCEL = 'nginx': an X-Accel-Redirect to the internal location
+#   MEDIA_ACCEL_PREFIX; nginx sends the file, with ranges and conditionals.
+# - MEDIA_ACCEL = 'sendfile': an X-Sendfile header with the absolute path
+#   (Apache mod_xsendfile, lighttpd).
+# - otherwise a FileResponse. Under gunicorn the file is handed to
+#   wsgi.file_wrapper, which uses os.sendfile() from the current offset
+#   for Content-Length bytes, so a range is sent by seeking to its start.
+#
+# The FileResponse path does single byte ranges (206/416), If-Range, and
+# ETag/Last-Modified conditionals (304/412) itself.
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Shown in the browser; anything else (HTML, SVG, ...) is downloaded, so an
+# uploaded page can't run script on the admin's origin
+INLINE_TYPES = ('application/pdf', 'image/png', 'image/jpeg', 'image/gif', 'image/webp')
+
+
+class FileRange:
+    """
+    A byte range of an open file. read() stops at the end of the range;
+    fileno() and the file position let a WSGI server sendfile() it, bounded
+    by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def normalize(path):
+    """
+    `path` if it is already a plain relative path under MEDIA_ROOT, else
+    None. Anything normpath() would change ('logos/../applications/...',
+    './x', 'a//b') is refused rather than resolved, so the prefix checks
+    below see the file that would actually be served.
+    """
+    if not path or path.startswith('/') or '\\' in path or '\0' in path:
+        return None
+    if posixpath.normpath(path) != path or '..' in path.split('/'):
+        return None
+    return path
+
+
+def is_public(path):
+    """Site assets (the logo) anyone may fetch; applicant documents are staff only"""
+    path = normalize(path)
+    return path is not None and path.startswith(tuple(getattr(settings, 'MEDIA_PUBLIC_PREFIXES', ())))
+
+
+def can_view(user, path):
+    if normalize(path) is None:
+        return False
+    if is_public(path):
+        return True
+    return user.is_authenticated and user.is_active and user.is_staff and user.has_perm('jobs.view_application')
+
+
+def resolve(path):
+    """Absolute path of a file under MEDIA_ROOT, or Http404"""
+    if normalize(path) is None:
+        raise Http404('Not found')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+    return full_path
+
+
+def _etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    (start, length) for a single "bytes=" range, None to send the whole
+    file (no header, or one we don't do, like multiple ranges), or
+    False if it can't be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix: the last N bytes
+        length = min(int(last), size)
+        return (size - length, length) if length else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end - start + 1
+
+
+def _accel_response(path, full_path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_ACCEL == 'nginx':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def serve(request, path):
+    """Response for a MEDIA_ROOT file the caller is allowed to see"""
+    full_path = resolve(path)
+    stat = os.stat(full_path)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type if content_type and not encoding else 'application/octet-stream'
+    filename = os.path.basename(full_path)
+
+    if getattr(settings, 'MEDIA_ACCEL', ''):
+        response = _accel_response(path, full_path, content_type)
+    else:
+        etag = _etag(stat)
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        # Only resume from a range if the file is still the one the client has
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            byte_range = None
+        else:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        file = open(full_path, 'rb')
+        if byte_range:
+            start, length = byte_range
+            response = FileResponse(FileRange(file, start, length), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{stat.st_size}'
+        else:
+            length = stat.st_size
+            response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    disposition = 'inline' if content_type in INLINE_TYPES else 'attachment'
+    response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Cache-Control'] = 'public, max-age=3600' if is_public(path) else 'private, no-cache'
+    return response
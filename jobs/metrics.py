@@ -0,0 +1,184 @@
+# ============================================
+# METRICS - Counters and histograms in Prometheus text format
+# ============================================
+
+import atexit
+import os
+import threading
+import time
+
+from . import worker_state
+
+
+SNAPSHOT_KIND = 'metrics'
+
+# How often a worker writes its metrics to the shared directory
+FLUSH_INTERVAL = 5.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 5242880)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'greentara_http_requests_total': (
+        'counter', 'HTTP requests by view, method and status code', None),
+    'greentara_http_request_duration_seconds': (
+        'histogram', 'Request latency in seconds', LATENCY_BUCKETS),
+    'greentara_http_response_size_bytes': (
+        'histogram', 'Response body size in bytes', SIZE_BUCKETS),
+    'greentara_http_request_db_queries': (
+        'histogram', 'Database queries issued per request', QUERY_COUNT_BUCKETS),
+    'greentara_http_request_db_seconds': (
+        'histogram', 'Time spent in the database per request', LATENCY_BUCKETS),
+    'greentara_db_write_wait_seconds': (
+        'histogram', 'Time spent queued for the serialized SQLite write path', LATENCY_BUCKETS),
+    'greentara_applications_submitted_total': (
+        'counter', 'Applications saved by submit_application', None),
+    'greentara_applications_duplicate_rejected_total': (
+        'counter', 'Submissions rejected as duplicates', None),
+    'greentara_emails_sent_total': (
+        'counter', 'Confirmation emails by result', None),
+    'greentara_ratelimit_rejected_total': (
+        'counter', 'Requests refused with 429 by scope and bucket', None),
+    'greentara_upload_sessions_total': (
+        'counter', 'Resumable upload sessions by event (created, completed, used, expired)', None),
+    'greentara_upload_bytes_total': (
+        'counter', 'Resumable upload bytes by outcome (stored, rejected, expired)', None),
+    'greentara_jobs_expired_total': (
+        'counter', 'Jobs deactivated by the expiry sweep', None),
+    'greentara_application_status_changes_total': (
+        'counter', 'Application status changes by new status and source (api, admin)', None),
+    'greentara_idempotency_total': (
+        'counter', 'Idempotency-Key retries by outcome (replayed, in_progress, mismatch)', None),
+    'greentara_cv_text_extracted_total': (
+        'counter', 'CVs run through text extraction by result (done, empty, unsupported, failed)', None),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_last_flush = 0.0
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def inc(name, labels=None, amount=1):
+    """Increment a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, labels=None):
+    """Record one observation in a histogram"""
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist[0][i] += 1
+                break
+        else:
+            hist[0][-1] += 1
+        hist[1] += value
+        hist[2] += 1
+
+
+def observe_request(view, method, status, seconds, size, queries, db_seconds):
+    """Record everything the request middleware measures for one response"""
+    labels = {'view': view, 'method': method}
+    inc('greentara_http_requests_total', {'view': view, 'method': method, 'status': str(status)})
+    observe('greentara_http_request_duration_seconds', seconds, labels)
+    observe('greentara_http_request_db_queries', queries, labels)
+    observe('greentara_http_request_db_seconds', db_seconds, labels)
+    if size is not None:
+        observe('greentara_http_response_size_bytes', size, {'view': view})
+
+
+def snapshot():
+    """This process's metrics as JSON-serializable data"""
+    with _lock:
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [
+                [name, dict(labels), list(counts), total, count]
+                for (name, labels), (counts, total, count) in _histograms.items()
+            ],
+        }
+
+
+def flush(force=False):
+    """Write this process's metrics to the shared directory at most every FLUSH_INTERVAL"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    worker_state.write_snapshot(SNAPSHOT_KIND, snapshot())
+
+
+atexit.register(lambda: flush(force=True) if _counters or _histograms else None)
+
+
+def collect():
+    """Merge live metrics from this process with the last snapshot of every other worker"""
+    counters = {}
+    histograms = {}
+    snapshots = list(worker_state.read_snapshots(SNAPSHOT_KIND, exclude_pid=os.getpid()).values())
+    snapshots.append(snapshot())
+    for data in snapshots:
+        for name, labels, value in data.get('counters', []):
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in data.get('histograms', []):
+            key = _key(name, labels)
+            merged = histograms.get(key)
+            if merged is None or len(merged[0]) != len(counts):
+                histograms[key] = [list(counts), total, count]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+    return counters, histograms
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in items
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render():
+    """All workers' metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+            continue
+        for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, {"le": bound})} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, {"le": "+Inf"})} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
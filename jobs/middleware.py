@@ -0,0 +1,225 @@
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+import contextvars
+import os
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import db, metrics, snapshot
+from .log import request_context
+
+
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_query_counter = contextvars.ContextVar('query_counter', default=None)
+
+
+class SyncAsyncMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI, so an
+    async view isn't pushed onto a thread by one sync-only layer. Subclasses
+    implement before(request), whose return value is passed on to
+    after(request, response, state). Neither may block.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.before(request)
+        response = self.get_response(request)
+        return self.after(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        response = await self.get_response(request)
+        return self.after(request, response, state)
+
+    def before(self, request):
+        return None
+
+    def after(self, request, response, state):
+        return response
+
+
+class QueryCounter:
+    """Queries and DB time for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    execute_wrapper that charges each query to the current request's
+    QueryCounter. The counter travels in a context variable, so it follows
+    the request into the thread where async ORM calls run.
+    """
+    counter = _query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.count += 1
+        counter.seconds += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver: add count_queries once per connection"""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def view_label(request):
+    """Low-cardinality label for the matched URL pattern, e.g. /api/jobs/<int:job_id>"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.route is None:
+        return '<unmatched>'
+    return '/' + match.route.rstrip('/')
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware(SyncAsyncMiddleware):
+    """
+    Records latency, DB query count and time, response size and status
+    for every request. Place it first in MIDDLEWARE so it sees the whole
+    request.
+    """
+
+    def before(self, request):
+        counter = QueryCounter()
+        return counter, _query_counter.set(counter), time.perf_counter()
+
+    def after(self, request, response, state):
+        counter, token, started = state
+        elapsed = time.perf_counter() - started
+        _query_counter.reset(token)
+
+        metrics.observe_request(
+            view=view_label(request),
+            method=request.method,
+            status=response.status_code,
+            seconds=elapsed,
+            size=response_size(response),
+            queries=counter.count,
+            db_seconds=counter.seconds,
+        )
+        metrics.flush()
+        db.flush_pool_stats()
+        return response
+
+
+class RequestContextMiddleware(SyncAsyncMiddleware):
+    """
+    Gives each request an ID (reusing a sane incoming X-Request-ID) and a
+    start time, which the logging filter attaches to every record logged
+    while the request runs. The ID is echoed back as X-Request-ID.
+    """
+
+    def before(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        request.request_id = incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        return request_context.set({
+            'request_id': request.request_id,
+            'started': time.perf_counter(),
+            'view': None,
+        })
+
+    def after(self, request, response, token):
+        request_context.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        ctx = request_context.get()
+        if ctx is not None:
+            ctx['view'] = f'{view_func.__module__}.{view_func.__name__}'
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can sit in an async middleware chain. WhiteNoise itself
+    is sync-only, which would make Django run every async view through a
+    thread. In production the lookup is a dict hit and serving just opens
+    the file, so it is done inline. With autorefresh (DEBUG) it scans the
+    disk, so that runs in a thread.
+
+    Also serves the published snapshot (jobs/snapshot.py) from SNAPSHOT_DIR
+    at SNAPSHOT_URL. Those files appear while the process runs, so each is
+    looked up on disk (one stat) when requested, in a thread under ASGI.
+    Hashed files are cached forever; index.html and manifest.json get the
+    normal max-age.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.snapshot_prefix = getattr(settings, 'SNAPSHOT_URL', '')
+        self.snapshot_root = snapshot.snapshot_dir()
+
+    def is_snapshot_url(self, url):
+        return bool(self.snapshot_prefix) and url.startswith(self.snapshot_prefix)
+
+    def find_snapshot_file(self, url):
+        if not self.is_snapshot_url(url):
+            return None
+        relative = url[len(self.snapshot_prefix):] or snapshot.INDEX
+        try:
+            path = safe_join(self.snapshot_root, relative)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        return self.get_static_file(path, url)
+
+    def immutable_file_test(self, path, url):
+        if self.is_snapshot_url(url):
+            return bool(snapshot.HASHED_NAME_RE.search(url))
+        return super().immutable_file_test(path, url)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.find_snapshot_file(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None and self.is_snapshot_url(request.path_info):
+            static_file = await sync_to_async(self.find_snapshot_file)(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:54
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_application_created_at_job_status_job_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColorPreset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('primary_color', models.CharField(max_length=7)),
+                ('primary_dark_color', models.CharField(max_length=7)),
+                ('background_color', models.CharField(max_length=7)),
+                ('header_background', models.CharField(max_length=7)),
+                ('gradient_start', models.CharField(max_length=7)),
+                ('gradient_end', models.CharField(max_length=7)),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Color Preset',
+                'verbose_name_plural': 'Color Presets',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SiteSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('primary_color', models.CharField(default='#1e40af', help_text='Main brand color (e.g., #1e40af for blue)', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('primary_dark_color', models.CharField(default='#1e3a8a', help_text='Darker shade of primary color for hovers', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('background_color', models.CharField(default='#dbeafe', help_text='Page background color', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('header_background', models.CharField(default='#3b82f6', help_text='Header and footer background color', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('gradient_start', models.CharField(default='#2563eb', help_text='Gradient start color (for buttons, modals)', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('gradient_end', models.CharField(default='#1d4ed8', help_text='Gradient end color', max_length=7, validators=[django.core.validators.RegexValidator(message='Enter a valid hex color (e.g., #1e40af)', regex='^#[0-9A-Fa-f]{6}$')])),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Site Theme Settings',
+                'verbose_name_plural': 'Site Theme Settings',
+            },
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Review'), ('reviewed', 'Reviewed'), ('shortlisted', 'Shortlisted'), ('rejected', 'Rejected')], default='pending', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(default='active', max_length=20),
+        ),
+    ]
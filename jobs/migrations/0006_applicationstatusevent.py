@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_job_active_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('application_id', models.BigIntegerField()),
+                ('job_id', models.IntegerField()),
+                ('from_status', models.CharField(max_length=50)),
+                ('to_status', models.CharField(max_length=50)),
+                ('changed_by', models.CharField(blank=True, max_length=150)),
+                ('source', models.CharField(default='api', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Application Status Event',
+                'verbose_name_plural': 'Application Status Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['application_id', 'created_at'], name='status_event_app_idx'), models.Index(fields=['job_id', 'created_at'], name='status_event_job_idx')],
+            },
+        ),
+    ]
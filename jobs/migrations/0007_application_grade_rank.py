@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+from jobs.grades import grade_rank
+
+
+def backfill_grade_rank(apps, schema_editor):
+    """One UPDATE per distinct spelling of kcse_grade; unreadable ones stay 0"""
+    Application = apps.get_model('jobs', 'Application')
+    spellings = Application.objects.order_by().values_list('kcse_grade', flat=True).distinct()
+    for spelling in list(spellings):
+        rank = grade_rank(spelling)
+        if rank:
+            Application.objects.filter(kcse_grade=spelling).update(grade_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_applicationstatusevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='grade_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_grade_rank, migrations.RunPython.noop),
+        # After the backfill, so the index is built once
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['job_id', 'grade_rank'], name='application_job_grade_idx'),
+        ),
+    ]
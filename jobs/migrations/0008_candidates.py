@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_application_grade_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=200)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('phone', models.CharField(blank=True, help_text='E.164, e.g. +254712345678', max_length=20)),
+                ('gender', models.CharField(blank=True, max_length=50)),
+                ('age', models.IntegerField(blank=True, null=True)),
+                ('last_applied_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Candidate',
+                'verbose_name_plural': 'Candidates',
+                'ordering': ['-last_applied_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='candidate',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='applications', to='jobs.candidate'),
+        ),
+        migrations.CreateModel(
+            name='CandidateKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('email', 'Email'), ('phone', 'Phone'), ('name', 'Phonetic name')], max_length=10)),
+                ('value', models.CharField(max_length=254)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='jobs.candidate')),
+            ],
+            options={
+                'verbose_name': 'Candidate Key',
+                'verbose_name_plural': 'Candidate Keys',
+                'indexes': [models.Index(fields=['kind', 'value'], name='candidate_key_lookup_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'name'), _negated=True), fields=('kind', 'value'), name='candidate_key_unique_contact')],
+            },
+        ),
+    ]
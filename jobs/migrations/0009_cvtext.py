@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The full-text index isn't a model field: an external-content FTS5 table
+# kept in step by triggers on SQLite, a generated tsvector column with a
+# GIN index on Postgres. jobs/fulltext.py queries both.
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE jobs_cvtext_fts USING fts5(
+        text, content='jobs_cvtext', content_rowid='application_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER jobs_cvtext_fts_insert AFTER INSERT ON jobs_cvtext BEGIN
+        INSERT INTO jobs_cvtext_fts (rowid, text) VALUES (new.application_id, new.text);
+    END""",
+    """CREATE TRIGGER jobs_cvtext_fts_delete AFTER DELETE ON jobs_cvtext BEGIN
+        INSERT INTO jobs_cvtext_fts (jobs_cvtext_fts, rowid, text) VALUES ('delete', old.application_id, old.text);
+    END""",
+    """CREATE TRIGGER jobs_cvtext_fts_update AFTER UPDATE OF text ON jobs_cvtext BEGIN
+        INSERT INTO jobs_cvtext_fts (jobs_cvtext_fts, rowid, text) VALUES ('delete', old.application_id, old.text);
+        INSERT INTO jobs_cvtext_fts (rowid, text) VALUES (new.application_id, new.text);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS jobs_cvtext_fts_update',
+    'DROP TRIGGER IF EXISTS jobs_cvtext_fts_delete',
+    'DROP TRIGGER IF EXISTS jobs_cvtext_fts_insert',
+    'DROP TABLE IF EXISTS jobs_cvtext_fts',
+]
+POSTGRES_INDEX = [
+    """ALTER TABLE jobs_cvtext ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', text)) STORED""",
+    'CREATE INDEX jobs_cvtext_search_idx ON jobs_cvtext USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS jobs_cvtext_search_idx',
+    'ALTER TABLE jobs_cvtext DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_candidates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVText',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cv_text', serialize=False, to='jobs.application')),
+                ('status', models.CharField(choices=[('done', 'Extracted'), ('empty', 'No text layer'), ('unsupported', 'Unsupported format'), ('failed', 'Failed')], max_length=20)),
+                ('text', models.TextField(blank=True)),
+                ('error', models.CharField(blank=True, max_length=500)),
+                ('source', models.CharField(blank=True, help_text='The CV file the text came from', max_length=255)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'CV Text',
+                'verbose_name_plural': 'CV Texts',
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from jobs.candidates import normalize_phone
+
+
+# Substring search for the admin changelist (jobs/admin_search.py): a
+# trigram FTS5 table over the searched columns, kept in step by triggers,
+# on SQLite; pg_trgm GIN indexes on the expressions Django's icontains
+# compares (UPPER(col::text)) on Postgres.
+SEARCH_COLUMNS = ('full_name', 'email', 'phone_e164', 'job_title')
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE jobs_application_search USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, content='jobs_application', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER jobs_application_search_insert AFTER INSERT ON jobs_application BEGIN
+        INSERT INTO jobs_application_search (rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER jobs_application_search_delete AFTER DELETE ON jobs_application BEGIN
+        INSERT INTO jobs_application_search (jobs_application_search, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER jobs_application_search_update AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)}
+    ON jobs_application BEGIN
+        INSERT INTO jobs_application_search (jobs_application_search, rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in SEARCH_COLUMNS)});
+        INSERT INTO jobs_application_search (rowid, {', '.join(SEARCH_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in SEARCH_COLUMNS)});
+    END""",
+    "INSERT INTO jobs_application_search (jobs_application_search) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS jobs_application_search_update',
+    'DROP TRIGGER IF EXISTS jobs_application_search_delete',
+    'DROP TRIGGER IF EXISTS jobs_application_search_insert',
+    'DROP TABLE IF EXISTS jobs_application_search',
+]
+POSTGRES_INDEX = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX application_{column}_trgm_idx ON jobs_application '
+    f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+    for column in ('full_name', 'email', 'job_title')
+] + [
+    'CREATE INDEX application_phone_e164_trgm_idx ON jobs_application USING gin (phone_e164 gin_trgm_ops)',
+]
+POSTGRES_DROP = [
+    f'DROP INDEX IF EXISTS application_{column}_trgm_idx' for column in SEARCH_COLUMNS
+]
+
+
+def backfill_phone_e164(apps, schema_editor):
+    Application = apps.get_model('jobs', 'Application')
+    rows = Application.objects.order_by().values_list('id', 'phone').iterator(chunk_size=5000)
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for app_id, phone in rows:
+            normalized = normalize_phone(phone)
+            if normalized:
+                batch.append((normalized, app_id))
+            if len(batch) >= 5000:
+                cursor.executemany('UPDATE jobs_application SET phone_e164 = %s WHERE id = %s', batch)
+                batch = []
+        if batch:
+            cursor.executemany('UPDATE jobs_application SET phone_e164 = %s WHERE id = %s', batch)
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_cvtext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='phone_e164',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+        # After the backfill, so each index is built once
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='application_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['phone_e164'], name='application_phone_idx'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
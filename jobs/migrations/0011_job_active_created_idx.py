@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_application_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['is_active', 'created_at'], name='job_active_created_idx'),
+        ),
+    ]
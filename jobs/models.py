@@ -7,6 +7,9 @@
 # ============================================
 
 from django.db import models
+from django.db.models.functions import Lower
+
+from . import candidates, grades
 
 class Job(models.Model):
     title = models.CharField(max_length=200)
@@ -29,6 +32,12 @@ class Job(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Job Posting'
         verbose_name_plural = 'Job Postings'
+        indexes = [
+            # expire_jobs sweeps (is_active, expiry_date < today)
+            models.Index(fields=['is_active', 'expiry_date', 'created_at'], name='job_active_expiry_idx'),
+            # The public listing: is_active, newest first, without a sort
+            models.Index(fields=['is_active', 'created_at'], name='job_active_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.location}"
@@ -48,9 +57,13 @@ class Application(models.Model):
     full_name = models.CharField(max_length=200)
     email = models.EmailField()
     phone = models.CharField(max_length=50)
+    # phone in E.164 ('+254712345678', '' if unreadable), set on save
+    phone_e164 = models.CharField(max_length=16, blank=True, default='', editable=False)
     age = models.IntegerField()
     gender = models.CharField(max_length=50)
     kcse_grade = models.CharField(max_length=10)
+    # kcse_grade on the 12-point scale (A = 12 ... E = 1, 0 unreadable), set on save
+    grade_rank = models.PositiveSmallIntegerField(default=0, editable=False)
     
     # Documents
     cv_document = models.FileField(upload_to='applications/cv/', null=True, blank=True)
@@ -58,6 +71,11 @@ class Application(models.Model):
     certificate_document = models.FileField(upload_to='applications/certificates/', null=True, blank=True)
     additional_documents = models.TextField(null=True, blank=True)
     
+    # The same person's other applications share this (jobs/candidates.py)
+    candidate = models.ForeignKey(
+        'Candidate', null=True, blank=True, on_delete=models.SET_NULL, related_name='applications'
+    )
+    
     # Status and Notes
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True, null=True)
@@ -71,10 +89,30 @@ class Application(models.Model):
         ordering = ['-applied_at']
         verbose_name = 'Job Application'
         verbose_name_plural = 'Job Applications'
+        # Also the index behind the duplicate-application lookups
+        unique_together = [('job_id', 'email')]
+        indexes = [
+            # "C+ or better for this job" is a range scan
+            models.Index(fields=['job_id', 'grade_rank'], name='application_job_grade_idx'),
+            # Prefix searches from the admin (jobs/admin_search.py)
+            models.Index(Lower('email'), name='application_email_lower_idx'),
+            models.Index(fields=['phone_e164'], name='application_phone_idx'),
+        ]
     
     def __str__(self):
         return f"{self.full_name} - {self.job_title} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        self.grade_rank = grades.grade_rank(self.kcse_grade)
+        self.phone_e164 = candidates.normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {'kcse_grade': 'grade_rank', 'phone': 'phone_e164'}
+            kwargs['update_fields'] = set(update_fields) | {
+                derived[name] for name in update_fields if name in derived
+            }
+        super().save(*args, **kwargs)
+    
     def get_additional_docs_list(self):
         """Return list of additional document paths"""
         if self.additional_documents:
@@ -82,6 +120,137 @@ class Application(models.Model):
         return []
 
 
+class Candidate(models.Model):
+    """
+    One person across their applications. The contact details are those of
+    their latest application.
+    """
+    full_name = models.CharField(max_length=200)
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=20, blank=True, help_text='E.164, e.g. +254712345678')
+    gender = models.CharField(max_length=50, blank=True)
+    age = models.IntegerField(null=True, blank=True)
+    last_applied_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-last_applied_at']
+        verbose_name = 'Candidate'
+        verbose_name_plural = 'Candidates'
+    
+    def __str__(self):
+        return f"{self.full_name} <{self.email or self.phone}>"
+
+
+class CandidateKey(models.Model):
+    """
+    A blocking key (normalized email, E.164 phone or phonetic name) and the
+    candidate it belongs to. An email or phone belongs to one candidate; a
+    name key can be shared by several different people.
+    """
+    KINDS = [
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+        ('name', 'Phonetic name'),
+    ]
+    
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='keys')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    value = models.CharField(max_length=254)
+    
+    class Meta:
+        verbose_name = 'Candidate Key'
+        verbose_name_plural = 'Candidate Keys'
+        indexes = [
+            models.Index(fields=['kind', 'value'], name='candidate_key_lookup_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'value'], condition=~models.Q(kind='name'), name='candidate_key_unique_contact',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
+
+class CVText(models.Model):
+    """
+    Text extracted from an application's CV by the extract_cv_text worker,
+    kept out of the Application row. Indexed for full-text search by
+    jobs/fulltext.py (FTS5 on SQLite, tsvector on Postgres).
+    """
+    STATUS_CHOICES = [
+        ('done', 'Extracted'),
+        ('empty', 'No text layer'),
+        ('unsupported', 'Unsupported format'),
+        ('failed', 'Failed'),
+    ]
+    
+    application = models.OneToOneField(
+        Application, primary_key=True, on_delete=models.CASCADE, related_name='cv_text'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    text = models.TextField(blank=True)
+    error = models.CharField(max_length=500, blank=True)
+    source = models.CharField(max_length=255, blank=True, help_text='The CV file the text came from')
+    extracted_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'CV Text'
+        verbose_name_plural = 'CV Texts'
+    
+    def __str__(self):
+        return f"CV text for application #{self.application_id} ({self.status})"
+
+
+class ApplicationStatusEvent(models.Model):
+    """
+    One application's status change. application_id and job_id are plain
+    numbers, like Application.job_id, so the history outlives archived rows.
+    """
+    application_id = models.BigIntegerField()
+    job_id = models.IntegerField()
+    from_status = models.CharField(max_length=50)
+    to_status = models.CharField(max_length=50)
+    changed_by = models.CharField(max_length=150, blank=True)
+    source = models.CharField(max_length=20, default='api')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Application Status Event'
+        verbose_name_plural = 'Application Status Events'
+        indexes = [
+            models.Index(fields=['application_id', 'created_at'], name='status_event_app_idx'),
+            models.Index(fields=['job_id', 'created_at'], name='status_event_job_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.application_id}: {self.from_status} -> {self.to_status}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A submit_application request keyed by its Idempotency-Key header.
+    response_status is null while the first request is still running.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+    
+    def __str__(self):
+        return self.key
+
+
 class SiteContent(models.Model):
     """Site content configuration"""
     site_name = models.CharField(max_length=200, default='Green Tara')
@@ -179,9 +348,20 @@ class SiteSettings(models.Model):
         super().save(*args, **kwargs)
     
     @classmethod
-    def get_settings(cls):
+    def get_settings(cls, using=None):
         """Get or create the singleton settings instance"""
-        settings, created = cls.objects.get_or_create(pk=1)
+        # Plain read first: get_or_create always goes to the primary
+        settings = cls.objects.db_manager(using).filter(pk=1).first()
+        if settings is None:
+            settings, created = cls.objects.get_or_create(pk=1)
+        return settings
+
+    @classmethod
+    async def aget_settings(cls, using=None):
+        """Async version of get_settings"""
+        settings = await cls.objects.db_manager(using).filter(pk=1).afirst()
+        if settings is None:
+            settings, created = await cls.objects.aget_or_create(pk=1)
         return settings
     
     def get_theme_dict(self):
@@ -0,0 +1,172 @@
+# ============================================
+# QUERY BUDGETS - Per-endpoint SQL count regression checks
+# ============================================
+#
+# Each endpoint in query_budgets.json is requested once against a small and
+# once against a large synthetic dataset. An endpoint fails when it runs
+# more queries than its budget, or when its query count grows with the
+# data size (an N+1 pattern).
+
+import json
+import time
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+MANIFEST_PATH = Path(__file__).resolve().parent / 'query_budgets.json'
+
+STAFF_USERNAME = 'querybudget'
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+
+def _staff_user():
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    user, created = User.objects.get_or_create(
+        username=STAFF_USERNAME,
+        defaults={'is_staff': True, 'is_superuser': True},
+    )
+    return user
+
+
+def _url_kwargs():
+    """Values substituted into endpoint URLs like /api/jobs/{job_id}"""
+    from .models import Application, Job
+
+    job = Job.objects.filter(is_active=True).order_by('id').first()
+    app = Application.objects.order_by('id').first()
+    return {
+        'job_id': job.id if job else 0,
+        'email': app.email if app else 'nobody@example.com',
+    }
+
+
+def _call(spec, client, factory, user, kwargs):
+    """Issue one request for an endpoint spec and return the response"""
+    if 'url' in spec:
+        return client.get(spec['url'].format(**kwargs), secure=True)
+
+    # Views without a route are called directly
+    from django.utils.module_loading import import_string
+
+    view = import_string(spec['view'])
+    request = factory.get('/', secure=True)
+    request.user = user
+    if not spec.get('staff'):
+        from django.contrib.auth.models import AnonymousUser
+        request.user = AnonymousUser()
+    return view(request)
+
+
+def measure(endpoints, client, factory, user):
+    """Return {name: {'queries', 'db_ms', 'status'}} for each endpoint spec"""
+    kwargs = _url_kwargs()
+    results = {}
+    for name, spec in endpoints.items():
+        client.logout()
+        if spec.get('staff'):
+            client.force_login(user)
+        # Warm-up request so one-off work (sessions, content types) isn't counted
+        _call(spec, client, factory, user, kwargs)
+        # ...but the catalog cache it filled is: budget the cache-miss path
+        cache.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            response = _call(spec, client, factory, user, kwargs)
+        results[name] = {
+            'queries': len(ctx.captured_queries),
+            'db_ms': round(sum(float(q['time']) for q in ctx.captured_queries) * 1000, 2),
+            'total_ms': round((time.perf_counter() - started) * 1000, 2),
+            'status': response.status_code,
+        }
+    return results
+
+
+def run(manifest, verbosity=1, test_database=True):
+    """
+    Build a throwaway test database, measure every endpoint at the manifest's
+    small and large sizes, and return (results, failures). With
+    test_database=False it measures in the current (empty) database, as a
+    TestCase that already has one does.
+    """
+    from django.test import Client, RequestFactory, override_settings
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+    )
+    from . import synthetic
+
+    endpoints = manifest['endpoints']
+    small = manifest['sizes']['small']
+    large = manifest['sizes']['large']
+
+    if test_database:
+        setup_test_environment()
+        old_config = setup_databases(verbosity=verbosity, interactive=False, aliases={'default'})
+    # Keep the shared cache, rate limits and published snapshot out of it
+    local_cache = override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }, RATELIMIT_ENABLED=False, SNAPSHOT_ON_SAVE=False)
+    local_cache.enable()
+    try:
+        client = Client()
+        factory = RequestFactory()
+        user = _staff_user()
+
+        synthetic.seed(jobs=small['jobs'], applications=small['applications'], seed=1)
+        small_results = measure(endpoints, client, factory, user)
+
+        synthetic.seed(
+            jobs=large['jobs'] - small['jobs'],
+            applications=large['applications'] - small['applications'],
+            seed=2,
+        )
+        large_results = measure(endpoints, client, factory, user)
+    finally:
+        local_cache.disable()
+        if test_database:
+            teardown_databases(old_config, verbosity=verbosity)
+            teardown_test_environment()
+
+    results = {}
+    failures = []
+    for name, spec in endpoints.items():
+        s, l = small_results[name], large_results[name]
+        results[name] = {'small': s, 'large': l}
+        budget = spec.get('max_queries')
+        growth = l['queries'] - s['queries']
+        if s['status'] >= 500 or l['status'] >= 500:
+            failures.append(f"{name}: returned HTTP {l['status']}")
+        if budget is not None and max(s['queries'], l['queries']) > budget:
+            failures.append(f"{name}: {max(s['queries'], l['queries'])} queries, budget is {budget}")
+        if growth > spec.get('max_growth', 0):
+            failures.append(
+                f"{name}: query count grew from {s['queries']} to {l['queries']} "
+                f"with data size (likely N+1)"
+            )
+        max_db_ms = spec.get('max_db_ms')
+        if max_db_ms is not None and l['db_ms'] > max_db_ms:
+            failures.append(f"{name}: {l['db_ms']}ms of DB time, budget is {max_db_ms}ms")
+    return results, failures
+
+
+def update_budgets(manifest, results):
+    """Set each endpoint's max_queries to what was just measured"""
+    for name, result in results.items():
+        manifest['endpoints'][name]['max_queries'] = max(
+            result['small']['queries'], result['large']['queries']
+        )
+    return manifest
@@ -0,0 +1,236 @@
+# ============================================
+# RANKING - Score and shortlist one job's applicants
+# ============================================
+#
+# load() reads a job's applications into columnar NumPy arrays (id, KCSE
+# grade ordinal, age, applied time, certificate uploaded, status) and keeps
+# them in the process until the job's applications change. rank() turns the
+# columns into 0..1 features, takes their weighted sum, knocks out rows that
+# fail the hard filters, and picks the top k with np.partition: O(n) for the
+# cut plus O(k log k) to order the k, with no Python loop over applicants.
+#
+# A cached job is reloaded when its application count or highest id moves
+# (both read from the (job_id, email) index) or its version in the shared
+# cache is bumped: on every Application save/delete, and by bulk writers
+# that bypass signals (call bump_job()).
+#
+# Features:
+#   grade        KCSE ordinal / 12 (A = 1.0, unreadable = 0)
+#   recency      0.5 ** (days since applying / half_life_days)
+#   certificate  1 if the optional KCSE certificate was uploaded
+#   age          1 at ideal_age, falling to 0 at age_tolerance years away
+#                (only when ideal_age is given)
+#
+# NumPy is imported by the functions that use it: apps.py imports this
+# module for application_changed, and every process would otherwise pay
+# for NumPy at boot.
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .grades import GRADE_RANKS, grade_rank
+
+
+FEATURES = ('grade', 'recency', 'certificate', 'age')
+DEFAULT_WEIGHTS = {'grade': 0.6, 'recency': 0.2, 'certificate': 0.2, 'age': 0.0}
+MAX_K = 1000
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class Columns:
+    """One job's applications, a NumPy array per field, in id order"""
+
+    def __init__(self, ids, grade, age, applied, certificate, status):
+        self.ids = ids
+        self.grade = grade
+        self.age = age
+        self.applied = applied
+        self.certificate = certificate
+        self.status = status
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _version_key(job_id):
+    return f'ranking:job:{job_id}:version'
+
+
+def bump_job(job_id):
+    """Retire every worker's cached columns for a job"""
+    try:
+        cache.incr(_version_key(job_id))
+    except ValueError:
+        cache.set(_version_key(job_id), 1, timeout=None)
+
+
+def application_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Application"""
+    bump_job(instance.job_id)
+
+
+def _fingerprint(job_id):
+    """Changes whenever an application for the job is added, edited or removed"""
+    from .models import Application
+    stats = Application.objects.filter(job_id=job_id).aggregate(count=Count('id'), last_id=Max('id'))
+    return stats['count'], stats['last_id'], cache.get_or_set(_version_key(job_id), 0, timeout=None)
+
+
+def _read(job_id):
+    import numpy as np
+    from .models import Application
+    rows = list(
+        Application.objects.filter(job_id=job_id).order_by('id')
+        .values_list('id', 'grade_rank', 'age', 'applied_at', 'certificate_document', 'status')
+    )
+    n = len(rows)
+    ids, grades, ages, applied, certificates, statuses = zip(*rows) if rows else ((),) * 6
+    return Columns(
+        ids=np.array(ids, dtype=np.int64),
+        grade=np.array(grades, dtype=np.int8),
+        age=np.array(ages, dtype=np.int16),
+        applied=np.fromiter((dt.timestamp() for dt in applied), dtype=np.float64, count=n),
+        certificate=np.fromiter((bool(name) for name in certificates), dtype=bool, count=n),
+        status=np.array(statuses, dtype=str),
+    )
+
+
+def load(job_id):
+    """Columns for a job, from the per-process cache while still current"""
+    fingerprint = _fingerprint(job_id)
+    with _cache_lock:
+        cached = _cache.get(job_id)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+    columns = _read(job_id)
+    with _cache_lock:
+        _cache.pop(job_id, None)
+        _cache[job_id] = (fingerprint, columns)
+        # Oldest-loaded jobs go first
+        while len(_cache) > getattr(settings, 'RANKING_CACHE_JOBS', 8):
+            _cache.pop(next(iter(_cache)))
+    return columns
+
+
+def features(columns, now=None, half_life_days=None, ideal_age=None, age_tolerance=10):
+    """{feature name: float array in 0..1}"""
+    import numpy as np
+    now = (now or timezone.now()).timestamp()
+    half_life_days = half_life_days or getattr(settings, 'RANKING_HALF_LIFE_DAYS', 30)
+    days = np.maximum(now - columns.applied, 0) / 86400.0
+    result = {
+        'grade': columns.grade / float(max(GRADE_RANKS.values())),
+        'recency': np.power(0.5, days / half_life_days),
+        'certificate': columns.certificate.astype(np.float64),
+        'age': np.zeros(len(columns)),
+    }
+    if ideal_age is not None:
+        result['age'] = np.clip(1 - np.abs(columns.age - ideal_age) / float(age_tolerance), 0, 1)
+    return result
+
+
+def rank(job_id, k=50, weights=None, min_grade=None, min_age=None, max_age=None,
+         require_certificate=False, statuses=None, ideal_age=None, age_tolerance=10,
+         half_life_days=None, now=None):
+    """
+    Top k applicants for a job. Returns {'total', 'eligible', 'took_ms',
+    'results'}, results being [{'id', 'score', 'components'}] best first
+    (ties go to the earlier application). Scores are the weighted mean of
+    the features, 0..1.
+    """
+    import numpy as np
+    started = time.perf_counter()
+    columns = load(job_id)
+    weights = dict(getattr(settings, 'RANKING_WEIGHTS', DEFAULT_WEIGHTS), **(weights or {}))
+    if ideal_age is None:
+        weights['age'] = 0.0
+    total_weight = sum(weights.get(name, 0.0) for name in FEATURES)
+    if total_weight <= 0:
+        raise ValueError('At least one weight must be positive')
+
+    values = features(columns, now, half_life_days, ideal_age, age_tolerance)
+    score = np.zeros(len(columns))
+    for name in FEATURES:
+        if weights.get(name):
+            score += weights[name] * values[name]
+    score /= total_weight
+
+    mask = np.ones(len(columns), dtype=bool)
+    if min_grade:
+        mask &= columns.grade >= min_grade
+    if min_age is not None:
+        mask &= columns.age >= min_age
+    if max_age is not None:
+        mask &= columns.age <= max_age
+    if require_certificate:
+        mask &= columns.certificate
+    if statuses:
+        mask &= np.isin(columns.status, list(statuses))
+
+    eligible = np.flatnonzero(mask)
+    k = max(0, min(k, len(eligible)))
+    if not k:
+        top = eligible[:0]
+    elif k < len(eligible):
+        # The k-th best score by partition; of the rows tied with it,
+        # the earliest (eligible is in id order) fill the places left
+        negated = -score[eligible]
+        kth = np.partition(negated, k - 1)[k - 1]
+        better = eligible[negated < kth]
+        tied = eligible[negated == kth]
+        top = np.concatenate((better, tied[:k - len(better)]))
+    else:
+        top = eligible
+    # Best first; rows are in id order, so the id breaks ties
+    top = top[np.lexsort((columns.ids[top], -score[top]))]
+
+    results = [
+        {
+            'id': int(columns.ids[i]),
+            'score': round(float(score[i]), 4),
+            'components': {name: round(float(values[name][i]), 4) for name in FEATURES if weights.get(name)},
+        }
+        for i in top
+    ]
+    return {
+        'total': len(columns),
+        'eligible': len(eligible),
+        'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        'results': results,
+    }
+
+
+def options_from_query(query):
+    """rank() keyword arguments from request.GET; ValueError on bad input"""
+    options = {'k': min(int(query.get('k', 50)), MAX_K)}
+    weights = {}
+    for name in FEATURES:
+        if query.get(f'w_{name}') not in (None, ''):
+            weights[name] = float(query[f'w_{name}'])
+            if weights[name] < 0:
+                raise ValueError('Weights must not be negative')
+    if weights:
+        options['weights'] = weights
+    if query.get('min_grade'):
+        options['min_grade'] = grade_rank(query['min_grade'])
+        if not options['min_grade']:
+            raise ValueError(f"Unknown grade {query['min_grade']!r}")
+    for name in ('min_age', 'max_age', 'ideal_age', 'age_tolerance'):
+        if query.get(name) not in (None, ''):
+            options[name] = int(query[name])
+    if query.get('half_life_days'):
+        options['half_life_days'] = float(query['half_life_days'])
+    if options.get('half_life_days', 1) <= 0 or options.get('age_tolerance', 1) <= 0:
+        raise ValueError('half_life_days and age_tolerance must be positive')
+    if query.get('require_certificate') in ('1', 'true', 'on'):
+        options['require_certificate'] = True
+    if query.get('status'):
+        options['statuses'] = [s for s in query['status'].split(',') if s]
+    return options
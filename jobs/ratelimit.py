@@ -0,0 +1,169 @@
+# ============================================
+# RATE LIMITS - Token buckets shared by every worker on the host
+# ============================================
+#
+# Buckets live in a small memory-mapped file (RATELIMIT_FILE): a fixed
+# table of slots, each holding a key hash, the token count and the time
+# it was last updated. A slot is updated under an fcntl lock on just its
+# bytes, so all gunicorn workers see the same buckets without a round
+# trip to a cache server. Keys that hash to the same slot reset each
+# other, which only ever errs on the side of letting a request through.
+#
+# @rate_limit(scope) checks the per-IP, per-email (when the email is in
+# the URL) and global buckets from RATELIMITS[scope] before the view
+# runs, i.e. before the request body is read, and answers 429 with
+# Retry-After when one is empty.
+
+import functools
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are per process
+    fcntl = None
+
+
+SLOT = struct.Struct('<Qdd')  # key hash, tokens, last update (unix time)
+
+_table = None
+_table_lock = threading.Lock()
+
+
+class BucketTable:
+    def __init__(self, path, slots):
+        self.slots = slots
+        self.lock = threading.Lock()
+        size = slots * SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+
+    def take(self, key, capacity, period, cost=1):
+        """
+        Take `cost` tokens from the bucket for `key`, which holds up to
+        `capacity` tokens and refills completely every `period` seconds.
+        Returns (allowed, seconds until enough tokens). A negative cost
+        puts tokens back.
+        """
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        offset = (digest % self.slots) * SLOT.size
+        rate = capacity / period
+        with self.lock:
+            if fcntl:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                stored, tokens, updated = SLOT.unpack_from(self.map, offset)
+                now = time.time()
+                if stored != digest:
+                    tokens, updated = capacity, now
+                tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens = min(capacity, tokens - cost)
+                SLOT.pack_into(self.map, offset, digest, tokens, now)
+            finally:
+                if fcntl:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, SLOT.size, offset)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+def table():
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                path = getattr(settings, 'RATELIMIT_FILE', '') or os.path.join(
+                    tempfile.gettempdir(), 'greentara-ratelimit.bin'
+                )
+                _table = BucketTable(path, getattr(settings, 'RATELIMIT_SLOTS', 65536))
+    return _table
+
+
+def client_ip(request):
+    """
+    The client address. Behind RATELIMIT_TRUSTED_PROXIES proxies, each of
+    which appends to X-Forwarded-For, the client is that many entries from
+    the end; anything before that was sent by the client and can be forged.
+    """
+    proxies = getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', 0)
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def too_many_requests(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = JsonResponse({'error': 'Too many requests, please try again shortly', 'retryAfter': seconds},
+                            status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def admit(request, scope, email=None, buckets=('ip', 'email', 'global')):
+    """
+    Take a token from each of the scope's buckets. Returns None if the
+    request may proceed, or a 429 response. Tokens already taken are
+    put back when a later bucket refuses, so a rejected request costs
+    nothing.
+    """
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return None
+    limits = settings.RATELIMITS.get(scope, {})
+    keys = {
+        'ip': f'{scope}:ip:{client_ip(request)}',
+        'email': f'{scope}:email:{email.strip().lower()}' if email else None,
+        'global': f'{scope}:global',
+    }
+    taken = []
+    for bucket in buckets:
+        if bucket not in limits or keys[bucket] is None:
+            continue
+        capacity, period = limits[bucket]
+        allowed, retry_after = table().take(keys[bucket], capacity, period)
+        if not allowed:
+            for key, capacity, period in taken:
+                table().take(key, capacity, period, cost=-1)
+            metrics.inc('greentara_ratelimit_rejected_total', {'scope': scope, 'bucket': bucket})
+            return too_many_requests(retry_after)
+        taken.append((keys[bucket], capacity, period))
+    return None
+
+
+def rate_limit(scope, email_kwarg=None):
+    """
+    Admission control for a view, before it reads the body. OPTIONS
+    preflights are free. With email_kwarg, the URL argument of that name
+    feeds the per-email bucket.
+    """
+    def decorator(view):
+        def check(request, kwargs):
+            if request.method == 'OPTIONS':
+                return None
+            return admit(request, scope, email=kwargs.get(email_kwarg) if email_kwarg else None)
+
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return check(request, kwargs) or await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return check(request, kwargs) or view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,163 @@
+# ============================================
+# READ REPLICA ROUTING
+# ============================================
+#
+# Views decorated with @replica_reads send their reads to a healthy
+# replica from DATABASE_REPLICA_URLS. Everything else, every write, and
+# any request from a client that wrote recently (read-your-writes) stays
+# on the primary.
+
+import contextvars
+import functools
+import itertools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .middleware import SyncAsyncMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'gt_primary_pin'
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_pinned = contextvars.ContextVar('primary_pinned', default=False)
+
+_health = {}
+_health_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def replica_reads(view):
+    """Let a read-only view's queries go to a replica"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def _check(alias):
+    """Return (healthy, lag_seconds) for one replica"""
+    try:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT CASE WHEN pg_is_in_recovery() '
+                    'THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END'
+                )
+                lag = cursor.fetchone()[0]
+                lag = float(lag) if lag is not None else 0.0
+            else:
+                cursor.execute('SELECT 1')
+                lag = 0.0
+    except Exception:
+        logger.warning('Replica health check failed', exc_info=True, extra={'alias': alias})
+        return False, None
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+    if lag > max_lag:
+        logger.warning('Replica lagging', extra={'alias': alias, 'lag_seconds': lag})
+        return False, lag
+    return True, lag
+
+
+def is_healthy(alias):
+    """Cached health per replica, re-checked every REPLICA_HEALTH_INTERVAL seconds"""
+    interval = getattr(settings, 'REPLICA_HEALTH_INTERVAL', 5)
+    now = time.monotonic()
+    with _health_lock:
+        state = _health.get(alias)
+        if state is not None and now - state['checked'] < interval:
+            return state['healthy']
+        # Claim the check so concurrent threads keep using the old answer
+        _health[alias] = {
+            'healthy': state['healthy'] if state else False,
+            'lag': state['lag'] if state else None,
+            'checked': now,
+        }
+    healthy, lag = _check(alias)
+    with _health_lock:
+        _health[alias] = {'healthy': healthy, 'lag': lag, 'checked': time.monotonic()}
+    return healthy
+
+
+def health_report():
+    return {alias: dict(_health.get(alias, {'healthy': None, 'lag': None})) for alias in replica_aliases()}
+
+
+def pin_to_primary():
+    """Send the rest of this request's reads to the primary"""
+    _pinned.set(True)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _pinned.get():
+            return None
+        aliases = replica_aliases()
+        if not aliases:
+            return None
+        start = next(_round_robin)
+        for i in range(len(aliases)):
+            alias = aliases[(start + i) % len(aliases)]
+            if is_healthy(alias):
+                return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return not db.startswith('replica_')
+
+
+class ReplicaPinMiddleware(SyncAsyncMiddleware):
+    """
+    Read-your-writes: after a client sends a write (POST/PUT/PATCH/DELETE),
+    a short-lived cookie keeps its reads on the primary for
+    REPLICA_PIN_SECONDS, longer than replicas are allowed to lag.
+    """
+
+    UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def before(self, request):
+        pinned_until = request.COOKIES.get(PIN_COOKIE, '')
+        return _pinned.set(pinned_until.isdigit() and int(pinned_until) > time.time())
+
+    def after(self, request, response, token):
+        _pinned.reset(token)
+        if request.method in self.UNSAFE_METHODS and response.status_code < 500 and replica_aliases():
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + seconds)),
+                max_age=seconds, httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,229 @@
+# ============================================
+# SLOW QUERY LOG - Threshold logging with EXPLAIN capture
+# ============================================
+#
+# An execute_wrapper installed on every database connection times each
+# query. Anything over SLOW_QUERY_THRESHOLD_MS is logged with the view
+# that issued it and a short stack summary. The first time a statement
+# shape becomes one of the slowest seen, its plan is captured with
+# EXPLAIN / EXPLAIN QUERY PLAN. Recent slow queries and plans are kept in
+# ring buffers and shared between workers through worker_state.
+
+import atexit
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+
+from django.conf import settings
+
+from . import worker_state
+from .log import request_context
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KIND = 'slowqueries'
+FLUSH_INTERVAL = 5.0
+
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+_local = threading.local()
+_recent = None
+_plans = {}
+_last_flush = 0.0
+
+
+def threshold_ms():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+
+
+def _buffer():
+    global _recent
+    if _recent is None:
+        _recent = deque(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 200))
+    return _recent
+
+
+def query_shape(sql):
+    """Normalize SQL so the same statement with different IN-list lengths groups together"""
+    return _IN_LIST_RE.sub('(...)', _SPACE_RE.sub(' ', sql).strip())
+
+
+def _shape_id(shape):
+    return hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+def _stack_summary(limit=6):
+    """The innermost frames that led to this query, skipping the ORM and this module"""
+    base = str(settings.BASE_DIR)
+    frames = []
+    for f in traceback.extract_stack()[:-3]:
+        if f.filename == __file__ or f'{os.sep}django{os.sep}db{os.sep}' in f.filename:
+            continue
+        path = os.path.relpath(f.filename, base) if f.filename.startswith(base) else f.filename
+        if 'site-packages' in path:
+            path = path.split('site-packages' + os.sep, 1)[1]
+        frames.append(f'{path}:{f.lineno} in {f.name}')
+    return frames[-limit:]
+
+
+def _explain(connection, sql, params):
+    """Run EXPLAIN for a statement; returns the plan as text, or None"""
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN '
+    elif connection.vendor == 'mysql':
+        prefix = 'EXPLAIN '
+    else:
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _local.explaining = False
+    return '\n'.join(' | '.join(str(col) for col in row) for row in rows)
+
+
+def _wants_plan(shape_id, duration_ms):
+    """Explain a shape once, and only while it is among the slowest seen"""
+    existing = _plans.get(shape_id)
+    if existing is not None:
+        return existing['plan'] is None
+    top = getattr(settings, 'SLOW_QUERY_EXPLAIN_TOP', 20)
+    if len(_plans) < top:
+        return True
+    return duration_ms > min(p['max_ms'] for p in _plans.values())
+
+
+def _record(connection, sql, params, many, duration_ms):
+    ctx = request_context.get()
+    shape = query_shape(sql)
+    shape_id = _shape_id(shape)
+    entry = {
+        'ts': time.time(),
+        'duration_ms': round(duration_ms, 2),
+        'alias': connection.alias,
+        'shape_id': shape_id,
+        'sql': shape[:2000],
+        'view': ctx['view'] if ctx else None,
+        'request_id': ctx['request_id'] if ctx else None,
+        'stack': _stack_summary(),
+    }
+    logger.warning('Slow query', extra={
+        'duration_ms': entry['duration_ms'],
+        'shape_id': shape_id,
+        'sql': entry['sql'],
+        'view': entry['view'],
+        'stack': entry['stack'],
+    })
+
+    plan = None
+    explainable = not many and shape.lstrip('( ').upper().startswith(('SELECT', 'WITH'))
+    with _lock:
+        wants_plan = explainable and _wants_plan(shape_id, duration_ms)
+    if wants_plan:
+        plan = _explain(connection, sql, params)
+
+    with _lock:
+        _buffer().append(entry)
+        info = _plans.get(shape_id)
+        if info is None:
+            info = _plans[shape_id] = {
+                'shape_id': shape_id, 'sql': entry['sql'], 'count': 0,
+                'max_ms': 0.0, 'view': entry['view'], 'plan': None,
+            }
+        info['count'] += 1
+        if duration_ms > info['max_ms']:
+            info['max_ms'] = round(duration_ms, 2)
+            info['view'] = entry['view']
+        if plan is not None:
+            info['plan'] = plan
+        _trim_plans()
+    flush()
+
+
+def _trim_plans():
+    top = getattr(settings, 'SLOW_QUERY_EXPLAIN_TOP', 20)
+    if len(_plans) > top * 2:
+        keep = sorted(_plans.values(), key=lambda p: p['max_ms'], reverse=True)[:top]
+        _plans.clear()
+        _plans.update({p['shape_id']: p for p in keep})
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= threshold_ms():
+        try:
+            _record(context['connection'], sql, params, many, duration_ms)
+        except Exception:
+            logger.exception('Could not record slow query')
+    return result
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver: add the wrapper once per connection"""
+    if threshold_ms() <= 0:
+        return
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def snapshot():
+    with _lock:
+        return {'recent': list(_buffer()), 'plans': list(_plans.values())}
+
+
+def flush(force=False):
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    worker_state.write_snapshot(SNAPSHOT_KIND, snapshot())
+
+
+atexit.register(lambda: flush(force=True) if _recent else None)
+
+
+def collect(limit=50):
+    """Slow queries and plans from every worker, slowest shapes first"""
+    snapshots = list(worker_state.read_snapshots(SNAPSHOT_KIND, exclude_pid=os.getpid()).values())
+    snapshots.append(snapshot())
+
+    recent = []
+    plans = {}
+    for data in snapshots:
+        recent.extend(data.get('recent', []))
+        for info in data.get('plans', []):
+            merged = plans.get(info['shape_id'])
+            if merged is None:
+                plans[info['shape_id']] = dict(info)
+                continue
+            merged['count'] += info['count']
+            if info['max_ms'] > merged['max_ms']:
+                merged['max_ms'] = info['max_ms']
+                merged['view'] = info['view']
+            merged['plan'] = merged['plan'] or info['plan']
+
+    recent.sort(key=lambda e: e['ts'], reverse=True)
+    return {
+        'threshold_ms': threshold_ms(),
+        'shapes': sorted(plans.values(), key=lambda p: p['max_ms'], reverse=True)[:limit],
+        'recent': recent[:limit],
+    }
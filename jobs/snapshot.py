@@ -0,0 +1,258 @@
+# ============================================
+# STATIC SNAPSHOT - The public job board as plain files
+# ============================================
+#
+# publish() writes what the public pages need into SNAPSHOT_DIR, so
+# WhiteNoise (SNAPSHOT_URL, see middleware.StaticFilesMiddleware), nginx
+# or a CDN can serve the board without running a view or touching the
+# database:
+#
+#   files/jobs.<hash>.json        the active catalog, as /api/jobs
+#   files/job-<id>.<hash>.json    each active job, as /api/jobs/<id>
+#   files/content.<hash>.json     site content and theme, as /api/content
+#   files/index.<hash>.html       the board with the catalog and content inlined
+#   index.html                    the same page under a fixed name
+#   manifest.json                 which hashed file is current for each
+#
+# Hashed files are named after their content, never change and can be
+# cached forever; an unchanged job keeps its file. index.html and
+# manifest.json are the only files that change, each swapped in whole
+# with os.replace(), manifest last. A page reads the manifest to find
+# newer data, so it always sees one consistent publish.
+#
+# `manage.py publish_snapshot --loop` keeps the snapshot current; an
+# unchanged catalog costs a build and no writes. With SNAPSHOT_ON_SAVE,
+# saving a Job, SiteContent or SiteSettings also publishes once the
+# transaction commits (schedule_publish); bulk writes call it themselves.
+# Hashed files no longer in the manifest are deleted after
+# SNAPSHOT_RETENTION seconds, since pages loaded earlier may still ask
+# for them.
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import catalog
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+INDEX = 'index.html'
+FILES_DIR = 'files'
+HASH_LENGTH = 12
+# A published file named after its content, e.g. jobs.1f2e3d4c5b6a.json
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}\.\w+$' % HASH_LENGTH)
+# Smaller files aren't worth a .gz next to them
+GZIP_MIN_SIZE = 1024
+
+# Set while this thread publishes: build() can save (the first read
+# creates the SiteContent row), which must not publish again inside it
+_local = threading.local()
+
+
+def snapshot_dir():
+    return getattr(settings, 'SNAPSHOT_DIR', None) or os.path.join(settings.BASE_DIR, 'snapshot')
+
+
+def read_manifest(directory=None):
+    """The published manifest, or None before the first publish"""
+    try:
+        with open(os.path.join(directory or snapshot_dir(), MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _publish_lock(directory):
+    """One publish at a time per snapshot directory, across processes"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.publish-lock'), 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _replace(path, data):
+    """Write `data` to `path` atomically"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write(directory, path, data):
+    """Write `data` (and a .gz of it) unless an identical file is there already"""
+    full_path = os.path.join(directory, path)
+    if os.path.exists(full_path):
+        # Restart the retention clock of a file that is current again
+        os.utime(full_path)
+        return False
+    if len(data) >= GZIP_MIN_SIZE:
+        _replace(full_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    _replace(full_path, data)
+    return True
+
+
+def _hashed_name(stem, extension, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f'{FILES_DIR}/{stem}.{digest}.{extension}'
+
+
+def _json(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def build():
+    """Everything publish() writes, as {'files': {path: bytes}, 'manifest': {...}, 'index': bytes}"""
+    jobs = catalog.get_jobs(fresh=True)
+    content = {**catalog.get_site_content(fresh=True), 'theme': catalog.get_theme(fresh=True)}
+
+    files = {}
+
+    def add(stem, extension, data):
+        name = _hashed_name(stem, extension, data)
+        files[name] = data
+        return name
+
+    manifest = {
+        'jobs': add('jobs', 'json', _json(jobs)),
+        'content': add('content', 'json', _json(content)),
+        'job_files': {str(job['id']): add(f"job-{job['id']}", 'json', _json(job)) for job in jobs},
+    }
+
+    # The page finds the manifest (for updates) relative to itself
+    def render_index(manifest_url):
+        return render_to_string('index.html', {
+            'snapshot': {
+                'manifest': manifest_url,
+                'jobs_file': manifest['jobs'],
+                'jobs': jobs,
+                'content': content,
+            },
+        }).encode()
+
+    manifest['index'] = add('index', 'html', render_index(f'../{MANIFEST}'))
+    index = render_index(MANIFEST)
+    # Changes when anything published changes
+    manifest['digest'] = hashlib.sha256(''.join(sorted(files)).encode()).hexdigest()[:HASH_LENGTH]
+    return {'files': files, 'manifest': manifest, 'index': index}
+
+
+def _collect_garbage(directory, current, retention):
+    """Delete hashed files not in `current` and untouched for `retention` seconds"""
+    root = os.path.join(directory, FILES_DIR)
+    cutoff = time.time() - retention
+    deleted = 0
+    for name in os.listdir(root):
+        # Also clears temporary files left by a crash
+        if f'{FILES_DIR}/{name.removesuffix(".gz")}' in current:
+            continue
+        full_path = os.path.join(root, name)
+        try:
+            if os.stat(full_path).st_mtime < cutoff:
+                os.unlink(full_path)
+                deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
+
+
+def publish(directory=None, force=False):
+    """
+    Render the public board into `directory` (SNAPSHOT_DIR) and swap in
+    the new manifest. Returns {'changed', 'written', 'files', 'deleted',
+    'digest', 'seconds'}; nothing is swapped when nothing changed.
+    """
+    directory = directory or snapshot_dir()
+    started = time.perf_counter()
+    os.makedirs(os.path.join(directory, FILES_DIR), exist_ok=True)
+    retention = getattr(settings, 'SNAPSHOT_RETENTION', 86400)
+
+    with _publish_lock(directory):
+        _local.publishing = True
+        try:
+            snapshot = build()
+        finally:
+            _local.publishing = False
+        manifest = snapshot['manifest']
+        previous = read_manifest(directory)
+        changed = force or not previous or previous.get('digest') != manifest['digest']
+        written = 0
+        if changed:
+            for path, data in snapshot['files'].items():
+                written += _write(directory, path, data)
+            manifest['published_at'] = timezone.now().isoformat()
+            # The page before the manifest: a page that loads the new
+            # manifest can always fetch every file it names
+            _replace(os.path.join(directory, INDEX), snapshot['index'])
+            _replace(os.path.join(directory, MANIFEST), _json(manifest))
+        deleted = _collect_garbage(directory, set(snapshot['files']), retention)
+
+    summary = {
+        'changed': changed,
+        'written': written,
+        'files': len(snapshot['files']),
+        'deleted': deleted,
+        'digest': manifest['digest'],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    if changed:
+        logger.info('Snapshot published', extra={
+            'snapshot_dir': directory,
+            'digest': manifest['digest'],
+            'files_written': written,
+            'files_deleted': deleted,
+            'seconds': summary['seconds'],
+        })
+    return summary
+
+
+def _publish_pending():
+    try:
+        publish()
+    except Exception:
+        # A failed publish leaves the previous snapshot in place
+        logger.exception('Snapshot publish failed')
+
+
+def schedule_publish(**kwargs):
+    """
+    Publish once the current transaction commits (also usable as a signal
+    receiver). Several saves in one transaction publish once.
+    """
+    if not getattr(settings, 'SNAPSHOT_ON_SAVE', False) or getattr(_local, 'publishing', False):
+        return
+    connection = transaction.get_connection()
+    if any(callback[1] is _publish_pending for callback in connection.run_on_commit):
+        return
+    transaction.on_commit(_publish_pending)
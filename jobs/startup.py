@@ -0,0 +1,192 @@
+# ============================================
+# STARTUP PROFILE - Import-time cost of booting the project
+# ============================================
+#
+# Boots the project in a fresh interpreter under `python -X importtime`
+# and turns the report on stderr into a module tree. Phase timings
+# (settings, app registry, WSGI handler, URLconf) are measured inside the
+# child. Totals are compared against startup_baseline.json so a change
+# that slows cold starts shows up.
+
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'startup_baseline.json'
+
+PROJECT_PACKAGES = ('greentara', 'jobs')
+
+# Run in the child: times each boot phase and prints them as JSON
+BOOT_SCRIPT = '''
+import importlib, json, os, sys, time
+# -X importtime only times imports that go through the import statement,
+# and Django loads settings, models, admin and URLconfs with
+# importlib.import_module. Route those through __import__ (before Django
+# binds import_module) so project modules show up in the tree.
+_import_module = importlib.import_module
+def import_module(name, package=None):
+    if package is None and not name.startswith('.'):
+        __import__(name)
+        return sys.modules[name]
+    return _import_module(name, package)
+importlib.import_module = import_module
+t0 = time.perf_counter()
+phases = {}
+def mark(name):
+    global t0
+    now = time.perf_counter()
+    phases[name] = round((now - t0) * 1000, 2)
+    t0 = now
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'greentara.settings')
+import django
+from django.conf import settings
+mark('django')
+settings.INSTALLED_APPS
+mark('settings')
+django.setup(set_prefix=False)
+mark('apps')
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+mark('wsgi_handler')
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark('urls')
+print('PHASES ' + json.dumps(phases))
+'''
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+
+def parse_importtime(stderr):
+    """
+    Turn `-X importtime` output into a list of root nodes. Each node is
+    {'name', 'self_ms', 'cumulative_ms', 'children'}. Python reports a
+    module after its imports, so children come before their parent.
+    """
+    pending = {}  # depth -> children waiting for their parent
+    roots = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        node = {
+            'name': name,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'children': pending.pop(depth + 1, []),
+        }
+        if depth == 0:
+            roots.append(node)
+        else:
+            pending.setdefault(depth, []).append(node)
+    return roots
+
+
+def _walk(nodes, parents=()):
+    for node in nodes:
+        yield node, parents
+        yield from _walk(node['children'], parents + (node['name'],))
+
+
+def _is_project(name):
+    return name.split('.')[0] in PROJECT_PACKAGES
+
+
+def heavy_imports(roots, min_ms):
+    """
+    Modules imported straight from project code that cost at least
+    min_ms. These are the imports this project chose to make at module
+    level, so they are the ones that could be moved into the function
+    that needs them.
+    """
+    found = []
+    for node, parents in _walk(roots):
+        if _is_project(node['name']) or node['cumulative_ms'] < min_ms:
+            continue
+        # Only the first hop out of project code
+        if not parents or not _is_project(parents[-1]):
+            continue
+        found.append({'module': node['name'], 'importer': parents[-1], 'ms': round(node['cumulative_ms'], 2)})
+    found.sort(key=lambda item: item['ms'], reverse=True)
+    return found
+
+
+def package_totals(roots):
+    """Import time per top-level package, including whatever it pulled in first"""
+    totals = {}
+    for node in roots:
+        package = node['name'].split('.')[0]
+        totals[package] = totals.get(package, 0.0) + node['cumulative_ms']
+    return dict(sorted(((k, round(v, 2)) for k, v in totals.items()), key=lambda kv: kv[1], reverse=True))
+
+
+def profile_once(env=None):
+    """Boot once in a child interpreter and return (phases, roots)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        cwd=settings.BASE_DIR, env=dict(os.environ, **(env or {})),
+        capture_output=True, text=True,
+    )
+    phases = None
+    for line in result.stdout.splitlines():
+        if line.startswith('PHASES '):
+            phases = json.loads(line[len('PHASES '):])
+    if result.returncode != 0 or phases is None:
+        raise RuntimeError(f'Boot failed:\n{result.stderr[-2000:]}')
+    return phases, parse_importtime(result.stderr)
+
+
+def profile(runs=3, env=None):
+    """
+    Boot `runs` times and keep the run with the median total, so one
+    cold disk cache or noisy neighbour doesn't decide the result.
+    """
+    samples = [profile_once(env) for _ in range(runs)]
+    samples.sort(key=lambda sample: sum(sample[0].values()))
+    phases, roots = samples[len(samples) // 2]
+    return {
+        'total_ms': round(sum(phases.values()), 2),
+        'all_totals_ms': [round(sum(p.values()), 2) for p, _ in samples],
+        'import_ms': round(sum(node['cumulative_ms'] for node in roots), 2),
+        'phases': phases,
+        'packages': package_totals(roots),
+        'roots': roots,
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    baseline = {
+        'total_ms': report['total_ms'],
+        'import_ms': report['import_ms'],
+        'phases': report['phases'],
+        'packages': dict(list(report['packages'].items())[:15]),
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+
+def compare(report, baseline, tolerance):
+    """Failure messages for totals that grew more than `tolerance` (a fraction) over the baseline"""
+    failures = []
+    for key in ('total_ms', 'import_ms'):
+        before, after = baseline.get(key), report[key]
+        if before and after > before * (1 + tolerance):
+            failures.append(f'{key}: {after:.0f}ms, baseline {before:.0f}ms (+{(after / before - 1) * 100:.0f}%)')
+    return failures
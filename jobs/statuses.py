@@ -0,0 +1,162 @@
+# ============================================
+# APPLICATION STATUSES - Bulk changes with history
+# ============================================
+#
+# bulk_set_status() moves a set of applications (a queryset, from a list
+# of IDs or a filter) to a new status a batch at a time. Each batch is one
+# transaction: read the batch's (id, job_id, status), one UPDATE ... WHERE
+# id IN (...), and one bulk_create of ApplicationStatusEvent rows recording
+# who moved what from where. Rows already in the target status are left
+# alone, so re-running a change is a no-op and writes no history.
+
+import logging
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import metrics, ranking
+from .db import serialized_write
+from .grades import grade_rank
+
+
+logger = logging.getLogger(__name__)
+
+MAX_IDS = 50000
+
+# Filter keys the bulk-status API understands -> ORM lookups
+FILTERS = {
+    'job_id': 'job_id',
+    'job_ids': 'job_id__in',
+    'status': 'status',
+    'statuses': 'status__in',
+    'kcse_grade': 'kcse_grade',
+    'kcse_grades': 'kcse_grade__in',
+    'min_grade': 'grade_rank__gte',
+    'gender': 'gender',
+    'min_age': 'age__gte',
+    'max_age': 'age__lte',
+    'applied_after': 'applied_at__gte',
+    'applied_before': 'applied_at__lt',
+}
+
+
+def statuses():
+    from .models import Application
+    return [value for value, label in Application.STATUS_CHOICES]
+
+
+def _parse_when(value):
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        day = parse_date(value) if isinstance(value, str) else None
+        if day is None:
+            raise ValueError('expected an ISO date or datetime')
+        parsed = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_queryset(ids=None, filters=None):
+    """
+    Applications selected by a list of IDs and/or a FILTERS dict. Raises
+    ValueError for an empty selection, an unknown filter or a bad value.
+    """
+    from .models import Application
+    if not ids and not filters:
+        raise ValueError('Send "ids" or a non-empty "filter"')
+    queryset = Application.objects.all()
+    if ids:
+        if not isinstance(ids, list) or len(ids) > MAX_IDS:
+            raise ValueError(f'"ids" must be a list of at most {MAX_IDS} IDs')
+        try:
+            queryset = queryset.filter(id__in=[int(i) for i in ids])
+        except (TypeError, ValueError):
+            raise ValueError('"ids" must be numbers')
+    if filters:
+        if not isinstance(filters, dict):
+            raise ValueError('"filter" must be an object')
+        unknown = sorted(set(filters) - set(FILTERS))
+        if unknown:
+            raise ValueError(f'Unknown filter {", ".join(unknown)}; use {", ".join(FILTERS)}')
+        lookups = {}
+        for key, value in filters.items():
+            lookup = FILTERS[key]
+            if lookup.endswith('__in') and not isinstance(value, list):
+                raise ValueError(f'"{key}" must be a list')
+            try:
+                if key.startswith('applied_'):
+                    value = _parse_when(value)
+                elif key in ('job_id', 'min_age', 'max_age'):
+                    value = int(value)
+                elif key == 'job_ids':
+                    value = [int(v) for v in value]
+                elif key == 'min_grade':
+                    value = grade_rank(value)
+                    if not value:
+                        raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError(f'Bad value for "{key}"')
+            lookups[lookup] = value
+        queryset = queryset.filter(**lookups)
+    return queryset
+
+
+def bulk_set_status(queryset, status, changed_by='', source='api', batch_size=1000, dry_run=False):
+    """
+    Move every application in `queryset` to `status`, batch_size rows per
+    transaction. Returns {'matched', 'updated', 'batches', 'by_job'} where
+    by_job maps job_id -> rows changed; with dry_run only counts.
+    """
+    from .models import Application, ApplicationStatusEvent
+    if status not in statuses():
+        raise ValueError(f'status must be one of {", ".join(statuses())}')
+    pending = queryset.exclude(status=status).order_by('id')
+    summary = {'matched': pending.count(), 'updated': 0, 'batches': 0, 'by_job': {}}
+    if dry_run or not summary['matched']:
+        return summary
+
+    last_id = 0
+    while True:
+        with serialized_write():
+            rows = list(
+                pending.filter(id__gt=last_id).select_for_update()
+                .values_list('id', 'job_id', 'status')[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            now = timezone.now()
+            Application.objects.filter(id__in=ids).update(status=status, updated_at=now)
+            ApplicationStatusEvent.objects.bulk_create([
+                ApplicationStatusEvent(
+                    application_id=app_id,
+                    job_id=job_id,
+                    from_status=from_status,
+                    to_status=status,
+                    changed_by=changed_by,
+                    source=source,
+                    created_at=now,
+                )
+                for app_id, job_id, from_status in rows
+            ])
+        last_id = ids[-1]
+        summary['batches'] += 1
+        summary['updated'] += len(rows)
+        for app_id, job_id, from_status in rows:
+            summary['by_job'][job_id] = summary['by_job'].get(job_id, 0) + 1
+
+    # Bulk UPDATEs send no signals
+    for job_id in summary['by_job']:
+        ranking.bump_job(job_id)
+    metrics.inc('greentara_application_status_changes_total', {'status': status, 'source': source},
+                amount=summary['updated'])
+    logger.info('Application statuses changed', extra={
+        'to_status': status,
+        'changed_by': changed_by,
+        'source': source,
+        'updated_count': summary['updated'],
+        'batches': summary['batches'],
+    })
+    return summary
@@ -0,0 +1,330 @@
+# ============================================
+# SYNTHETIC DATA - Bulk jobs and applications for load testing
+# ============================================
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalog, snapshot
+from .grades import grade_rank
+from .candidates import normalize_phone
+
+
+JOB_TITLES = [
+    'Housekeeping Attendant', 'Waiter / Waitress', 'Commis Chef', 'Barista',
+    'Security Guard', 'Heavy Truck Driver', 'Forklift Operator', 'Warehouse Assistant',
+    'Caregiver', 'Cleaner', 'Electrician', 'Plumber', 'Mason', 'Steel Fixer',
+    'Front Office Agent', 'Laundry Attendant', 'Sales Associate', 'Cashier',
+]
+
+LOCATIONS = [
+    'Nairobi, Kenya', 'Mombasa, Kenya', 'Kisumu, Kenya', 'Nakuru, Kenya',
+    'Doha, Qatar', 'Lusail, Qatar', 'Al Wakrah, Qatar',
+]
+
+CONTRACTS = ['1 Year', '2 Years', 'Permanent', '6 Months']
+
+FIRST_NAMES = [
+    'Achieng', 'Akinyi', 'Amina', 'Brian', 'Caroline', 'Daniel', 'Dennis', 'Esther',
+    'Faith', 'Grace', 'Hassan', 'Ian', 'James', 'Janet', 'John', 'Joseph', 'Kevin',
+    'Lilian', 'Mercy', 'Mohamed', 'Mary', 'Nancy', 'Otieno', 'Peter', 'Purity',
+    'Ruth', 'Samuel', 'Sharon', 'Stephen', 'Wanjiku', 'Winnie', 'Zawadi',
+]
+
+LAST_NAMES = [
+    'Kamau', 'Wanjiru', 'Otieno', 'Ochieng', 'Mwangi', 'Njoroge', 'Kiptoo', 'Chebet',
+    'Mutua', 'Wambui', 'Omondi', 'Njeri', 'Kariuki', 'Mohamed', 'Ali', 'Maina',
+    'Kimani', 'Odhiambo', 'Korir', 'Muthoni', 'Nyambura', 'Barasa', 'Wafula',
+]
+
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'example.co.ke']
+
+# Rough shape of the applicant pool we see in production
+GENDER_WEIGHTS = {'Male': 48, 'Female': 51, 'Prefer not to say': 1}
+
+KCSE_GRADE_WEIGHTS = {
+    'A': 1, 'A-': 2, 'B+': 4, 'B': 6, 'B-': 8, 'C+': 11,
+    'C': 13, 'C-': 15, 'D+': 15, 'D': 13, 'D-': 9, 'E': 3,
+}
+
+STATUS_WEIGHTS = {'pending': 60, 'reviewed': 20, 'shortlisted': 7, 'rejected': 13}
+
+# Applications cluster in working hours (Nairobi time)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 7, 9, 10, 10, 9, 8, 9, 9, 9, 8, 8, 8, 7, 6, 4, 3, 2]
+
+PLACEHOLDER_PDF = (
+    b'%PDF-1.4\n'
+    b'1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+    b'2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n'
+    b'3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 200 100]/Contents 4 0 R'
+    b'/Resources<</Font<</F1 5 0 R>>>>>>endobj\n'
+    b'4 0 obj<</Length 44>>stream\n'
+    b'BT /F1 12 Tf 20 50 Td (Synthetic document) Tj ET\n'
+    b'endstream endobj\n'
+    b'5 0 obj<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>endobj\n'
+    b'trailer<</Root 1 0 R>>\n'
+    b'%%EOF\n'
+)
+
+DOCUMENT_KINDS = {
+    'cv': 'applications/cv/synthetic',
+    'id': 'applications/id/synthetic',
+    'certificate': 'applications/certificates/synthetic',
+}
+
+
+@contextmanager
+def _preserve_timestamps(model, *field_names):
+    """Temporarily turn off auto_now/auto_now_add so generated timestamps survive bulk_create"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = False
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def _weighted(rng, weights, k):
+    """Draw k values from a {value: weight} mapping"""
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def _phone(rng):
+    """Kenyan mobile number in one of the formats applicants actually type"""
+    digits = f"7{rng.randrange(10000000, 99999999)}"
+    style = rng.random()
+    if style < 0.5:
+        return f"+254{digits}"
+    if style < 0.85:
+        return f"0{digits}"
+    return f"+254 {digits[:3]} {digits[3:6]} {digits[6:]}"
+
+
+def _age(rng):
+    """Ages skew young: most applicants are in their twenties"""
+    return int(rng.triangular(18, 55, 24))
+
+
+def write_placeholder_documents(pool_size=20):
+    """
+    Write a small pool of placeholder PDFs under MEDIA_ROOT and return
+    their storage names keyed by document kind.
+    """
+    from django.core.files.storage import default_storage
+    from django.core.files.base import ContentFile
+
+    names = {}
+    for kind, folder in DOCUMENT_KINDS.items():
+        names[kind] = []
+        for i in range(pool_size):
+            name = f"{folder}/{kind}_{i:04d}.pdf"
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(PLACEHOLDER_PDF))
+            names[kind].append(name)
+    return names
+
+
+def create_jobs(count, rng, end, days=180):
+    """Bulk create `count` job postings spread over the last `days` days"""
+    from .models import Job
+
+    jobs = []
+    for i in range(count):
+        created = end - timedelta(seconds=rng.randrange(days * 86400))
+        title = JOB_TITLES[i % len(JOB_TITLES)]
+        location = rng.choice(LOCATIONS)
+        expiry = (created + timedelta(days=rng.choice([30, 45, 60, 90]))).date()
+        active = expiry >= end.date()
+        jobs.append(Job(
+            title=title,
+            location=location,
+            salary=f"KES {rng.randrange(25, 150) * 1000:,}" if 'Kenya' in location
+            else f"QAR {rng.randrange(12, 40) * 100:,}",
+            contract=rng.choice(CONTRACTS),
+            description=f"{title} role in {location}.",
+            responsibilities='Deliver excellent service; follow safety procedures.',
+            requirements='KCSE certificate; valid ID or passport.',
+            benefits='Accommodation, transport and medical cover.',
+            workplace_photos=[],
+            expiry_date=expiry,
+            is_active=active,
+            status='active' if active else 'expired',
+            created_at=created,
+            updated_at=created,
+        ))
+
+    with _preserve_timestamps(Job, 'created_at', 'updated_at'):
+        return Job.objects.bulk_create(jobs)
+
+
+def iter_application_rows(jobs, count, rng, end, days=180, batch_size=5000,
+                          documents=None, offset=0):
+    """
+    Yield lists of application rows (dicts of field name to value),
+    `batch_size` at a time.
+
+    Categorical columns are drawn a whole batch at a time with
+    `random.choices`, and timestamps are built from whole days plus a
+    second-of-day offset, so no per-row timezone conversion is needed.
+    """
+    local_end = timezone.localtime(end)
+    midnight = local_end.replace(hour=0, minute=0, second=0, microsecond=0)
+    hours = list(range(24))
+    one_day = timedelta(days=1)
+    made = 0
+    while made < count:
+        size = min(batch_size, count - made)
+        genders = _weighted(rng, GENDER_WEIGHTS, size)
+        grades = _weighted(rng, KCSE_GRADE_WEIGHTS, size)
+        statuses = _weighted(rng, STATUS_WEIGHTS, size)
+        picked_jobs = rng.choices(jobs, k=size)
+        picked_hours = rng.choices(hours, weights=HOUR_WEIGHTS, k=size)
+
+        batch = []
+        for i in range(size):
+            n = offset + made + i
+            job = picked_jobs[i]
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            # Recent days get more traffic than old ones (linearly falling density)
+            day = int(days * (1 - rng.random() ** 0.5))
+            applied = midnight - day * one_day + timedelta(
+                seconds=picked_hours[i] * 3600 + rng.randrange(3600)
+            )
+            if applied > end:
+                applied = end
+            status = statuses[i]
+            phone = _phone(rng)
+            row = {
+                'job_id': job.id,
+                'job_title': job.title,
+                'full_name': f"{first} {last}",
+                'email': f"{first}.{last}{n}@{rng.choice(EMAIL_DOMAINS)}".lower(),
+                'phone': phone,
+                'phone_e164': normalize_phone(phone),
+                'age': _age(rng),
+                'gender': genders[i],
+                'kcse_grade': grades[i],
+                # bulk_create skips save(), which fills these in
+                'grade_rank': grade_rank(grades[i]),
+                'status': status,
+                'applied_at': applied,
+                'created_at': applied,
+                'updated_at': applied if status == 'pending'
+                else applied + timedelta(hours=rng.randrange(1, 240)),
+            }
+            if documents:
+                row['cv_document'] = rng.choice(documents['cv'])
+                row['id_document'] = rng.choice(documents['id'])
+                if rng.random() < 0.7:
+                    row['certificate_document'] = rng.choice(documents['certificate'])
+            batch.append(row)
+
+        made += size
+        yield batch
+
+
+def insert_applications(rows, batch_size=5000, raw=False):
+    """
+    Insert a batch of application rows.
+
+    The default path goes through `bulk_create`. With `raw=True` the rows
+    are written with a single `executemany`, skipping model instantiation
+    and per-value field preparation, which dominate at millions of rows.
+    Every row in a batch must have the same keys.
+    """
+    from django.db import connection
+    from .models import Application
+
+    if not rows:
+        return 0
+    if not raw:
+        Application.objects.bulk_create(
+            [Application(**row) for row in rows], batch_size=batch_size
+        )
+        return len(rows)
+
+    fields = [Application._meta.get_field(name) for name in rows[0]]
+    adapt = connection.ops.adapt_datetimefield_value
+    dt_positions = [i for i, f in enumerate(fields) if f.get_internal_type() == 'DateTimeField']
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Application._meta.db_table),
+        ', '.join(connection.ops.quote_name(f.column) for f in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    params = []
+    for row in rows:
+        values = list(row.values())
+        adapted = {}
+        for i in dt_positions:
+            # applied_at and created_at are usually the same value
+            value = values[i]
+            if value not in adapted:
+                adapted[value] = adapt(value)
+            values[i] = adapted[value]
+        params.append(values)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    return len(rows)
+
+
+def seed(jobs=20, applications=10000, seed=0, documents=False, batch_size=5000,
+         days=180, end=None, raw=False, progress=None):
+    """
+    Generate synthetic jobs and applications.
+
+    The same seed and `end` timestamp always produce the same rows on an
+    empty database, so this can be called directly as a fixture by
+    performance test suites. When `jobs` is 0, applications are spread
+    over the existing job postings. Returns a dict of counts and timings.
+    """
+    from django.db.models import Max
+    from .models import Application, Job
+
+    rng = random.Random(seed)
+    end = end or timezone.now()
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        if jobs:
+            job_rows = create_jobs(jobs, rng, end, days=days)
+            # bulk_create sends no signals
+            transaction.on_commit(catalog.bump_version)
+            snapshot.schedule_publish()
+        else:
+            job_rows = list(Job.objects.only('id', 'title'))
+        if applications and not job_rows:
+            raise ValueError('No jobs to attach applications to; pass jobs > 0')
+
+    doc_names = write_placeholder_documents() if documents else None
+    # Keeps generated emails unique per job when seeding into a non-empty table
+    offset = Application.objects.aggregate(last=Max('id'))['last'] or 0
+
+    created = 0
+    with _preserve_timestamps(Application, 'applied_at', 'created_at', 'updated_at'):
+        batches = iter_application_rows(
+            job_rows, applications, rng, end,
+            days=days, batch_size=batch_size, documents=doc_names, offset=offset,
+        )
+        for batch in batches:
+            # One transaction per batch keeps the write lock short on SQLite
+            with transaction.atomic():
+                created += insert_applications(batch, batch_size=batch_size, raw=raw)
+            if progress:
+                progress(created, applications)
+
+    return {
+        'jobs': len(job_rows) if jobs else 0,
+        'applications': created,
+        'seconds': time.perf_counter() - started,
+    }
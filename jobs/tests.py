@@ -0,0 +1,1057 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+def make_job(**fields):
+    from .models import Job
+    defaults = {
+        'title': 'Field Officer', 'location': 'Nairobi', 'salary': 'KES 40,000', 'contract': 'Full-time',
+        'description': 'Visit farmers.', 'responsibilities': 'Visits', 'requirements': 'KCSE C+',
+        'benefits': 'Medical',
+    }
+    return Job.objects.create(**{**defaults, **fields})
+
+
+def make_application(job, **fields):
+    from .models import Application
+    defaults = {
+        'job_id': job.id, 'job_title': job.title, 'full_name': 'Jane Wanjiku', 'email': 'jane@example.com',
+        'phone': '0712 345 678', 'age': 24, 'gender': 'Female', 'kcse_grade': 'B+',
+    }
+    return Application.objects.create(**{**defaults, **fields})
+
+
+class TemporaryMediaMixin:
+    """MEDIA_ROOT (and the archive) in a fresh temporary directory per test"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_ACCEL='', ARCHIVE_DIR=os.path.join(self.media_root, 'archive'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class RateLimitTableMixin:
+    """Token buckets in a fresh file per test, so runs don't share them"""
+
+    def setUp(self):
+        from . import ratelimit
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(RATELIMIT_FILE=os.path.join(directory, 'ratelimit.bin'), RATELIMIT_ENABLED=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        ratelimit._table = None
+        self.addCleanup(setattr, ratelimit, '_table', None)
+
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+# ============================================
+# CATALOG CACHE
+# ============================================
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_lost_version_key_never_revives_old_entries(self):
+        from django.core.cache import cache
+        from . import catalog
+        from .models import Job
+
+        job = make_job()
+        self.assertEqual(catalog.get_jobs()[0]['title'], 'Field Officer')
+        # A bulk write that doesn't bump, then the version key is culled
+        Job.objects.filter(pk=job.pk).update(title='Driver')
+        cache.delete(catalog.VERSION_KEY)
+        self.assertEqual(catalog.get_jobs()[0]['title'], 'Driver')
+
+    def test_bump_retires_cached_listing(self):
+        from . import catalog
+        from .models import Job
+
+        job = make_job()
+        catalog.get_jobs()
+        Job.objects.filter(pk=job.pk).update(title='Driver')
+        self.assertEqual(catalog.get_jobs()[0]['title'], 'Field Officer')
+        catalog.bump_version()
+        self.assertEqual(catalog.get_jobs()[0]['title'], 'Driver')
+
+
+# ============================================
+# PROTECTED MEDIA
+# ============================================
+
+class MediaAccessTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for path, data in (('logos/logo.png', b'logo'), ('applications/cv/secret.pdf', b'secret')):
+            full_path = os.path.join(self.media_root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as f:
+                f.write(data)
+
+    def get(self, path):
+        return self.client.get('/media/' + path, secure=True)
+
+    def test_public_prefix_is_served(self):
+        response = self.get('logos/logo.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'logo')
+
+    def test_applicant_documents_need_staff(self):
+        self.assertEqual(self.get('applications/cv/secret.pdf').status_code, 401)
+
+    def test_traversal_out_of_public_prefix_is_refused(self):
+        for path in (
+            'logos/../applications/cv/secret.pdf',
+            'logos/%2e%2e/applications/cv/secret.pdf',
+            'logos/%2E%2E/applications/cv/secret.pdf',
+            'logos/./../applications/cv/secret.pdf',
+            'logos//../applications/cv/secret.pdf',
+        ):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn(b'secret', response.content)
+
+    def test_normalize(self):
+        from . import media
+
+        self.assertEqual(media.normalize('logos/logo.png'), 'logos/logo.png')
+        for path in ('logos/../x', '/etc/passwd', './logos/logo.png', 'logos//logo.png', 'logos\\..\\x', '..'):
+            with self.subTest(path=path):
+                self.assertIsNone(media.normalize(path))
+
+
+# ============================================
+# ARCHIVE
+# ============================================
+
+class ArchiveRestoreTests(TemporaryMediaMixin, TestCase):
+    def test_round_trip(self):
+        from . import archive
+        from .models import Application
+
+        job = make_job()
+        application = make_application(
+            job, status='rejected', cv_document=SimpleUploadedFile('cv.pdf', b'%PDF-1.4 my cv'),
+        )
+        Application.objects.filter(pk=application.pk).update(applied_at=timezone.now() - timedelta(days=400))
+        cv_name = application.cv_document.name
+
+        summary = archive.archive()
+        self.assertEqual(summary['applications'], 1)
+        self.assertFalse(Application.objects.filter(pk=application.pk).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, cv_name)))
+
+        restored, skipped = archive.restore(summary['files'][0])
+        self.assertEqual((restored, skipped), ([application.pk], []))
+        back = Application.objects.get(pk=application.pk)
+        self.assertEqual(back.email, 'jane@example.com')
+        self.assertEqual(back.phone_e164, '+254712345678')
+        self.assertIsNotNone(back.candidate_id)
+        with back.cv_document.open('rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 my cv')
+
+        # A second restore finds the row there and leaves it alone
+        self.assertEqual(archive.restore(summary['files'][0]), ([], [application.pk]))
+
+    def test_documents_with_the_same_basename_keep_their_own_bytes(self):
+        from . import archive
+        from .models import Application
+
+        application = make_application(
+            make_job(), status='rejected',
+            cv_document=SimpleUploadedFile('scan.pdf', b'CV-BYTES'),
+            id_document=SimpleUploadedFile('scan.pdf', b'ID-BYTES'),
+        )
+        self.assertEqual(application.cv_document.name, 'applications/cv/scan.pdf')
+        self.assertEqual(application.id_document.name, 'applications/id/scan.pdf')
+        Application.objects.filter(pk=application.pk).update(applied_at=timezone.now() - timedelta(days=400))
+
+        summary = archive.archive()
+        archive.restore(summary['files'][0])
+        back = Application.objects.get(pk=application.pk)
+        for field, data in (('cv_document', b'CV-BYTES'), ('id_document', b'ID-BYTES')):
+            with getattr(back, field).open('rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_an_archived_document_is_never_overwritten(self):
+        from . import archive
+
+        application = make_application(make_job(), cv_document=SimpleUploadedFile('cv.pdf', b'first'))
+        root = archive.archive_root()
+        first = archive._archive_document(application, 'cv_document', root)
+        with application.cv_document.open('wb') as f:
+            f.write(b'second')
+        second = archive._archive_document(application, 'cv_document', root)
+        self.assertNotEqual(first['archive'], second['archive'])
+        with gzip.open(root / first['archive']) as f:
+            self.assertEqual(f.read(), b'first')
+
+
+# ============================================
+# CANDIDATES
+# ============================================
+
+class CandidateMatchingTests(TestCase):
+    def test_normalize_phone(self):
+        from .candidates import normalize_phone
+
+        for written in ('0712 345 678', '712345678', '254712345678', '+254-712-345678', '00254712345678'):
+            self.assertEqual(normalize_phone(written), '+254712345678', written)
+        self.assertEqual(normalize_phone('00974 5555 1234'), '+97455551234')
+        for junk in ('', None, '12345', 'not a phone'):
+            self.assertEqual(normalize_phone(junk), '', junk)
+
+    def test_soundex(self):
+        from .candidates import name_key, soundex
+
+        self.assertEqual(soundex('wanjiku'), 'W522')
+        self.assertEqual(soundex('robert'), soundex('rupert'))
+        self.assertEqual(soundex('ashcraft'), 'A261')
+        self.assertEqual(soundex('lee'), 'L000')
+        self.assertEqual(name_key('Wanjiku Jane'), name_key('jane  WANJIKU'))
+        self.assertEqual(name_key('Jane'), '')
+
+    def test_one_typo_apart(self):
+        from .candidates import _one_typo_apart
+
+        self.assertTrue(_one_typo_apart('+254712345678', '+254712345678'))
+        self.assertTrue(_one_typo_apart('+254712345678', '+254712345679'))
+        self.assertTrue(_one_typo_apart('+254712345678', '+254712345687'))
+        self.assertFalse(_one_typo_apart('+254712345678', '+254712345699'))
+        self.assertFalse(_one_typo_apart('+254712345678', '+254812345679'))
+        self.assertFalse(_one_typo_apart('+254712345678', '+25471234567'))
+
+    def test_same_person(self):
+        from .candidates import same_person
+
+        self.assertTrue(same_person('Jane Wanjiku', 'Female', 24, 'Jane Wanjku', 'female ', 25))
+        self.assertFalse(same_person('Jane Wanjiku', 'Female', 24, 'Jane Wanjiku', 'Male', 24))
+        self.assertFalse(same_person('Jane Wanjiku', 'Female', 24, 'Jane Wanjiku', 'Female', 26))
+        self.assertFalse(same_person('Jane Wanjiku', 'Female', 24, 'Joan Kamau', 'Female', 24))
+
+    def test_email_case_and_phone_forms_link_one_candidate(self):
+        job = make_job()
+        first = make_application(job, email='Jane@Example.com ', phone='+254 712 345 678')
+        by_email = make_application(job, email='jane@example.com', phone='0733 000 111')
+        by_phone = make_application(job, email='wanjiku@example.org', phone='00254712345678')
+        self.assertEqual({first.candidate_id, by_email.candidate_id, by_phone.candidate_id}, {first.candidate_id})
+
+    def test_shared_name_alone_never_links(self):
+        job = make_job()
+        one = make_application(job, email='jane@example.com', phone='0712 345 678')
+        other = make_application(job, email='wanjiku.j@example.org', phone='0799 888 777')
+        self.assertNotEqual(one.candidate_id, other.candidate_id)
+
+    def test_same_name_with_nearly_the_same_contact_links(self):
+        job = make_job()
+        one = make_application(job, email='jane.w@example.com', phone='0712 345 678')
+        typo = make_application(job, full_name='Jayne Wanjiku', email='other@example.org', phone='0712 345 687')
+        same_user = make_application(job, age=25, email='janew@example.org', phone='0799 888 777')
+        self.assertEqual({typo.candidate_id, same_user.candidate_id}, {one.candidate_id})
+
+    def test_link_merges_candidates_into_the_oldest(self):
+        from .models import Application, Candidate
+
+        job = make_job()
+        a = make_application(job, full_name='Jane Wanjiku', email='a@example.com', phone='0711 111 111')
+        b = make_application(job, full_name='Peter Otieno', gender='Male', email='b@example.com', phone='0722 222 222')
+        self.assertNotEqual(a.candidate_id, b.candidate_id)
+        make_application(make_job(title='Driver'), email='a@example.com', phone='0722 222 222')
+        self.assertEqual(Candidate.objects.count(), 1)
+        self.assertEqual(set(Application.objects.values_list('candidate_id', flat=True)), {a.candidate_id})
+
+    def test_cluster_agrees_with_incremental_linking(self):
+        from . import candidates
+        from .models import Application
+
+        job = make_job()
+        rows = [
+            {'email': 'jane@example.com', 'phone': '0712 345 678'},
+            {'email': 'JANE@example.com', 'phone': '0700 000 001'},
+            {'email': 'jane.w@example.org', 'phone': '0700 000 002'},
+            {'full_name': 'Jayne Wanjiku', 'email': 'x@example.org', 'phone': '0712 345 687'},
+            {'email': 'someone@example.org', 'phone': '0799 888 777'},
+            {'full_name': 'Peter Otieno', 'gender': 'Male', 'email': 'p@example.com', 'phone': '0733 333 333'},
+            {'full_name': 'Peter Otieno', 'gender': 'Male', 'age': 40, 'email': 'p2@example.com',
+             'phone': '+254733333333'},
+            {'full_name': 'Mary Achieng', 'email': 'mary@example.com', 'phone': '0744 444 444'},
+        ]
+        for row in rows:
+            make_application(job, **row)
+
+        def partition():
+            groups = {}
+            for app_id, candidate_id in Application.objects.values_list('id', 'candidate_id'):
+                groups.setdefault(candidate_id, set()).add(app_id)
+            return sorted(sorted(group) for group in groups.values())
+
+        linked = partition()
+        self.assertEqual(sorted(len(group) for group in linked), [1, 1, 2, 4])
+        summary = candidates.cluster()
+        self.assertEqual(partition(), linked)
+        self.assertEqual(summary['candidates'], len(linked))
+
+
+# ============================================
+# SUBMIT APPLICATION
+# ============================================
+
+class SubmitApplicationTests(RateLimitTableMixin, TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job()
+
+    def submit(self, key=None, **fields):
+        data = {
+            'jobId': str(self.job.id), 'jobTitle': self.job.title, 'fullName': 'Jane Wanjiku',
+            'email': 'jane@example.com', 'phone': '0712 345 678', 'age': '24', 'gender': 'Female',
+            'kcseGrade': 'B+',
+            'cv': SimpleUploadedFile('cv.pdf', b'%PDF-1.4 cv', content_type='application/pdf'),
+            'id_document': SimpleUploadedFile('id.pdf', b'%PDF-1.4 id', content_type='application/pdf'),
+            **fields,
+        }
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/api/applications', data, secure=True, headers=headers)
+
+    def test_retry_with_key_replays_the_first_response(self):
+        from .models import Application
+
+        first = self.submit(key='retry-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.submit(key='retry-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['applicationId'], first.json()['applicationId'])
+        self.assertEqual(Application.objects.count(), 1)
+
+    def test_replay_does_not_read_the_documents(self):
+        from unittest import mock
+        from django.core.files.uploadedfile import UploadedFile
+        from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+        self.assertEqual(self.submit(key='retry-2').status_code, 201)
+        body = encode_multipart(BOUNDARY, {
+            'jobId': str(self.job.id), 'jobTitle': self.job.title, 'fullName': 'Jane Wanjiku',
+            'email': 'jane@example.com', 'phone': '0712 345 678', 'age': '24', 'gender': 'Female',
+            'kcseGrade': 'B+',
+            'cv': SimpleUploadedFile('cv.pdf', b'%PDF-1.4 cv', content_type='application/pdf'),
+            'id_document': SimpleUploadedFile('id.pdf', b'%PDF-1.4 id', content_type='application/pdf'),
+        })
+        with mock.patch.object(UploadedFile, 'chunks', side_effect=AssertionError('document read')), \
+                mock.patch.object(UploadedFile, 'read', side_effect=AssertionError('document read')):
+            retry = self.client.generic(
+                'POST', '/api/applications', body, MULTIPART_CONTENT, secure=True,
+                headers={'Idempotency-Key': 'retry-2'},
+            )
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_documents_are_stored_with_the_application(self):
+        from .models import Application
+
+        self.assertEqual(self.submit().status_code, 201)
+        application = Application.objects.get()
+        self.assertTrue(application.cv_document.name.startswith('applications/cv/'))
+        with application.cv_document.open('rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 cv')
+        self.assertFalse(application.certificate_document)
+
+    def test_duplicate_is_refused_without_leaving_documents(self):
+        self.assertEqual(self.submit().status_code, 201)
+        self.assertEqual(self.submit().status_code, 409)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'applications', 'cv'))), 1)
+
+    def upload(self, data, filename='cv.pdf'):
+        created = self.client.post(
+            '/api/uploads', {'filename': filename, 'size': len(data)}, content_type='application/json', secure=True,
+        )
+        upload_id = created.json()['uploadId']
+        response = self.client.generic(
+            'PATCH', f'/api/uploads/{upload_id}', data, content_type='application/offset+octet-stream',
+            secure=True, HTTP_UPLOAD_OFFSET='0',
+        )
+        self.assertEqual(response.status_code, 200)
+        return upload_id
+
+    def test_resumed_upload_handles_are_closed_on_early_return(self):
+        from unittest import mock
+        from . import uploads
+
+        real = uploads.completed_file
+        opened = []
+
+        def completed_file(upload_id):
+            opened.append(real(upload_id))
+            return opened[-1]
+
+        with override_settings(UPLOAD_SESSION_DIR=os.path.join(self.media_root, 'sessions')):
+            upload_id = self.upload(b'%PDF-1.4 resumed cv')
+            with mock.patch.object(uploads, 'completed_file', completed_file):
+                # No ID document: refused after the CV upload was opened
+                response = self.submit(cv='', cv_upload=upload_id, id_document='')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+    def test_key_reused_for_a_different_application_is_refused(self):
+        from .models import Application
+
+        self.assertEqual(self.submit(key='reused').status_code, 201)
+        for fields in ({'email': 'other@example.com'}, {'cv': SimpleUploadedFile('cv.pdf', b'%PDF-1.4 other')}):
+            with self.subTest(fields=list(fields)):
+                self.assertEqual(self.submit(key='reused', **fields).status_code, 422)
+        self.assertEqual(Application.objects.count(), 1)
+
+    def test_failed_request_frees_its_key(self):
+        self.assertEqual(self.submit(key='fix-and-retry', phone='').status_code, 400)
+        self.assertEqual(self.submit(key='fix-and-retry').status_code, 201)
+
+    @override_settings(RATELIMITS={'submit_application': {'ip': (2, 3600)}})
+    def test_rate_limit_admits_before_the_key_is_claimed(self):
+        from .models import IdempotencyKey
+
+        self.assertEqual(self.submit(key='a').status_code, 201)
+        self.assertEqual(self.submit(key='a').status_code, 201)
+        # Replays count too, and a refused request claims nothing
+        refused = self.submit(key='b', email='b@example.com')
+        self.assertEqual(refused.status_code, 429)
+        self.assertIn('Retry-After', refused)
+        self.assertFalse(IdempotencyKey.objects.filter(key='b').exists())
+
+    @override_settings(RATELIMITS={'submit_application': {'email': (1, 3600)}})
+    def test_per_email_limit(self):
+        self.assertEqual(self.submit().status_code, 201)
+        self.assertEqual(self.submit(jobId=str(make_job(title='Driver').id)).status_code, 429)
+        self.assertEqual(self.submit(email='someone@example.com').status_code, 201)
+
+
+# ============================================
+# RATE LIMITS
+# ============================================
+
+class RateLimitTests(RateLimitTableMixin, TestCase):
+    @override_settings(RATELIMITS={'check_application': {'ip': (2, 3600)}})
+    def test_forwarded_for_is_ignored_without_a_trusted_proxy(self):
+        url = '/api/check-application/1/jane@example.com'
+        for forged in ('10.0.0.1', '10.0.0.2'):
+            self.assertEqual(self.client.get(url, secure=True, HTTP_X_FORWARDED_FOR=forged).status_code, 200)
+        response = self.client.get(url, secure=True, HTTP_X_FORWARDED_FOR='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATELIMITS={'check_application': {'ip': (1, 3600)}}, RATELIMIT_TRUSTED_PROXIES=1)
+    def test_client_behind_a_trusted_proxy_gets_its_own_bucket(self):
+        url = '/api/check-application/1/jane@example.com'
+        self.assertEqual(self.client.get(url, secure=True, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get(url, secure=True, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.client.get(url, secure=True, HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 200)
+
+    @override_settings(RATELIMITS={'upload_chunk': {'ip': (1, 3600)}})
+    def test_upload_chunks_are_limited(self):
+        self.assertEqual(self.client.get('/api/uploads/unknown', secure=True).status_code, 404)
+        response = self.client.generic(
+            'PATCH', '/api/uploads/unknown', b'x', secure=True, HTTP_UPLOAD_OFFSET='0',
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATELIMITS={'check_application': {'ip': (1, 3600)}})
+    def test_preflight_is_free(self):
+        url = '/api/check-application/1/jane@example.com'
+        for _ in range(3):
+            self.assertEqual(self.client.options(url, secure=True).status_code, 200)
+        self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+
+
+# ============================================
+# RANKING
+# ============================================
+
+@override_settings(CACHES=LOCAL_CACHE)
+class RankingTests(TestCase):
+    GRADE_ONLY = {'grade': 1, 'recency': 0, 'certificate': 0}
+
+    def setUp(self):
+        from . import ranking
+        ranking._cache.clear()
+        self.addCleanup(ranking._cache.clear)
+        self.job = make_job()
+        self.ids = []
+        for i, (grade, age, certificate, status) in enumerate((
+            ('B', 22, False, 'pending'),
+            ('A', 30, True, 'pending'),
+            ('B', 25, True, 'reviewed'),
+            ('C', 24, True, 'pending'),
+            ('A', 19, False, 'rejected'),
+            ('B', 27, False, 'pending'),
+        )):
+            application = make_application(
+                self.job, email=f'applicant{i}@example.com', phone=f'0711 000 00{i}', kcse_grade=grade, age=age,
+                certificate_document='applications/certificates/kcse.pdf' if certificate else None, status=status,
+            )
+            self.ids.append(application.id)
+
+    def ranked(self, **options):
+        from . import ranking
+        result = ranking.rank(self.job.id, **options)
+        return [self.ids.index(row['id']) for row in result['results']], result['eligible']
+
+    def test_top_k_breaks_ties_by_earlier_application(self):
+        # Three B's tie for the last place; the earliest gets it
+        self.assertEqual(self.ranked(k=3, weights=self.GRADE_ONLY), ([1, 4, 0], 6))
+        self.assertEqual(self.ranked(k=4, weights=self.GRADE_ONLY), ([1, 4, 0, 2], 6))
+        self.assertEqual(self.ranked(k=100, weights=self.GRADE_ONLY), ([1, 4, 0, 2, 5, 3], 6))
+
+    def test_weights_combine_features(self):
+        weights = {'grade': 1, 'recency': 0, 'certificate': 1}
+        self.assertEqual(self.ranked(k=6, weights=weights), ([1, 2, 3, 4, 0, 5], 6))
+        from . import ranking
+        top = ranking.rank(self.job.id, k=1, weights=weights)['results'][0]
+        self.assertEqual(top['score'], 1.0)
+        self.assertEqual(top['components'], {'grade': 1.0, 'certificate': 1.0})
+
+    def test_hard_filters(self):
+        from .grades import grade_rank
+
+        self.assertEqual(self.ranked(k=10, weights=self.GRADE_ONLY, min_grade=grade_rank('B')), ([1, 4, 0, 2, 5], 5))
+        self.assertEqual(self.ranked(k=10, weights=self.GRADE_ONLY, min_age=22, max_age=25), ([0, 2, 3], 3))
+        self.assertEqual(self.ranked(k=10, weights=self.GRADE_ONLY, require_certificate=True), ([1, 2, 3], 3))
+        self.assertEqual(
+            self.ranked(k=10, weights=self.GRADE_ONLY, statuses=['pending', 'reviewed']), ([1, 0, 2, 5, 3], 5),
+        )
+        self.assertEqual(self.ranked(k=10, weights=self.GRADE_ONLY, min_age=60), ([], 0))
+
+    def test_k_zero_still_counts(self):
+        self.assertEqual(self.ranked(k=0, weights=self.GRADE_ONLY, min_grade=12), ([], 2))
+
+    def test_ideal_age(self):
+        weights = {'grade': 0, 'recency': 0, 'certificate': 0, 'age': 1}
+        self.assertEqual(self.ranked(k=3, weights=weights, ideal_age=25, age_tolerance=5), ([2, 3, 5], 6))
+
+    def test_options_from_query(self):
+        from django.http import QueryDict
+        from . import ranking
+
+        options = ranking.options_from_query(QueryDict(
+            'k=5000&w_grade=2&w_recency=&min_grade=b%2B&min_age=20&ideal_age=24&require_certificate=on'
+            '&status=pending,reviewed,'
+        ))
+        self.assertEqual(options, {
+            'k': ranking.MAX_K, 'weights': {'grade': 2.0}, 'min_grade': 10, 'min_age': 20, 'ideal_age': 24,
+            'require_certificate': True, 'statuses': ['pending', 'reviewed'],
+        })
+        for query in ('k=ten', 'w_grade=-1', 'min_grade=Z', 'half_life_days=0', 'age_tolerance=-2', 'max_age=old'):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                ranking.options_from_query(QueryDict(query))
+        with self.assertRaises(ValueError):
+            ranking.rank(self.job.id, weights={'grade': 0, 'recency': 0, 'certificate': 0})
+
+
+# ============================================
+# BULK STATUS
+# ============================================
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BulkStatusTests(TestCase):
+    url = '/api/admin/applications/bulk-status'
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(self.staff)
+        self.job = make_job()
+        self.pending = make_application(self.job, email='a@example.com', phone='0711 111 111')
+        self.reviewed = make_application(self.job, email='b@example.com', phone='0722 222 222', status='reviewed')
+        self.shortlisted = make_application(
+            self.job, email='c@example.com', phone='0733 333 333', status='shortlisted',
+        )
+
+    def post(self, data):
+        import json
+        return self.client.post(self.url, json.dumps(data), content_type='application/json', secure=True)
+
+    def test_one_event_per_changed_row(self):
+        from .models import Application, ApplicationStatusEvent
+
+        response = self.post({'status': 'shortlisted', 'filter': {'job_id': self.job.id}, 'batch_size': 1})
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual((summary['matched'], summary['updated'], summary['batches']), (2, 2, 2))
+        self.assertEqual(summary['by_job'], {str(self.job.id): 2})
+        self.assertEqual(set(Application.objects.values_list('status', flat=True)), {'shortlisted'})
+        events = ApplicationStatusEvent.objects.order_by('application_id')
+        self.assertEqual(
+            [(e.application_id, e.job_id, e.from_status, e.to_status, e.changed_by) for e in events],
+            [
+                (self.pending.id, self.job.id, 'pending', 'shortlisted', 'staff'),
+                (self.reviewed.id, self.job.id, 'reviewed', 'shortlisted', 'staff'),
+            ],
+        )
+
+    def test_rerun_is_a_no_op(self):
+        from .models import ApplicationStatusEvent
+
+        ids = [self.pending.id, self.reviewed.id]
+        self.assertEqual(self.post({'status': 'rejected', 'ids': ids}).json()['updated'], 2)
+        summary = self.post({'status': 'rejected', 'ids': ids}).json()
+        self.assertEqual((summary['matched'], summary['updated']), (0, 0))
+        self.assertEqual(ApplicationStatusEvent.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        from .models import Application, ApplicationStatusEvent
+
+        summary = self.post({'status': 'rejected', 'filter': {'statuses': ['pending', 'reviewed']}, 'dry_run': True})
+        self.assertEqual(summary.json()['matched'], 2)
+        self.assertTrue(summary.json()['dry_run'])
+        self.assertEqual(Application.objects.filter(status='rejected').count(), 0)
+        self.assertFalse(ApplicationStatusEvent.objects.exists())
+
+    def test_bad_requests_are_refused(self):
+        from .models import ApplicationStatusEvent
+
+        for data in (
+            {'status': 'rejected', 'filter': {'colour': 'green'}},
+            {'status': 'rejected', 'filter': {'job_ids': 3}},
+            {'status': 'rejected', 'filter': {'min_grade': 'Z'}},
+            {'status': 'rejected', 'filter': {'applied_after': 'last week'}},
+            {'status': 'rejected', 'ids': ['one']},
+            {'status': 'rejected'},
+            {'status': 'hired', 'ids': [self.pending.id]},
+            {'ids': [self.pending.id]},
+            ['not', 'an', 'object'],
+        ):
+            with self.subTest(data=data):
+                response = self.post(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertFalse(ApplicationStatusEvent.objects.exists())
+
+    def test_staff_only(self):
+        from django.contrib.auth.models import User
+
+        self.client.logout()
+        self.assertEqual(self.post({'status': 'rejected', 'ids': [self.pending.id]}).status_code, 401)
+        self.client.force_login(User.objects.create(username='applicant'))
+        self.assertEqual(self.post({'status': 'rejected', 'ids': [self.pending.id]}).status_code, 401)
+        self.pending.refresh_from_db()
+        self.assertEqual(self.pending.status, 'pending')
+
+
+# ============================================
+# ADMIN SEARCH
+# ============================================
+
+class AdminSearchTests(TestCase):
+    def setUp(self):
+        driver = make_job(title='Driver')
+        officer = make_job(title='Field Officer')
+        for job, name, email, phone in (
+            (officer, 'Jane Wanjiku', 'jane.doe@gmail.com', '+254712345678'),
+            (officer, 'Peter Otieno', 'p.otieno@yahoo.com', '+254733345679'),
+            (driver, 'Mary Jane Achieng', 'maryjane@example.org', '+254700111222'),
+            (driver, 'Li Wei', 'li.wei@example.com', '+97455551234'),
+            (officer, 'Al Noor', 'alnoor@gmail.com', '+254799000111'),
+        ):
+            make_application(job, full_name=name, email=email, phone=phone)
+
+    def ids(self, queryset):
+        return sorted(queryset.values_list('id', flat=True))
+
+    def assertSameAsScan(self, search_term, path):
+        from . import admin_search
+        from .models import Application
+
+        found, used = admin_search.search(Application.objects.all(), search_term)
+        self.assertEqual(used, path, search_term)
+        expected = self.ids(admin_search.scan(Application.objects.all(), search_term))
+        self.assertTrue(expected, f'{search_term!r} matches nothing in the fixture')
+        self.assertEqual(self.ids(found), expected, search_term)
+
+    def test_email_path(self):
+        for search_term in ('jane.doe@', 'jane.doe@gmail.com', 'JANE.DOE@Gmail.com', 'li.wei@'):
+            self.assertSameAsScan(search_term, 'email')
+
+    def test_phone_path(self):
+        for search_term in ('+254712', '+254 733', '345678', '+974 5555', '0011'):
+            self.assertSameAsScan(search_term, 'phone')
+
+    def test_phone_path_also_finds_national_numbers(self):
+        from . import admin_search
+        from .models import Application
+
+        # Stored as +254712345678: icontains can't see it, the index can
+        found, path = admin_search.search(Application.objects.all(), '0712 345 678')
+        self.assertEqual(path, 'phone')
+        self.assertEqual(list(found.values_list('full_name', flat=True)), ['Jane Wanjiku'])
+
+    def test_text_path(self):
+        for search_term in (
+            'jane', 'JANE achieng', 'driver', 'field officer', '"field officer"', '"Mary Jane"',
+            'li', 'al noor', 'wei li', 'gmail', 'jane "field officer"', 'yahoo otieno',
+        ):
+            self.assertSameAsScan(search_term, 'text')
+
+    def test_misspelt_name_takes_the_fuzzy_path(self):
+        from . import admin_search
+        from .models import Application
+
+        found, path = admin_search.search(Application.objects.all(), 'wanjku')
+        self.assertEqual(path, 'fuzzy')
+        self.assertEqual(list(found.values_list('full_name', flat=True)), ['Jane Wanjiku'])
+        found, path = admin_search.search(Application.objects.all(), 'zzyzx')
+        self.assertEqual((path, list(found)), ('fuzzy', []))
+
+
+# ============================================
+# QUERY BUDGETS
+# ============================================
+
+class QueryBudgetTests(TestCase):
+    def test_every_endpoint_is_within_its_budget(self):
+        from . import querybudget
+
+        results, failures = querybudget.run(querybudget.load_manifest(), verbosity=0, test_database=False)
+        self.assertEqual(set(results), set(querybudget.load_manifest()['endpoints']))
+        self.assertEqual(failures, [])
+
+
+# ============================================
+# FULL-TEXT SEARCH
+# ============================================
+
+class FullTextQueryTests(TestCase):
+    def test_search_box_syntax(self):
+        from .fulltext import fts5_query
+
+        self.assertEqual(fts5_query('driver kisumu'), '("driver" AND "kisumu")')
+        self.assertEqual(fts5_query('"field officer" OR agronomist'), '"field officer" OR "agronomist"')
+        self.assertEqual(fts5_query('agri* -nairobi'), '("agri"*) NOT "nairobi"')
+
+    def test_operators_and_punctuation_are_quoted(self):
+        from .fulltext import fts5_query
+
+        self.assertEqual(fts5_query('NOT AND near(a b)'), '("NOT" AND "AND" AND "near a" AND "b")')
+        self.assertEqual(fts5_query('title:driver ^start'), '("title driver" AND "start")')
+        self.assertEqual(fts5_query('say "hello'), '("say" AND "hello")')
+        self.assertEqual(fts5_query('O\'Brien "'), '"O Brien"')
+
+    def test_nothing_searchable_is_empty(self):
+        from .fulltext import fts5_query
+
+        for text in ('', '   ', '""', '-driver', 'OR OR', '* - ( )'):
+            self.assertEqual(fts5_query(text), '', text)
+
+    def test_hostile_input_never_reaches_fts5_as_syntax(self):
+        from .fulltext import search_cv
+        from .models import CVText
+
+        application = make_application(make_job())
+        CVText.objects.create(application=application, status='done', text='Driver from Kisumu with a clean licence')
+        self.assertEqual([hit['id'] for hit in search_cv('kisumu driver')], [application.id])
+        self.assertIn('<mark>', search_cv('licence')[0]['snippet'])
+        for text in ('"unterminated', 'a AND', 'NEAR(', '{col}: x', '*', 'x OR', '-', '\'; DROP TABLE x; --'):
+            self.assertEqual(search_cv(text), [], text)
+
+
+# ============================================
+# CV TEXT
+# ============================================
+
+class CVTextTests(TemporaryMediaMixin, TestCase):
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_plain_text(self):
+        from .cv_text import extract
+
+        self.assertEqual(extract(self.write('cv.txt', b'Driver   from\tKisumu\n\n\n\nLicence B\n')),
+                         ('done', 'Driver from Kisumu\n\nLicence B', ''))
+        self.assertEqual(extract(self.write('latin.TXT', b'Caf\xe9 manager')), ('done', 'Caf\xe9 manager', ''))
+        self.assertEqual(extract(self.write('blank.txt', b' \n\n ')), ('empty', '', ''))
+        self.assertEqual(extract(self.write('long.txt', b'x' * 50), max_chars=10), ('done', 'x' * 10, ''))
+
+    def test_docx(self):
+        import io
+        import zipfile
+        from .cv_text import extract
+
+        document = (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            '<w:p><w:r><w:t>Jane </w:t></w:r><w:r><w:t>Wanjiku</w:t></w:r></w:p>'
+            '<w:p><w:r><w:t>Agronomist, Nakuru</w:t></w:r></w:p>'
+            '</w:body></w:document>'
+        )
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('word/document.xml', document)
+        self.assertEqual(extract(self.write('cv.docx', buffer.getvalue())),
+                         ('done', 'Jane Wanjiku\nAgronomist, Nakuru', ''))
+
+        status, text, error = extract(self.write('broken.docx', b'not a zip'))
+        self.assertEqual((status, text), ('failed', ''))
+        self.assertTrue(error.startswith('BadZipFile'))
+
+    def test_unsupported(self):
+        from .cv_text import extract
+
+        self.assertEqual(extract(self.write('cv.jpg', b'\xff\xd8\xff')),
+                         ('unsupported', '', 'No text extractor for .jpg'))
+        self.assertEqual(extract(self.write('cv', b'Driver')),
+                         ('unsupported', '', 'No text extractor for files without an extension'))
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'needs named pipes')
+    def test_stuck_file_times_out(self):
+        from . import cv_text
+        from .models import CVText
+
+        os.makedirs(os.path.join(self.media_root, 'applications', 'cv'))
+        self.write('applications/cv/first.txt', b'Driver from Kisumu')
+        # Opening a pipe nobody writes to blocks the worker for good
+        os.mkfifo(os.path.join(self.media_root, 'applications', 'cv', 'stuck.txt'))
+        self.write('applications/cv/last.txt', b'Agronomist')
+        job = make_job()
+        for name in ('first', 'stuck', 'last'):
+            make_application(job, email=f'{name}@example.com', cv_document=f'applications/cv/{name}.txt')
+
+        with self.assertLogs('jobs.cv_text', 'WARNING'):
+            summary = cv_text.run(workers=2, timeout=5)
+        self.assertEqual(summary['by_status'], {'done': 2, 'failed': 1})
+        stuck = CVText.objects.get(source='applications/cv/stuck.txt')
+        self.assertEqual((stuck.status, stuck.error), ('failed', 'Timed out after 5s'))
+        self.assertEqual(CVText.objects.get(source='applications/cv/last.txt').text, 'Agronomist')
+
+
+# ============================================
+# BULK IMPORT
+# ============================================
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BulkImportTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        self.client.force_login(staff)
+
+    def post(self, body, **params):
+        query = '&'.join(f'{name}={value}' for name, value in params.items())
+        return self.client.post(
+            f'/api/admin/jobs/import?{query}', body, content_type='application/x-ndjson', secure=True,
+        )
+
+    def row(self, **fields):
+        import json
+        defaults = {
+            'title': 'Driver', 'location': 'Kisumu', 'salary': 'KES 30,000', 'contract': 'Contract',
+            'description': 'Drive.', 'responsibilities': 'Deliveries', 'requirements': 'Licence',
+            'benefits': 'Lunch',
+        }
+        return json.dumps({**defaults, **fields}) + '\n'
+
+    def test_validators_run_on_every_field(self):
+        from .models import Job
+
+        response = self.post(
+            self.row()
+            + self.row(icon='not a url')
+            + self.row(title='x' * 201)
+            + self.row(workplace_photos=['https://example.com/a.jpg', 'javascript:alert(1)'])
+            + self.row(expiry_date='tomorrow')
+        )
+        self.assertEqual(response.status_code, 400)
+        summary = response.json()
+        self.assertEqual(summary['invalid'], 4)
+        self.assertEqual([list(error['errors']) for error in summary['errors']], [
+            ['icon'], ['title'], ['workplace_photos'], ['expiry_date'],
+        ])
+        self.assertFalse(Job.objects.exists())
+
+    def test_skip_invalid_writes_only_valid_rows(self):
+        from .models import Job
+
+        job = make_job()
+        body = (
+            self.row(icon='https://example.com/icon.png')
+            + self.row(icon='ftp:/broken')
+            + '{"id": %d, "title": "Senior Field Officer"}\n' % job.id
+            + '{"id": 999999, "title": "Ghost"}\n'
+            + 'not json\n'
+        )
+        response = self.post(body, skip_invalid='true')
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual((summary['created'], summary['updated'], summary['invalid']), (1, 1, 3))
+        job.refresh_from_db()
+        self.assertEqual(job.title, 'Senior Field Officer')
+        self.assertEqual(Job.objects.get(title='Driver').icon, 'https://example.com/icon.png')
+
+    def test_dry_run_writes_nothing(self):
+        from .models import Job
+
+        summary = self.post(self.row(), dry_run='1').json()
+        self.assertEqual(summary['would_create'], 1)
+        self.assertFalse(Job.objects.exists())
+
+
+# ============================================
+# STATIC SNAPSHOT
+# ============================================
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SnapshotTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(SNAPSHOT_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_unchanged_catalog_is_not_published_again(self):
+        from . import snapshot
+
+        make_job()
+        first = snapshot.publish()
+        self.assertTrue(first['changed'])
+        second = snapshot.publish()
+        self.assertFalse(second['changed'])
+        self.assertEqual(second['written'], 0)
+        self.assertEqual(second['digest'], first['digest'])
+
+    def test_saves_do_not_publish_by_default(self):
+        from . import snapshot
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            make_job()
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(snapshot.read_manifest())
+
+    def test_hashed_files_are_served_immutable(self):
+        from . import snapshot
+
+        make_job()
+        snapshot.publish()
+        manifest = snapshot.read_manifest()
+        response = self.client.get(f"/snapshot/{manifest['jobs']}", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get('/snapshot/manifest.json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/snapshot/../db.sqlite3', secure=True).status_code, 404)
+
+    async def test_snapshot_is_served_under_asgi(self):
+        from asgiref.sync import sync_to_async
+        from . import snapshot
+
+        await sync_to_async(make_job)()
+        await sync_to_async(snapshot.publish)()
+        response = await self.async_client.get('/snapshot/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+
+# ============================================
+# READ REPLICA ROUTING
+# ============================================
+
+class ReplicaRoutingTests(RateLimitTableMixin, TestCase):
+    """A second SQLite file stands in for the replica"""
+
+    @classmethod
+    def setUpClass(cls):
+        from django.conf import settings
+        from django.db import connections
+        from .models import Application, Candidate
+
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory)
+        config = {**connections.settings['default'], 'NAME': os.path.join(directory, 'replica.sqlite3')}
+        connections.settings['replica_1'] = config
+        cls.addClassCleanup(connections.settings.pop, 'replica_1')
+        cls.addClassCleanup(connections.__delitem__, 'replica_1')
+        cls.addClassCleanup(lambda: connections['replica_1'].close())
+        cls.enterClassContext(override_settings(
+            DATABASES={**settings.DATABASES, 'replica_1': config}, REPLICA_HEALTH_INTERVAL=0,
+        ))
+        with connections['replica_1'].schema_editor() as editor:
+            editor.create_model(Candidate)
+            editor.create_model(Application)
+        # Set here rather than on the class: the runner only sets up aliases it finds in DATABASES
+        cls.databases = {'default', 'replica_1'}
+        super().setUpClass()
+
+    def setUp(self):
+        from . import routers
+        from .models import Application
+        super().setUp()
+        routers._health.clear()
+        self.addCleanup(routers._health.clear)
+
+        # The same application, at a different status on each side
+        self.job = make_job()
+        make_application(self.job, status='pending')
+        Application.objects.using('replica_1').bulk_create([
+            Application(job_id=self.job.id, job_title=self.job.title, full_name='Jane Wanjiku',
+                        email='jane@example.com', phone='0712 345 678', age=24, gender='Female',
+                        kcse_grade='B+', status='shortlisted'),
+        ])
+        routers._pinned.set(False)
+        self.url = f'/api/check-application/{self.job.id}/jane@example.com'
+
+    def test_replica_reads_go_to_the_replica(self):
+        from .models import Application
+
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.json()['status'], 'shortlisted')
+        # Undecorated reads stay on the primary
+        self.assertEqual(Application.objects.get().status, 'pending')
+
+    def test_write_pins_the_client_to_the_primary(self):
+        from . import routers
+
+        response = self.client.post('/api/applications', {}, secure=True)
+        self.assertLess(response.status_code, 500)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_unhealthy_replica_is_taken_out_of_rotation(self):
+        from unittest import mock
+        from django.db import OperationalError, connections
+        from . import routers
+
+        failure = OperationalError('unable to open database file')
+        with mock.patch.object(connections['replica_1'], 'cursor', side_effect=failure), \
+                self.assertLogs('jobs.routers', 'WARNING'):
+            response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertIs(routers.health_report()['replica_1']['healthy'], False)
+
+        # Back in rotation at the next check once it answers again
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.json()['status'], 'shortlisted')
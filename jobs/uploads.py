@@ -0,0 +1,218 @@
+# ============================================
+# RESUMABLE UPLOADS - Applicant documents in chunks
+# ============================================
+#
+# For clients on links that drop partway through a 5 MB upload:
+#
+#   POST   /api/uploads            {"filename", "size"} -> {"uploadId", "offset": 0, "chunkSize"}
+#   PATCH  /api/uploads/<id>       raw bytes at Upload-Offset -> new Upload-Offset
+#   HEAD   /api/uploads/<id>       Upload-Offset / Upload-Length after a disconnect
+#   DELETE /api/uploads/<id>       give up
+#
+# The finished upload is referenced from submit_application as
+# cv_upload / id_document_upload / certificate_upload instead of sending
+# the file again. Each session is a directory under UPLOAD_SESSION_DIR
+# (local disk, shared by the workers on the host) holding meta.json and
+# the bytes received so far. A chunk is streamed to disk as it arrives,
+# so a connection that drops mid-chunk keeps what it delivered; the next
+# HEAD reports where to carry on. Sessions past UPLOAD_SESSION_TTL are
+# removed by gc_expired() (gc_uploads command, and occasionally on create).
+
+import json
+import os
+import random
+import re
+import secrets
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+META = 'meta.json'
+DATA = 'data'
+READ_SIZE = 64 * 1024
+ID_RE = re.compile(r'^[A-Za-z0-9_-]{22,64}$')
+# Share of session creates that also sweep expired sessions
+GC_PROBABILITY = 0.02
+
+
+class UploadError(Exception):
+    """A client-side problem with an upload session; the message is safe to return"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def session_root():
+    root = getattr(settings, 'UPLOAD_SESSION_DIR', '') or os.path.join(
+        tempfile.gettempdir(), 'greentara-uploads'
+    )
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _session_dir(upload_id):
+    if not upload_id or not ID_RE.match(upload_id):
+        raise UploadError('Unknown upload', status=404)
+    return os.path.join(session_root(), upload_id)
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        raise UploadError('Unknown upload', status=404)
+    if meta['expires_at'] <= time.time():
+        raise UploadError('Upload expired, please upload the file again', status=410)
+    return meta
+
+
+def create(filename, size):
+    """Open a session for one file of `size` bytes and return its metadata"""
+    filename = os.path.basename(str(filename or '')).strip()[:200]
+    if not filename:
+        raise UploadError('filename is required')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('size must be a number of bytes')
+    if size <= 0:
+        raise UploadError('size must be a number of bytes')
+    if size > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'{filename} is too large. Maximum size is 5MB per file.', status=413)
+
+    upload_id = secrets.token_urlsafe(24)
+    path = os.path.join(session_root(), upload_id)
+    os.makedirs(path)
+    meta = {
+        'upload_id': upload_id,
+        'filename': filename,
+        'size': size,
+        'created_at': time.time(),
+        'expires_at': time.time() + settings.UPLOAD_SESSION_TTL,
+    }
+    open(os.path.join(path, DATA), 'wb').close()
+    # meta.json last: a session without it is incomplete and ignored
+    with open(os.path.join(path, META), 'w') as f:
+        json.dump(meta, f)
+    metrics.inc('greentara_upload_sessions_total', {'event': 'created'})
+    if random.random() < GC_PROBABILITY:
+        gc_expired()
+    return meta
+
+
+def status(upload_id):
+    """(meta, offset) for a live session"""
+    path = _session_dir(upload_id)
+    meta = _read_meta(path)
+    return meta, os.path.getsize(os.path.join(path, DATA))
+
+
+def append(upload_id, offset, stream, length):
+    """
+    Write `length` bytes from `stream` at `offset`, which must be the
+    current end of the upload. Returns the new offset. Concurrent writers
+    to one session queue on a lock on its data file.
+    """
+    path = _session_dir(upload_id)
+    meta = _read_meta(path)
+    if length > settings.UPLOAD_CHUNK_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.UPLOAD_CHUNK_SIZE} bytes', status=413)
+    with open(os.path.join(path, DATA), 'ab') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            # Most likely a retried chunk that had already arrived: the
+            # client resends from `current`
+            metrics.inc('greentara_upload_bytes_total', {'outcome': 'rejected'}, amount=length)
+            raise UploadError('Upload-Offset does not match', status=409)
+        if current + length > meta['size']:
+            raise UploadError('Chunk runs past the declared size', status=413)
+        remaining = length
+        try:
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                f.write(data)
+                remaining -= len(data)
+        finally:
+            # Keep whatever arrived before a disconnect
+            f.flush()
+            metrics.inc('greentara_upload_bytes_total', {'outcome': 'stored'}, amount=length - remaining)
+        offset = current + length - remaining
+    if offset == meta['size']:
+        metrics.inc('greentara_upload_sessions_total', {'event': 'completed'})
+    return offset
+
+
+def delete(upload_id):
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
+
+
+def completed_file(upload_id):
+    """
+    An open File for a finished upload, for assigning to a FileField.
+    Raises UploadError if the session is unknown, expired or incomplete.
+    """
+    meta, offset = status(upload_id)
+    if offset != meta['size']:
+        raise UploadError(f"{meta['filename']} has not finished uploading", status=409)
+    return File(open(os.path.join(_session_dir(upload_id), DATA), 'rb'), name=meta['filename'])
+
+
+def finish(files):
+    """Close the Files from completed_file() and remove their sessions once saved"""
+    for upload_id, file in files.items():
+        file.close()
+        delete(upload_id)
+        metrics.inc('greentara_upload_sessions_total', {'event': 'used'})
+
+
+def gc_expired(now=None):
+    """
+    Remove expired sessions, and leftovers of creates that never wrote
+    meta.json. Returns (sessions removed, bytes freed).
+    """
+    now = now or time.time()
+    root = session_root()
+    removed = freed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            with open(os.path.join(path, META)) as f:
+                meta = json.load(f)
+            expired = meta['expires_at'] <= now
+        except (OSError, ValueError, KeyError):
+            # No meta.json: only once it's clearly not a create in progress
+            try:
+                expired = os.path.getmtime(path) < now - 3600
+            except OSError:
+                continue
+        if not expired:
+            continue
+        try:
+            size = os.path.getsize(os.path.join(path, DATA))
+        except OSError:
+            size = 0
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+        freed += size
+    if removed:
+        metrics.inc('greentara_upload_sessions_total', {'event': 'expired'}, amount=removed)
+        # Bytes that crossed the network for nothing
+        metrics.inc('greentara_upload_bytes_total', {'outcome': 'expired'}, amount=freed)
+    return removed, freed
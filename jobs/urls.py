@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from django.views.generic import TemplateView
 from . import views
 
 urlpatterns = [
     # Pages
-    path('', TemplateView.as_view(template_name='index.html'), name='index'),
+    path('', TemplateView.as_view(
+        template_name='index.html', extra_context={'snapshot_url': settings.SNAPSHOT_URL},
+    ), name='index'),
     path('login/', TemplateView.as_view(template_name='login.html'), name='login_page'),
     path('dashboard/', TemplateView.as_view(template_name='admin.html'), name='admin_page'),
     
@@ -12,6 +15,9 @@ urlpatterns = [
     path('api/health', views.health_check, name='health'),
     path('api/health/', views.health_check),
     
+    path('api/metrics', views.metrics_view, name='metrics'),
+    path('api/metrics/', views.metrics_view),
+    
     path('api/jobs', views.get_jobs, name='get_jobs'),
     path('api/jobs/', views.get_jobs),
     
@@ -21,6 +27,12 @@ urlpatterns = [
     path('api/applications', views.submit_application, name='submit_application'),
     path('api/applications/', views.submit_application),
     
+    path('api/uploads', views.create_upload, name='create_upload'),
+    path('api/uploads/', views.create_upload),
+    
+    path('api/uploads/<str:upload_id>', views.upload_session, name='upload_session'),
+    path('api/uploads/<str:upload_id>/', views.upload_session),
+    
     path('api/check-application/<int:job_id>/<str:email>', views.check_application),
     path('api/check-application/<int:job_id>/<str:email>/', views.check_application, name='check_application'),
     
@@ -46,4 +58,28 @@ urlpatterns = [
     
     path('api/admin/check', views.admin_check),
     path('api/admin/check/', views.admin_check, name='admin_check'),
+    
+    path('api/admin/slow-queries', views.get_slow_queries, name='slow_queries'),
+    path('api/admin/slow-queries/', views.get_slow_queries),
+    
+    path('api/admin/jobs/import', views.import_jobs, name='import_jobs'),
+    path('api/admin/jobs/import/', views.import_jobs),
+    
+    path('api/admin/jobs/export', views.export_jobs, name='export_jobs'),
+    path('api/admin/jobs/export/', views.export_jobs),
+    
+    path('api/admin/jobs/<int:job_id>/ranking', views.rank_applications, name='rank_applications'),
+    path('api/admin/jobs/<int:job_id>/ranking/', views.rank_applications),
+    
+    path('api/admin/applications', views.get_applications, name='get_applications'),
+    path('api/admin/applications/', views.get_applications),
+    
+    path('api/admin/applications/search', views.search_applications, name='search_applications'),
+    path('api/admin/applications/search/', views.search_applications),
+    
+    path('api/admin/applications/bulk-status', views.bulk_update_status, name='bulk_update_status'),
+    path('api/admin/applications/bulk-status/', views.bulk_update_status),
+    
+    path('api/admin/archive/search', views.search_archive, name='search_archive'),
+    path('api/admin/archive/search/', views.search_archive),
 ]
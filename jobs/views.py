@@ -2,21 +2,46 @@
 # FIXED views.py - Proper File Upload Handling
 # ============================================
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.mail import send_mail
+from django.core.files.storage import default_storage
 from django.conf import settings
+from django.db import IntegrityError
 from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+import csv
+import hmac
 import json
+import logging
+import time
+
+from . import catalog, metrics, ratelimit, slowquery, uploads
+from .db import serialized_write
+from .idempotency import idempotent
+from .ratelimit import rate_limit
+from .routers import replica_reads
+
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================
 # SUBMIT APPLICATION - FIXED VERSION
 # ============================================
 
+def _save_document(field_name, file):
+    """Write an uploaded document where the Application field would put it; returns the stored name"""
+    from .models import Application
+    field = Application._meta.get_field(field_name)
+    return field.storage.save(field.generate_filename(None, file.name), file, max_length=field.max_length)
+
+
 @csrf_exempt
 @require_http_methods(["POST", "OPTIONS"])
+@rate_limit('submit_application')
+@idempotent
 def submit_application(request):
     """Submit job application with file uploads"""
     
@@ -25,9 +50,18 @@ def submit_application(request):
         response = JsonResponse({"status": "ok"})
         response["Access-Control-Allow-Origin"] = "*"
         response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        response["Access-Control-Allow-Headers"] = "Content-Type"
+        response["Access-Control-Allow-Headers"] = "Content-Type, Idempotency-Key"
         return response
     
+    # Refuse oversized uploads before reading them
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > settings.APPLICATION_MAX_BODY_SIZE:
+        return JsonResponse({'error': 'Upload too large. Files are limited to 5MB each.'}, status=413)
+    
+    started = time.perf_counter()
     try:
         from .models import Application
         
@@ -43,14 +77,12 @@ def submit_application(request):
             'kcseGrade': request.POST.get('kcseGrade'),
         }
         
-        print("=" * 60)
-        print("📥 NEW APPLICATION RECEIVED")
-        print("=" * 60)
-        print(f"Name: {data['fullName']}")
-        print(f"Email: {data['email']}")
-        print(f"Job: {data['jobTitle']} (ID: {data['jobId']})")
-        print(f"Files uploaded: {list(request.FILES.keys())}")
-        print("=" * 60)
+        logger.info('Application received', extra={
+            'job_id': data['jobId'],
+            'job_title': data['jobTitle'],
+            'email': data['email'],
+            'upload_fields': list(request.FILES.keys()),
+        })
         
         # Validate required fields
         required = ['jobId', 'jobTitle', 'fullName', 'email', 'phone', 'age', 'gender', 'kcseGrade']
@@ -61,6 +93,11 @@ def submit_application(request):
                 'error': f'Missing required fields: {", ".join(missing)}'
             }, status=400)
         
+        # The email is only known once the body is parsed
+        limited = ratelimit.admit(request, 'submit_application', email=data['email'], buckets=('email',))
+        if limited:
+            return limited
+        
         # Check for duplicate application
         existing = Application.objects.filter(
             job_id=data['jobId'],
@@ -68,47 +105,90 @@ def submit_application(request):
         ).first()
         
         if existing:
-            print(f"⚠️ Duplicate application detected from {data['email']}")
+            logger.info('Duplicate application rejected', extra={
+                'job_id': data['jobId'],
+                'email': data['email'],
+            })
+            metrics.inc('greentara_applications_duplicate_rejected_total')
             return JsonResponse({
                 'error': 'You have already applied for this position',
                 'appliedDate': existing.applied_at.isoformat()
             }, status=409)
         
-        # Get uploaded files
-        cv_file = request.FILES.get('cv')
-        id_file = request.FILES.get('id_document')
-        cert_file = request.FILES.get('certificate')
-        
-        # Validate required files
-        if not cv_file:
-            return JsonResponse({'error': 'CV/Resume is required'}, status=400)
-        if not id_file:
-            return JsonResponse({'error': 'ID/Passport document is required'}, status=400)
-        
-        # Validate file sizes (5MB max)
-        for file in [cv_file, id_file, cert_file]:
-            if file and file.size > 5 * 1024 * 1024:
-                return JsonResponse({
-                    'error': f'{file.name} is too large. Maximum size is 5MB per file.'
-                }, status=400)
-        
-      
-        application = Application.objects.create(
-            job_id=int(data['jobId']),
-            job_title=data['jobTitle'],
-            full_name=data['fullName'],
-            email=data['email'],
-            phone=data['phone'],
-            age=int(data['age']),
-            gender=data['gender'],
-            kcse_grade=data['kcseGrade'],
-            cv_document=cv_file,
-            id_document=id_file,
-            certificate_document=cert_file if cert_file else None,  # Pass file object
-            status='pending'
-        )
-        
-        print(f"✅ Application saved successfully! ID: {application.id}")
+        # Documents already sent through /api/uploads are referenced by ID
+        resumed = {}
+        # Handles from uploads.completed_file() are closed on every way out
+        try:
+            try:
+                for field in ('cv', 'id_document', 'certificate'):
+                    upload_id = request.POST.get(f'{field}_upload')
+                    if upload_id and field not in request.FILES:
+                        resumed[upload_id] = (field, uploads.completed_file(upload_id))
+            except uploads.UploadError as e:
+                return JsonResponse({'error': str(e)}, status=e.status)
+            resumed_files = {field: file for field, file in resumed.values()}
+        
+            # Get uploaded files
+            cv_file = request.FILES.get('cv') or resumed_files.get('cv')
+            id_file = request.FILES.get('id_document') or resumed_files.get('id_document')
+            cert_file = request.FILES.get('certificate') or resumed_files.get('certificate')
+        
+            # Validate required files
+            if not cv_file:
+                return JsonResponse({'error': 'CV/Resume is required'}, status=400)
+            if not id_file:
+                return JsonResponse({'error': 'ID/Passport document is required'}, status=400)
+        
+            # Validate file sizes (5MB max)
+            for file in [cv_file, id_file, cert_file]:
+                if file and file.size > 5 * 1024 * 1024:
+                    return JsonResponse({
+                        'error': f'{file.name} is too large. Maximum size is 5MB per file.'
+                    }, status=400)
+        
+            # Documents are written to storage first, so the write lock below
+            # (one writer at a time on SQLite) is only held for the insert
+            documents = {}
+            try:
+                for field, file in (('cv_document', cv_file), ('id_document', id_file), ('certificate_document', cert_file)):
+                    if file:
+                        documents[field] = _save_document(field, file)
+                with serialized_write():
+                    application = Application.objects.create(
+                        job_id=int(data['jobId']),
+                        job_title=data['jobTitle'],
+                        full_name=data['fullName'],
+                        email=data['email'],
+                        phone=data['phone'],
+                        age=int(data['age']),
+                        gender=data['gender'],
+                        kcse_grade=data['kcseGrade'],
+                        status='pending',
+                        **documents,
+                    )
+            except Exception as e:
+                for name in documents.values():
+                    default_storage.delete(name)
+                # Lost a race with a concurrent submission for the same job and email
+                duplicate = isinstance(e, IntegrityError) and Application.objects.filter(
+                    job_id=int(data['jobId']), email=data['email'],
+                ).exists()
+                if not duplicate:
+                    raise
+                metrics.inc('greentara_applications_duplicate_rejected_total')
+                return JsonResponse({'error': 'You have already applied for this position'}, status=409)
+        finally:
+            for field, file in resumed.values():
+                file.close()
+        
+        uploads.finish({upload_id: file for upload_id, (field, file) in resumed.items()})
+        
+        logger.info('Application saved', extra={
+            'application_id': application.id,
+            'job_id': application.job_id,
+            'save_ms': round((time.perf_counter() - started) * 1000, 2),
+        })
+        metrics.inc('greentara_applications_submitted_total')
         
         # Send confirmation email
         email_sent = False
@@ -120,10 +200,16 @@ def submit_application(request):
                 application_id=application.id
             )
             if email_sent:
-                print(f"📧 Confirmation email sent to {data['email']}")
-        except Exception as e:
-            print(f"⚠️ Email error: {e}")
-        
+                logger.info('Confirmation email sent', extra={'application_id': application.id})
+        except Exception:
+            logger.warning('Confirmation email error', exc_info=True,
+                           extra={'application_id': application.id})
+        
+        logger.info('Application submitted', extra={
+            'application_id': application.id,
+            'email_sent': email_sent,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        })
         return JsonResponse({
             'success': True,
             'message': 'Application submitted successfully!',
@@ -132,15 +218,99 @@ def submit_application(request):
         }, status=201)
         
     except Exception as e:
-        print(f"❌ ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Application submission failed', extra={
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        })
         return JsonResponse({
             'error': 'Server error occurred while processing your application',
             'details': str(e)
         }, status=500)
 
 
+# ============================================
+# RESUMABLE UPLOADS
+# ============================================
+
+def _upload_preflight(methods):
+    response = JsonResponse({"status": "ok"})
+    response["Access-Control-Allow-Origin"] = "*"
+    response["Access-Control-Allow-Methods"] = methods
+    response["Access-Control-Allow-Headers"] = "Content-Type, Upload-Offset"
+    response["Access-Control-Expose-Headers"] = "Upload-Offset, Upload-Length, Location"
+    return response
+
+
+def _upload_response(meta, offset, status=200):
+    response = JsonResponse({
+        'uploadId': meta['upload_id'],
+        'filename': meta['filename'],
+        'size': meta['size'],
+        'offset': offset,
+        'complete': offset == meta['size'],
+        'chunkSize': settings.UPLOAD_CHUNK_SIZE,
+        'expiresAt': datetime.fromtimestamp(meta['expires_at'], tz=dt_timezone.utc).isoformat(),
+    }, status=status)
+    response['Upload-Offset'] = str(offset)
+    response['Upload-Length'] = str(meta['size'])
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST", "OPTIONS"])
+@rate_limit('upload_session')
+def create_upload(request):
+    """Open a resumable upload session for one document"""
+    if request.method == "OPTIONS":
+        return _upload_preflight("POST, OPTIONS")
+    
+    try:
+        data = json.loads(request.body or b'{}')
+        meta = uploads.create(data.get('filename'), data.get('size'))
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Expected a JSON object with filename and size'}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    response = _upload_response(meta, 0, status=201)
+    response['Location'] = f"/api/uploads/{meta['upload_id']}"
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE", "OPTIONS"])
+@rate_limit('upload_chunk')
+def upload_session(request, upload_id):
+    """Offset of an upload (GET/HEAD), the next chunk (PATCH) or cancel (DELETE)"""
+    if request.method == "OPTIONS":
+        return _upload_preflight("GET, HEAD, PATCH, DELETE, OPTIONS")
+    
+    try:
+        if request.method == "DELETE":
+            uploads.delete(upload_id)
+            return JsonResponse({'success': True})
+        
+        if request.method == "PATCH":
+            try:
+                offset = int(request.headers['Upload-Offset'])
+                length = int(request.META['CONTENT_LENGTH'])
+            except (KeyError, ValueError):
+                return JsonResponse({'error': 'Upload-Offset and Content-Length are required'}, status=400)
+            try:
+                uploads.append(upload_id, offset, request, length)
+            except uploads.UploadError as e:
+                if e.status != 409:
+                    raise
+                # Tell the client where to carry on from
+                meta, current = uploads.status(upload_id)
+                return _upload_response(meta, current, status=409)
+        
+        meta, offset = uploads.status(upload_id)
+        return _upload_response(meta, offset)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+
 def send_confirmation_email(applicant_email, applicant_name, job_title, application_id):
     """Send confirmation email to applicant"""
     
@@ -183,9 +353,12 @@ Green Tara Recruitment Team
             recipient_list=[applicant_email],
             fail_silently=False,
         )
+        metrics.inc('greentara_emails_sent_total', {'result': 'sent'})
         return True
-    except Exception as e:
-        print(f"Email sending failed: {e}")
+    except Exception:
+        logger.warning('Email sending failed', exc_info=True,
+                       extra={'application_id': application_id})
+        metrics.inc('greentara_emails_sent_total', {'result': 'failed'})
         return False
 
 
@@ -194,33 +367,10 @@ Green Tara Recruitment Team
 # ============================================
 
 @require_http_methods(["GET"])
-def get_jobs(request):
+async def get_jobs(request):
     """Get all active jobs"""
     try:
-        from .models import Job
-        
-        jobs = Job.objects.filter(is_active=True).order_by('-created_at')
-        
-        jobs_list = []
-        for job in jobs:
-            jobs_list.append({
-                'id': job.id,
-                'title': job.title,
-                'location': job.location,
-                'salary': job.salary,
-                'contract': job.contract,
-                'icon': job.icon or '💼',
-                'description': job.description,
-                'responsibilities': job.responsibilities,
-                'requirements': job.requirements,
-                'benefits': job.benefits,
-                'workplace_photos': job.workplace_photos or [],
-                'expiry_date': job.expiry_date.isoformat() if job.expiry_date else None,
-                'created_at': job.created_at.isoformat(),
-            })
-        
-        return JsonResponse(jobs_list, safe=False)
-        
+        return JsonResponse(await catalog.aget_jobs(), safe=False)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -230,31 +380,13 @@ def get_jobs(request):
 # ============================================
 
 @require_http_methods(["GET"])
-def get_job(request, job_id):
+async def get_job(request, job_id):
     """Get a single job by ID"""
     try:
-        from .models import Job
-        
-        job = Job.objects.get(id=job_id, is_active=True)
-        
-        return JsonResponse({
-            'id': job.id,
-            'title': job.title,
-            'location': job.location,
-            'salary': job.salary,
-            'contract': job.contract,
-            'icon': job.icon or '💼',
-            'description': job.description,
-            'responsibilities': job.responsibilities,
-            'requirements': job.requirements,
-            'benefits': job.benefits,
-            'workplace_photos': job.workplace_photos or [],
-            'expiry_date': job.expiry_date.isoformat() if job.expiry_date else None,
-            'created_at': job.created_at.isoformat(),
-        })
-        
-    except Job.DoesNotExist:
-        return JsonResponse({'error': 'Job not found'}, status=404)
+        job = await catalog.aget_job(job_id)
+        if job is None:
+            return JsonResponse({'error': 'Job not found'}, status=404)
+        return JsonResponse(job)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -267,23 +399,10 @@ def get_job(request, job_id):
 def get_site_content(request):
     """Get site content including theme colors"""
     try:
-        from .models import SiteContent, SiteSettings
-        
-        content, created = SiteContent.objects.get_or_create(pk=1)
-        
-        # Get theme settings
-        theme_settings = SiteSettings.get_settings()
-        
         return JsonResponse({
-            'site_name': content.site_name,
-            'site_logo': content.site_logo.url if content.site_logo else None,
-            'hero_title': content.hero_title,
-            'hero_subtitle': content.hero_subtitle,
-            'about_text': content.about_text,
-            'contact_email': content.contact_email,
-            'contact_phone': content.contact_phone,
+            **catalog.get_site_content(),
             # Add theme colors to response
-            'theme': theme_settings.get_theme_dict(),
+            'theme': catalog.get_theme(),
         })
         
     except Exception as e:
@@ -296,14 +415,25 @@ def get_site_content(request):
 
 @require_http_methods(["GET"])
 def get_applications(request):
-    """Get all applications"""
+    """Get all applications (?job_id=, ?min_grade=C+ for that grade or better)"""
     if not request.user.is_authenticated or not request.user.is_staff:
         return JsonResponse({'error': 'Unauthorized'}, status=401)
     
     try:
+        from .grades import grade_rank
         from .models import Application
         
         apps = Application.objects.all().order_by('-applied_at')
+        if request.GET.get('job_id'):
+            try:
+                apps = apps.filter(job_id=int(request.GET['job_id']))
+            except ValueError:
+                return JsonResponse({'error': 'job_id must be a number'}, status=400)
+        if request.GET.get('min_grade'):
+            min_rank = grade_rank(request.GET['min_grade'])
+            if not min_rank:
+                return JsonResponse({'error': 'min_grade must be a KCSE grade, A to E'}, status=400)
+            apps = apps.filter(grade_rank__gte=min_rank)
         
         apps_list = []
         for app in apps:
@@ -317,6 +447,7 @@ def get_applications(request):
                 'age': app.age,
                 'gender': app.gender,
                 'kcse_grade': app.kcse_grade,
+                'grade_rank': app.grade_rank,
                 'status': app.status,
                 'applied_at': app.applied_at.isoformat(),
                 'cv_url': app.cv_document.url if app.cv_document else None,
@@ -329,8 +460,167 @@ def get_applications(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def bulk_update_status(request):
+    """
+    Set one status on many applications:
+    {"status": "shortlisted", "ids": [...]} or {"status": ..., "filter": {"job_id": 3, ...}},
+    optionally with "dry_run" and "batch_size"
+    """
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    from . import statuses
+
+    try:
+        data = json.loads(request.body)
+        batch_size = min(max(int(data.get('batch_size', 1000)), 1), 5000)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected a JSON object; batch_size must be a number'}, status=400)
+
+    try:
+        queryset = statuses.build_queryset(data.get('ids'), data.get('filter'))
+        summary = statuses.bulk_set_status(
+            queryset,
+            data.get('status'),
+            changed_by=request.user.get_username(),
+            source='api',
+            batch_size=batch_size,
+            dry_run=bool(data.get('dry_run')),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    summary['status'] = data['status']
+    summary['dry_run'] = bool(data.get('dry_run'))
+    return JsonResponse(summary)
+
+
 @require_http_methods(["GET"])
-def health_check(request):
+def rank_applications(request, job_id):
+    """
+    Top applicants for a job by weighted score. Query: k, w_grade,
+    w_recency, w_certificate, w_age, min_grade, min_age, max_age,
+    ideal_age, age_tolerance, half_life_days, require_certificate, status
+    """
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    from . import ranking
+    from .models import Application
+
+    try:
+        ranked = ranking.rank(job_id, **ranking.options_from_query(request.GET))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    apps = Application.objects.in_bulk([row['id'] for row in ranked['results']])
+    for row in ranked['results']:
+        app = apps.get(row['id'])
+        if app is None:
+            continue
+        row.update({
+            'full_name': app.full_name,
+            'email': app.email,
+            'phone': app.phone,
+            'age': app.age,
+            'gender': app.gender,
+            'kcse_grade': app.kcse_grade,
+            'status': app.status,
+            'applied_at': app.applied_at.isoformat(),
+            'cert_url': app.certificate_document.url if app.certificate_document else None,
+        })
+    ranked['job_id'] = job_id
+    return JsonResponse(ranked)
+
+
+@require_http_methods(["GET"])
+def search_applications(request):
+    """
+    Applications whose CV text matches ?q=, best first, with a highlighted
+    snippet. Optional: job_id, limit (default 50, at most 500)
+    """
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    from . import fulltext
+    from .models import Application
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    try:
+        job_id = int(request.GET['job_id']) if request.GET.get('job_id') else None
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        return JsonResponse({'error': 'job_id and limit must be numbers'}, status=400)
+
+    started = time.monotonic()
+    hits = fulltext.search_cv(query, job_id=job_id, limit=limit)
+    apps = Application.objects.in_bulk([hit['id'] for hit in hits])
+    results = []
+    for hit in hits:
+        app = apps.get(hit['id'])
+        if app is None:
+            continue
+        hit.update({
+            'job_id': app.job_id,
+            'job_title': app.job_title,
+            'full_name': app.full_name,
+            'email': app.email,
+            'phone': app.phone,
+            'kcse_grade': app.kcse_grade,
+            'status': app.status,
+            'applied_at': app.applied_at.isoformat(),
+            'cv_url': app.cv_document.url if app.cv_document else None,
+        })
+        results.append(hit)
+    return JsonResponse({
+        'query': query,
+        'count': len(results),
+        'took_ms': round((time.monotonic() - started) * 1000, 1),
+        'results': results,
+    })
+
+
+@require_http_methods(["GET"])
+def search_archive(request):
+    """Search archived applications by name, email, job title or ID"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    
+    from . import archive
+    
+    try:
+        job_id = int(request.GET['job_id']) if request.GET.get('job_id') else None
+        limit = min(int(request.GET.get('limit', 50)), 500)
+    except ValueError:
+        return JsonResponse({'error': 'job_id and limit must be numbers'}, status=400)
+    results = archive.search(
+        request.GET.get('q', ''),
+        status=request.GET.get('status') or None,
+        job_id=job_id,
+        limit=limit,
+    )
+    return JsonResponse({'results': results, 'count': len(results)})
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """Uploaded documents, for staff; handed to the proxy or sendfile() after the check"""
+    from . import media
+    
+    if media.normalize(path) is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    if not media.can_view(request.user, path):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return media.serve(request, path)
+
+
+@require_http_methods(["GET"])
+async def health_check(request):
     """Simple health check endpoint"""
     return JsonResponse({
         'status': 'ok',
@@ -339,9 +629,39 @@ def health_check(request):
     })
 
 
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """
+    Prometheus metrics aggregated across all workers.
+    Staff only, or send `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.headers.get('Authorization', '')
+    token_ok = bool(token) and hmac.compare_digest(auth, f'Bearer {token}')
+    if not token_ok and not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_http_methods(["GET"])
+def get_slow_queries(request):
+    """Recent slow queries and captured EXPLAIN plans from all workers (staff only)"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    return JsonResponse(slowquery.collect(limit=limit))
+
+
 @csrf_exempt
 @require_http_methods(["GET", "OPTIONS"])
-def check_application(request, job_id, email):
+@rate_limit('check_application', email_kwarg='email')
+@replica_reads
+async def check_application(request, job_id, email):
     """Check if user already applied for this job"""
     
     if request.method == "OPTIONS":
@@ -352,10 +672,10 @@ def check_application(request, job_id, email):
     try:
         from .models import Application
         
-        application = Application.objects.filter(
+        application = await Application.objects.filter(
             job_id=job_id,
             email=email
-        ).first()
+        ).only('applied_at', 'status').afirst()
         
         if application:
             return JsonResponse({
@@ -367,7 +687,7 @@ def check_application(request, job_id, email):
         return JsonResponse({'hasApplied': False})
         
     except Exception as e:
-        print(f"Error checking application: {e}")
+        logger.exception('Error checking application', extra={'job_id': job_id})
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -486,6 +806,75 @@ def create_job(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def import_jobs(request):
+    """
+    Create or update jobs from CSV or JSONL: a multipart `file`, or the raw
+    body with a text/csv or application/x-ndjson Content-Type. Query
+    options: format, dry_run, skip_invalid, batch_size.
+    """
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    
+    import codecs
+    from . import bulk
+    
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        batch_size = int(request.GET.get('batch_size', 500))
+    except ValueError:
+        return JsonResponse({'error': 'batch_size must be a number'}, status=400)
+    if content_length > settings.JOB_IMPORT_MAX_BODY_SIZE:
+        return JsonResponse({'error': 'Import too large'}, status=413)
+    
+    if request.content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': 'Send the rows as a "file" upload or as the request body'}, status=400)
+        fmt = request.GET.get('format') or bulk.detect_format(upload.name, upload.content_type)
+        source = upload
+    else:
+        # Read the body as a stream rather than loading request.body
+        fmt = request.GET.get('format') or bulk.detect_format(content_type=request.content_type)
+        source = request
+    
+    try:
+        summary = bulk.import_jobs(
+            codecs.iterdecode(source, 'utf-8-sig'),
+            fmt=fmt,
+            batch_size=max(1, batch_size),
+            dry_run=request.GET.get('dry_run') in ('1', 'true'),
+            skip_invalid=request.GET.get('skip_invalid') in ('1', 'true'),
+        )
+    except (ValueError, csv.Error) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    status = 400 if summary['invalid'] and not summary['created'] and not summary['updated'] else 200
+    return JsonResponse(summary, status=status)
+
+
+@require_http_methods(["GET"])
+def export_jobs(request):
+    """Stream every job as CSV or JSONL (?format=csv|jsonl, ?active_only=true)"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    
+    from django.http import StreamingHttpResponse
+    from . import bulk
+    from .models import Job
+    
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in bulk.FORMATS:
+        return JsonResponse({'error': 'format must be csv or jsonl'}, status=400)
+    queryset = Job.objects.all()
+    if request.GET.get('active_only') == 'true':
+        queryset = queryset.filter(is_active=True)
+    content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(bulk.export_jobs(fmt, queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="jobs-{timezone.now():%Y%m%d}.{fmt}"'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["PUT"])
 def update_job(request, job_id):
@@ -636,16 +1025,14 @@ def get_analytics(request):
 # ============================================
 
 @require_http_methods(["GET"])
-def get_theme_colors(request):
+async def get_theme_colors(request):
     """
     Get current theme colors only.
     Useful for quick theme updates without fetching all site content.
     """
     try:
-        from .models import SiteSettings
-        settings = SiteSettings.get_settings()
         return JsonResponse({
-            'theme': settings.get_theme_dict()
+            'theme': await catalog.aget_theme()
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
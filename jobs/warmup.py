@@ -0,0 +1,134 @@
+# ============================================
+# WARM-UP - Do first-request work before taking traffic
+# ============================================
+#
+# warm_code() runs from AppConfig.ready() (WARMUP_ON_READY) and touches no
+# database, so under gunicorn's preload_app it runs once in the master and
+# every forked worker inherits the imported modules, URL resolver and
+# compiled templates. warm_worker() runs per worker after the fork
+# (gunicorn.conf.py post_worker_init): it fills the database connection
+# pool (when pooling is on), the catalog cache, and sends a few requests
+# through the stack, logging any that don't answer 2xx. Connections must
+# never be opened before the fork.
+
+import importlib
+import logging
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+MODULES = [
+    'jobs.models',
+    'jobs.views',
+    'jobs.admin',
+    'jobs.catalog',
+    'django.contrib.admin.views.main',
+    'django.contrib.auth.views',
+]
+
+TEMPLATES = [
+    'index.html',
+    'login.html',
+    'admin.html',
+    'admin/index.html',
+    'admin/login.html',
+    'admin/change_list.html',
+    'admin/change_form.html',
+]
+
+
+def _stage(timings, name, func):
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception:
+        logger.exception('Warm-up stage failed', extra={'stage': name})
+    timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def _import_modules():
+    for name in MODULES:
+        importlib.import_module(name)
+
+
+def _resolve_urls():
+    from django.urls import reverse
+    # Imports the URLconf (and every view module it names) and builds
+    # the resolver's lookup tables
+    reverse('get_jobs')
+
+
+def _compile_templates():
+    from django.template import TemplateDoesNotExist
+    from django.template.loader import get_template
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+
+def warm_code():
+    """Imports, URL resolver and templates. Safe before fork: no database access."""
+    timings = {}
+    _stage(timings, 'imports', _import_modules)
+    _stage(timings, 'urls', _resolve_urls)
+    _stage(timings, 'templates', _compile_templates)
+    logger.info('Code warm-up finished', extra={'stage_ms': timings, 'total_ms': round(sum(timings.values()), 1)})
+    return timings
+
+
+def _open_connections():
+    """Fill each connection pool. Without a pool there is nothing to keep: requests open their own."""
+    from django.db import connections
+    for alias in connections:
+        connection = connections[alias]
+        if not connection.settings_dict.get('OPTIONS', {}).get('pool'):
+            continue
+        connection.ensure_connection()
+        # Wait until min_size connections are up, not just the first one
+        connection.pool.wait(timeout=getattr(settings, 'WARMUP_POOL_TIMEOUT', 10))
+        # Threads and the async executor take theirs from the pool, so
+        # hand this one back
+        connection.close()
+
+
+def _fill_caches():
+    from . import catalog
+    catalog.prefill()
+
+
+def _host():
+    """A Host header ALLOWED_HOSTS accepts (the test client's 'testserver' isn't one)"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            # '.example.com' also matches example.com
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _self_requests():
+    """Send each WARMUP_PATHS request through the full middleware and view stack in-process"""
+    from django.test import Client
+    client = Client(HTTP_HOST=_host())
+    failed = []
+    for path in getattr(settings, 'WARMUP_PATHS', []):
+        status = client.get(path, secure=True).status_code
+        if not 200 <= status < 300:
+            failed.append(path)
+            logger.warning('Warm-up request failed', extra={'path': path, 'status_code': status})
+    if failed:
+        raise RuntimeError(f'{len(failed)} warm-up requests failed: {", ".join(failed)}')
+
+
+def warm_worker():
+    """Per-worker warm-up after fork: database connections, caches and first requests"""
+    timings = {}
+    _stage(timings, 'connections', _open_connections)
+    _stage(timings, 'caches', _fill_caches)
+    _stage(timings, 'requests', _self_requests)
+    logger.info('Worker warm-up finished', extra={'stage_ms': timings, 'total_ms': round(sum(timings.values()), 1)})
+    return timings
@@ -0,0 +1,59 @@
+# ============================================
+# WORKER STATE - Per-process snapshots in a shared directory
+# ============================================
+#
+# Gunicorn workers don't share memory, so anything that has to be
+# aggregated across them (metrics, diagnostics) is periodically written
+# to WORKER_STATE_DIR as one JSON file per process and merged on read.
+
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+
+def state_dir():
+    path = getattr(settings, 'WORKER_STATE_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'greentara-workers'
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_snapshot(kind, data, pid=None):
+    """Atomically replace this process's snapshot of `kind`"""
+    directory = state_dir()
+    pid = pid or os.getpid()
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{kind}_', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(directory, f'{kind}_{pid}.json'))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_snapshots(kind, exclude_pid=None):
+    """Return {pid: data} for every process that has written a `kind` snapshot"""
+    directory = state_dir()
+    prefix = f'{kind}_'
+    snapshots = {}
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith('.json')):
+            continue
+        try:
+            pid = int(name[len(prefix):-len('.json')])
+        except ValueError:
+            continue
+        if pid == exclude_pid:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots[pid] = json.load(f)
+        except (OSError, ValueError):
+            # Being replaced right now, or truncated by a crash
+            continue
+    return snapshots